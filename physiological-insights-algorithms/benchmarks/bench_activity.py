@@ -0,0 +1,200 @@
+"""Parity check and scaling benchmark for ``activity.analyse_activity``.
+
+Runs the vectorized implementation against the previous per-row classifier
+and per-day loop (kept here verbatim as ``_per_row_activity``) on synthetic
+streams, including a block of sustained exercise so session detection is
+exercised, plus NaN heart rate, a missing HR column and a DST transition.
+Outputs must match exactly. Then times the vectorized version at
+increasing lengths.
+
+    python benchmarks/bench_activity.py --parity-days 10 --days 90 365
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import EPOCHS_PER_DAY, synthetic_epochs
+from physiological_insights.activity import analyse_activity
+from physiological_insights.epoch_features import activity_energy
+from physiological_insights.ingest import _metrics_dtypes, _normalize_metrics_chunk
+
+_SEDENTARY_ENERGY = 50
+_LIGHT_ENERGY = 200
+_MODERATE_ENERGY = 600
+_DST_START = 1772600000  # a few days before 2026-03-08
+
+
+def _classify_epoch(energy: float, hr: float) -> str:
+    if energy < _SEDENTARY_ENERGY and hr < 80:
+        return "sedentary"
+    elif energy < _LIGHT_ENERGY:
+        return "light"
+    elif energy < _MODERATE_ENERGY or (80 <= hr < 100):
+        return "moderate"
+    else:
+        return "vigorous"
+
+
+def _per_row_activity(df: pd.DataFrame) -> dict:
+    """``analyse_activity`` as it was before the vectorized rewrite."""
+    wear = df[df["wear_mode"] == "wear_on"].copy()
+    if wear.empty:
+        return {"daily_activity": [], "exercise_sessions": []}
+
+    wear["acc_energy"] = activity_energy(wear)
+    hr_col = "heart_rate_mean" if "heart_rate_mean" in wear.columns else None
+    hr_values = wear[hr_col].fillna(60) if hr_col else pd.Series(60, index=wear.index)
+
+    wear["activity_level"] = [
+        _classify_epoch(e, h) for e, h in zip(wear["acc_energy"], hr_values)
+    ]
+
+    wear["date"] = wear["datetime_et"].dt.date
+
+    # Daily aggregation
+    daily_list = []
+    for date, day_df in wear.groupby("date"):
+        counts = day_df["activity_level"].value_counts()
+        total = len(day_df)
+        moderate_vigorous = day_df[day_df["activity_level"].isin(["moderate", "vigorous"])]
+        load_energy = float(moderate_vigorous["acc_energy"].sum()) if not moderate_vigorous.empty else 0
+
+        # Steps and calories are cumulative counters — daily total = max − min
+        steps = 0
+        if "steps" in day_df.columns:
+            s = day_df["steps"].dropna()
+            if not s.empty:
+                steps = max(0, float(s.max() - s.min()))
+
+        calories = 0
+        if "calories" in day_df.columns:
+            c = day_df["calories"].dropna()
+            if not c.empty:
+                calories = max(0, float(c.max() - c.min()))
+
+        daily_list.append({
+            "date": str(date),
+            "sedentary_epochs": int(counts.get("sedentary", 0)),
+            "light_epochs": int(counts.get("light", 0)),
+            "moderate_epochs": int(counts.get("moderate", 0)),
+            "vigorous_epochs": int(counts.get("vigorous", 0)),
+            "total_epochs": total,
+            "moderate_vigorous_min": round((counts.get("moderate", 0) + counts.get("vigorous", 0)) * 0.5, 1),
+            "physical_load": round(load_energy, 1),
+            "exercise_load": _load_label(load_energy),
+            "steps": steps,
+            "calories": round(calories, 1),
+        })
+
+    # Exercise session detection: contiguous epochs with HR > 100 and high acc energy
+    sessions = _detect_exercise_sessions(wear, hr_col)
+
+    return {"daily_activity": daily_list, "exercise_sessions": sessions}
+
+
+def _load_label(energy: float) -> str:
+    if energy < 500:
+        return "low"
+    elif energy < 2000:
+        return "moderate"
+    else:
+        return "high"
+
+
+def _detect_exercise_sessions(df: pd.DataFrame, hr_col: str | None) -> list[dict]:
+    """Find contiguous epochs of elevated HR + accelerometer energy."""
+    if hr_col is None:
+        return []
+
+    mask = (df[hr_col] > 100) & (df["acc_energy"] > _MODERATE_ENERGY)
+    exercise_epochs = df[mask]
+    if exercise_epochs.empty:
+        return []
+
+    sessions = []
+    idx_arr = exercise_epochs.index.values
+    groups = np.split(idx_arr, np.where(np.diff(idx_arr) > 2)[0] + 1)
+
+    for group in groups:
+        if len(group) < 4:  # at least 2 min
+            continue
+        start = df.loc[group[0], "datetime_et"]
+        end = df.loc[group[-1], "datetime_et"]
+        dur = (end - start).total_seconds() / 60
+        avg_hr = float(df.loc[group, hr_col].mean())
+        sessions.append({
+            "start": str(start),
+            "end": str(end),
+            "duration_min": round(dur, 1),
+            "avg_hr": round(avg_hr, 1),
+        })
+
+    return sessions
+
+
+def _frame(days: float, seed: int, start_ts: int | None = None) -> pd.DataFrame:
+    kwargs = {} if start_ts is None else {"start_ts": start_ts}
+    df = synthetic_epochs(int(days * EPOCHS_PER_DAY), seed=seed, **kwargs)
+    return _normalize_metrics_chunk(df.astype(_metrics_dtypes(df.columns)))
+
+
+def _with_workout(df: pd.DataFrame, start: int, n_epochs: int = 200) -> pd.DataFrame:
+    """Overwrite ``n_epochs`` rows from ``start`` with a sustained high-HR, high-motion bout."""
+    rows = df.index[start:start + n_epochs]
+    df.loc[rows, "wear_mode"] = "wear_on"
+    df.loc[rows, "heart_rate_mean"] = 130.0
+    for c in [c for c in df.columns if c.startswith("acc_") and ("rms" in c or "energyPerSec" in c)]:
+        df.loc[rows, c] = 2000.0
+    return df
+
+
+def _parity_cases(days: float):
+    rng = np.random.default_rng(11)
+    yield "baseline", _frame(days, 1)
+
+    df = _frame(days, 2)
+    for day in range(int(days)):
+        _with_workout(df, day * EPOCHS_PER_DAY + EPOCHS_PER_DAY // 2)
+    yield "workouts", df
+
+    yield "workout-dst", _with_workout(_frame(days, 3, _DST_START), 3 * EPOCHS_PER_DAY + 500)
+
+    df = _with_workout(_frame(days, 4), EPOCHS_PER_DAY)
+    df.loc[rng.random(len(df)) < 0.2, "heart_rate_mean"] = np.nan
+    yield "nan-hr", df
+
+    yield "no-hr", _frame(days, 5).drop(columns="heart_rate_mean")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parity-days", type=float, default=10)
+    parser.add_argument("--days", type=float, nargs="+", default=[90, 365])
+    args = parser.parse_args()
+
+    for name, df in _parity_cases(args.parity_days):
+        expected = _per_row_activity(df.copy())
+        actual = analyse_activity(df.copy())
+        assert actual == expected, f"parity mismatch in case {name!r}"
+        print(f"parity ok: {name:<12} {len(actual['daily_activity'])} days  "
+              f"{len(actual['exercise_sessions'])} sessions")
+
+    print()
+    for days in args.days:
+        df = _frame(days, 0)
+        t0 = time.perf_counter()
+        result = analyse_activity(df)
+        elapsed = time.perf_counter() - t0
+        print(f"{days:7.0f} days  {len(df):>10,} epochs  {len(result['exercise_sessions']):5d} sessions  "
+              f"{elapsed:7.3f} s  {elapsed / len(df) * 1e6:6.2f} us/epoch")
+
+
+if __name__ == "__main__":
+    main()
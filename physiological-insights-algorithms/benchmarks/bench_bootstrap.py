@@ -0,0 +1,75 @@
+"""Benchmark the vectorized bootstrap confidence intervals per user.
+
+Builds synthetic Ready tests (and an RMSSD sketch from synthetic epochs) for
+users with increasing test counts and times ``bootstrap_confidence``. Checks
+that the batched per-resample fits reproduce the point cosinor fit when every
+observation is drawn once, and that the acrophase interval covers the true
+acrophase at roughly the nominal rate.
+
+    python benchmarks/bench_bootstrap.py --coverage-users 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import EPOCHS_PER_DAY, synthetic_epochs
+from physiological_insights.bootstrap import bootstrap_confidence
+from physiological_insights.cosinor import curve, design, fit_cosinor, solve
+from physiological_insights.hrv_baseline import RmssdSketch
+
+
+def _tests(n: int, acrophase: float, rng: np.random.Generator) -> pd.DataFrame:
+    hours = rng.uniform(7, 23, n)
+    return pd.DataFrame({
+        "type": "READY",
+        "hour": hours,
+        "score": curve(hours, 150, 10, acrophase) + rng.normal(0, 8, n),
+        "is_baseline": np.arange(n) == 0,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=30, help="Days of epochs behind the RMSSD sketch")
+    parser.add_argument("--coverage-users", type=int, default=200)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    epochs = synthetic_epochs(args.days * EPOCHS_PER_DAY)
+    sketch = RmssdSketch().update(epochs["cardio_RMSSD_ms"].to_numpy(), epochs["timestamp"].to_numpy())
+
+    # Drawing every observation once must give the point fit.
+    df = _tests(60, 15.0, rng)
+    x = design(df["hour"])
+    y = df["score"].to_numpy()
+    once = solve((x.T @ x)[None], (x.T @ y)[None], np.array([y @ y]), np.array([len(y)]))
+    point = fit_cosinor(df["hour"], y)
+    for key in ("mesor", "amplitude", "acrophase_hour"):
+        assert np.allclose(once[key], point[key]), key
+
+    print(f"{'ready tests':>12}  {'ms/user':>8}")
+    for n in (20, 60, 200, 1000):
+        df = _tests(n, 15.0, rng)
+        bootstrap_confidence(df, sketch)
+        t0 = time.perf_counter()
+        for _ in range(5):
+            bootstrap_confidence(df, sketch)
+        print(f"{n:12d}  {(time.perf_counter() - t0) / 5 * 1000:8.1f}")
+
+    covered = 0
+    for _ in range(args.coverage_users):
+        truth = rng.uniform(9, 20)
+        lo, hi = bootstrap_confidence(_tests(60, truth, rng))["acrophase_hour_ci"]
+        covered += (truth - lo) % 24 <= (hi - lo) % 24
+    print(f"acrophase 95% CI coverage: {covered / args.coverage_users:.1%} ({args.coverage_users} users, 60 tests)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark LTTB downsampling of the HRV time series against fixed-width bucket means.
+
+Builds 1-minute HR/RMSSD means from synthetic epochs, then reduces them to a
+point budget with ``downsample.lttb_indices`` and with equal-width bucket
+means (as the 5-minute resample did). Reports time and how much of the
+deepest HR dip and highest RMSSD peak each version keeps.
+
+    python benchmarks/bench_downsample.py --days 90 --points 2000
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.synthetic import EPOCHS_PER_DAY, synthetic_epochs
+from physiological_insights.downsample import lttb_indices
+from physiological_insights.ingest import _normalize_metrics_chunk
+from physiological_insights.rollups import bucket_mean, build_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--points", type=int, default=2000)
+    args = parser.parse_args()
+
+    epochs = _normalize_metrics_chunk(synthetic_epochs(args.days * EPOCHS_PER_DAY))
+    level = build_rollups(epochs["datetime_et"], {
+        "hr": epochs["heart_rate_mean"].to_numpy(),
+        "rmssd": epochs["cardio_RMSSD_ms"].to_numpy(),
+    })["1min"]
+    seconds = level.index.asi8 / 1e9
+    hr = bucket_mean(level, "hr").to_numpy()
+    rmssd = bucket_mean(level, "rmssd").to_numpy()
+
+    t0 = time.perf_counter()
+    keep = lttb_indices(seconds, [rmssd, hr], args.points)
+    t_lttb = time.perf_counter() - t0
+
+    width = -(-len(hr) // args.points)
+    pad = width * args.points - len(hr)
+
+    def bucket_means(y):
+        warnings.simplefilter("ignore", RuntimeWarning)  # buckets with no readings
+        return np.nanmean(np.append(y, np.full(pad, np.nan)).reshape(-1, width), axis=1)
+
+    print(f"1-min points: {len(hr):,}  budget: {args.points:,}  LTTB kept {len(keep):,} in {t_lttb * 1000:.1f} ms")
+    print(f"{'':<16} {'min HR':>8} {'max RMSSD':>10}")
+    print(f"{'1-min (truth)':<16} {np.nanmin(hr):8.1f} {np.nanmax(rmssd):10.1f}")
+    print(f"{'LTTB':<16} {np.nanmin(hr[keep]):8.1f} {np.nanmax(rmssd[keep]):10.1f}")
+    print(f"{'bucket means':<16} {np.nanmin(bucket_means(hr)):8.1f} {np.nanmax(bucket_means(rmssd)):10.1f}")
+
+
+if __name__ == "__main__":
+    main()
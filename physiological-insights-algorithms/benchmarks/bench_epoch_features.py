@@ -0,0 +1,81 @@
+"""Benchmark the shared epoch motion features against the old row-wise apply.
+
+The old ``sleep._acc_energy`` / ``activity._epoch_energy`` ran
+``DataFrame.apply(axis=1)`` and rediscovered the ``acc_*`` columns per row.
+Row-wise apply is timed on a slice and extrapolated linearly; the vectorized
+stage runs on the full frame.
+
+    python benchmarks/bench_epoch_features.py --epochs 1200000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_epochs
+from physiological_insights.epoch_features import activity_energy, add_epoch_features, sleep_energy
+
+
+def _rowwise_sleep_energy(row: pd.Series) -> float:
+    rms_cols = [c for c in row.index if c.startswith("acc_") and "rms" in c.lower()]
+    if rms_cols:
+        vals = row[rms_cols].dropna()
+        if not vals.empty:
+            return float(np.sqrt((vals ** 2).sum()))
+    energy_cols = [c for c in row.index if c.startswith("acc_") and "energyPerSec" in c]
+    if energy_cols:
+        vals = row[energy_cols].dropna()
+        return float(vals.sum()) if not vals.empty else 0.0
+    return 0.0
+
+
+def _rowwise_activity_energy(row: pd.Series) -> float:
+    cols = [c for c in row.index if "energyPerSec" in c and c.startswith("acc_")]
+    if cols:
+        vals = row[cols].dropna()
+        return float(vals.sum()) if not vals.empty else 0.0
+    rms_cols = [c for c in row.index if c.startswith("acc_") and "rms" in c.lower()]
+    if rms_cols:
+        vals = row[rms_cols].dropna()
+        return float(np.sqrt((vals ** 2).sum())) if not vals.empty else 0.0
+    return 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--epochs", type=int, default=1_200_000)
+    parser.add_argument("--rowwise-sample", type=int, default=20_000,
+                        help="Rows timed for the row-wise baseline before extrapolating")
+    args = parser.parse_args()
+
+    df = synthetic_epochs(args.epochs)
+    sample = df.iloc[: args.rowwise_sample]
+
+    t0 = time.perf_counter()
+    old_sleep = sample.apply(_rowwise_sleep_energy, axis=1).to_numpy()
+    old_activity = sample.apply(_rowwise_activity_energy, axis=1).to_numpy()
+    rowwise = (time.perf_counter() - t0) * len(df) / len(sample)
+
+    t0 = time.perf_counter()
+    add_epoch_features(df)
+    new_sleep = sleep_energy(df)
+    new_activity = activity_energy(df)
+    vectorized = time.perf_counter() - t0
+
+    n = len(sample)
+    assert np.allclose(old_sleep, new_sleep[:n]) and np.allclose(old_activity, new_activity[:n])
+
+    print(f"epochs:                     {len(df):,}")
+    print(f"row-wise apply (extrap.):   {rowwise:8.2f} s")
+    print(f"vectorized feature stage:   {vectorized:8.3f} s")
+    print(f"speedup:                    {rowwise / vectorized:8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Memory/throughput benchmark for the decoded-metrics loader.
+
+Compares the original eager loader (full ``read_csv`` + ``to_numeric`` over
+every column) with the chunked, column-pruned loader, each in a fresh
+subprocess so peak RSS is measured independently.
+
+    python benchmarks/bench_ingest.py --days 1500     # ~2 GB synthetic file
+    python benchmarks/bench_ingest.py --csv path/to/decoded_metrics.csv
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from benchmarks.synthetic import write_synthetic_csv
+from physiological_insights.ingest import load_decoded_metrics
+
+_MODES = ("eager", "chunked", "iterator")
+
+
+def _eager_load(path: str) -> pd.DataFrame:
+    """The loader as it was before chunking: every column, default dtypes."""
+    df = pd.read_csv(path)
+    df["datetime"] = pd.to_datetime(df["timestamp"], unit="s", utc=True)
+    df["datetime_et"] = df["datetime"].dt.tz_convert("US/Eastern")
+    numeric_cols = df.columns.difference(["wear_mode", "lifecycle_state", "datetime", "datetime_et"])
+    for c in numeric_cols:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    return df.sort_values("timestamp").reset_index(drop=True)
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM resets on exec, unlike ru_maxrss which inherits the parent's peak.
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def _run_mode(mode: str, path: str) -> dict:
+    t0 = time.perf_counter()
+    if mode == "eager":
+        df = _eager_load(path)
+        rows, frame_mb = len(df), df.memory_usage(deep=True).sum() / 1e6
+    elif mode == "chunked":
+        df = load_decoded_metrics(path)
+        rows, frame_mb = len(df), df.memory_usage(deep=True).sum() / 1e6
+    else:
+        rows, frame_mb = 0, 0.0
+        for chunk in load_decoded_metrics(path, iterator=True):
+            rows += len(chunk)
+            frame_mb = max(frame_mb, chunk.memory_usage(deep=True).sum() / 1e6)
+    elapsed = time.perf_counter() - t0
+    peak_rss_mb = _peak_rss_mb()
+    return {
+        "mode": mode,
+        "rows": rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": int(rows / elapsed) if elapsed else None,
+        "frame_mb": round(frame_mb, 1),
+        "peak_rss_mb": round(peak_rss_mb, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", help="Existing decoded-metrics CSV (default: generate a synthetic one)")
+    parser.add_argument("--days", type=float, default=365, help="Days of synthetic epochs to generate")
+    parser.add_argument("--modes", nargs="+", default=list(_MODES), choices=_MODES)
+    parser.add_argument("--run", choices=_MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(_run_mode(args.run, args.csv)))
+        return
+
+    path = args.csv
+    tmp_dir = None
+    if path is None:
+        tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp_dir.name, "epochs.csv")
+        print(f"Generating {args.days:g} days of synthetic epochs...")
+        write_synthetic_csv(path, args.days)
+    print(f"File: {path} ({os.path.getsize(path) / 1e6:.0f} MB)")
+
+    print(f"{'mode':<10}{'rows':>12}{'sec':>9}{'rows/s':>12}{'frame MB':>11}{'peak RSS MB':>13}")
+    for mode in args.modes:
+        out = subprocess.run(
+            [sys.executable, __file__, "--run", mode, "--csv", path],
+            check=True, capture_output=True, text=True,
+        )
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{r['mode']:<10}{r['rows']:>12}{r['seconds']:>9}{r['rows_per_sec']:>12}"
+              f"{r['frame_mb']:>11}{r['peak_rss_mb']:>13}")
+
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark the agent payload's token estimate and budget trimming.
+
+Builds the context packet for a synthetic history (one year by default) and
+the agent payload from it, with no budget and at each ``--budgets`` value,
+reporting the estimated tokens, the sections summarized or dropped and the
+build time. It also times ``estimate_tokens`` against the previous
+``len(json) // 4``.
+
+With ``--fit``, every payload section (at each budget) is counted with a
+tiktoken encoding (needs ``tiktoken`` and its encoding files) and the
+per-piece weights of ``estimate_tokens`` are refitted by least squares. The
+script prints the fitted weights for ``agent_payload._TOKEN_WEIGHTS`` and the
+estimator's error before and after.
+
+    python benchmarks/bench_payload_budget.py --days 365 [--fit --encoding o200k_base]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from benchmarks.bench_serialize import synthetic_packet
+from physiological_insights import agent_payload
+from physiological_insights.agent_payload import build_agent_payload, estimate_tokens, token_pieces
+
+
+def _fit(texts: list[str], encoding: str):
+    try:
+        import tiktoken
+        enc = tiktoken.get_encoding(encoding)
+    except Exception as e:  # not installed, or the encoding file can't be downloaded
+        print(f"\n--fit needs tiktoken and the {encoding} encoding: {e.__class__.__name__}: {e}")
+        return
+    classes = list(agent_payload._TOKEN_WEIGHTS)
+    X = np.array([[token_pieces(t)[c] for c in classes] for t in texts], dtype=np.float64)
+    y = np.array([len(enc.encode(t)) for t in texts], dtype=np.float64)
+    weights = np.linalg.lstsq(X, y, rcond=None)[0]
+    current = X @ np.array([agent_payload._TOKEN_WEIGHTS[c] for c in classes])
+    fitted = X @ weights
+    quarter = np.array([len(t) // 4 for t in texts])
+    print(f"\n{encoding}: {len(texts)} sections, {int(y.sum()):,} tokens")
+    for name, est in (("len // 4", quarter), ("current weights", current), ("fitted weights", fitted)):
+        err = (est - y) / y * 100
+        print(f"  {name:<16} total {est.sum() / y.sum() * 100 - 100:+6.1f}%  "
+              f"per section median |err| {np.median(np.abs(err)):5.1f}%  max {np.max(np.abs(err)):5.1f}%")
+    print("  _TOKEN_WEIGHTS = {" + ", ".join(f'"{c}": {w:.2f}' for c, w in zip(classes, weights)) + "}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[2000, 1000, 600, 300])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--fit", action="store_true", help="Refit the estimator weights against a tiktoken encoding")
+    parser.add_argument("--encoding", default="o200k_base")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    packet, results = synthetic_packet(args.days)
+    print(f"{args.days} days of history; packet built in {time.perf_counter() - t0:.1f} s")
+
+    payloads = []
+    print(f"{'budget':>8} {'est. tokens':>12} {'len//4':>8} {'build ms':>9}  trimmed")
+    for budget in [None] + args.budgets:
+        t0 = time.perf_counter()
+        for _ in range(args.repeat):
+            payload = build_agent_payload(packet, results, budget)
+        t_build = (time.perf_counter() - t0) / args.repeat
+        payloads.append(payload)
+        info = payload.get("budget", {})
+        cut = "; ".join(f"{action}: {', '.join(info[action])}" for action in ("summarized", "dropped") if info.get(action))
+        quarter = len(json.dumps(payload, default=str)) // 4
+        print(f"{budget or '-':>8} {estimate_tokens(payload):12d} {quarter:8d} {t_build * 1000:9.2f}  {cut or '-'}")
+
+    text = json.dumps(payloads[0], default=str)
+    t0 = time.perf_counter()
+    for _ in range(args.repeat * 10):
+        estimate_tokens(payloads[0])
+    t_est = (time.perf_counter() - t0) / (args.repeat * 10)
+    t0 = time.perf_counter()
+    for _ in range(args.repeat * 10):
+        len(json.dumps(payloads[0], default=str)) // 4
+    t_quarter = (time.perf_counter() - t0) / (args.repeat * 10)
+    print(f"\nestimate_tokens {t_est * 1e6:.0f} us, len(json) // 4 {t_quarter * 1e6:.0f} us ({len(text):,} chars)")
+
+    if args.fit:
+        texts = [json.dumps({k: v}, separators=(",", ":"), ensure_ascii=False, default=str)
+                 for payload in payloads for k, v in payload.items()]
+        _fit(texts, args.encoding)
+
+
+if __name__ == "__main__":
+    main()
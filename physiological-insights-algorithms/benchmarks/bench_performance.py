@@ -0,0 +1,240 @@
+"""Parity check and benchmark for ``performance.analyse_performance``.
+
+Compares the single-groupby implementation with the previous per-type
+filter/merge version (kept here verbatim as ``_legacy_performance``) on a
+synthetic test history, then times both.
+
+    python benchmarks/bench_performance.py --tests 100000
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from physiological_insights.performance import analyse_performance
+
+_TYPES = np.array(["READY", "AGILITY", "FOCUS", "UNKNOWN"])
+
+
+def synthetic_tests(n_tests: int, seed: int = 0) -> pd.DataFrame:
+    """Test results shaped like ``load_test_results`` + ``parse_all_comments`` output."""
+    rng = np.random.default_rng(seed)
+    days = max(1, n_tests // 12)
+    created = pd.Timestamp("2024-01-01", tz="UTC") + pd.to_timedelta(
+        np.sort(rng.uniform(0, days * 86400, n_tests)), unit="s")
+    local = created.tz_convert("America/New_York")
+    ttype = _TYPES[rng.choice(4, n_tests, p=[0.5, 0.3, 0.17, 0.03])]
+    score = rng.normal(150, 20, n_tests)
+    score[rng.random(n_tests) < 0.02] = np.nan
+
+    def self_report():
+        values = rng.integers(1, 8, n_tests).astype(float)
+        values[rng.random(n_tests) < 0.6] = np.nan
+        return values
+
+    return pd.DataFrame({
+        "created_at": created,
+        "type": ttype,
+        "score": score,
+        "is_baseline": rng.random(n_tests) < 0.001,
+        "local_time": local,
+        "date": local.date,
+        "hour": local.hour + local.minute / 60.0,
+        "stress": self_report(),
+        "sleepiness": self_report(),
+        "sharpness": self_report(),
+    })
+
+
+def _linear_slope(series: pd.Series) -> float | None:
+    """Compute linear regression slope of a series indexed by ordinal position."""
+    clean = series.dropna()
+    if len(clean) < 2:
+        return None
+    x = np.arange(len(clean), dtype=float)
+    slope, _, _, _, _ = stats.linregress(x, clean.values)
+    return float(slope)
+
+
+def _legacy_daily_agg(df: pd.DataFrame, test_type: str) -> pd.DataFrame:
+    """Aggregate a single test type to daily means."""
+    sub = df[df["type"] == test_type].copy()
+    if sub.empty:
+        return pd.DataFrame()
+    daily = sub.groupby("date").agg(
+        mean=("score", "mean"),
+        min=("score", "min"),
+        max=("score", "max"),
+        count=("score", "size"),
+    ).reset_index()
+    daily["date"] = pd.to_datetime(daily["date"])
+    return daily.sort_values("date")
+
+
+def _legacy_performance(df: pd.DataFrame) -> dict:
+    """``analyse_performance`` as it was before the single-groupby rewrite."""
+    result: dict = {}
+
+    # --- Baseline ---
+    baselines = df[df["is_baseline"] & (df["type"] == "READY")]
+    if baselines.empty:
+        baselines = df[df["is_baseline"]]
+    if not baselines.empty:
+        result["ready_baseline"] = float(baselines["score"].iloc[0])
+    else:
+        ready_scores = df.loc[df["type"] == "READY", "score"].dropna()
+        result["ready_baseline"] = float(ready_scores.max()) if len(ready_scores) else None
+
+    # --- Per-type stats ---
+    for ttype in ("READY", "AGILITY", "FOCUS"):
+        scores = df.loc[df["type"] == ttype, "score"].dropna()
+        if scores.empty:
+            result[ttype.lower()] = {"peak": None, "floor": None, "mean": None, "iqr": [None, None]}
+            continue
+        q1, q3 = float(scores.quantile(0.25)), float(scores.quantile(0.75))
+        result[ttype.lower()] = {
+            "peak": float(scores.max()),
+            "floor": float(scores.min()),
+            "mean": float(scores.mean()),
+            "iqr": [q1, q3],
+        }
+
+    # --- Daily Ready trajectory ---
+    daily_ready = _legacy_daily_agg(df, "READY")
+    if not daily_ready.empty:
+        daily_ready["rolling_7d"] = daily_ready["mean"].rolling(7, min_periods=1).mean()
+        result["daily_ready"] = daily_ready.to_dict(orient="records")
+
+        result["ready_7d_slope"] = _linear_slope(daily_ready["mean"].tail(7))
+        result["ready_overall_slope"] = _linear_slope(daily_ready["mean"])
+
+        baseline = result.get("ready_baseline")
+        if baseline:
+            daily_ready["pct_baseline"] = daily_ready["mean"] / baseline * 100
+            result["daily_ready"] = daily_ready.to_dict(orient="records")
+    else:
+        result["daily_ready"] = []
+        result["ready_7d_slope"] = None
+        result["ready_overall_slope"] = None
+
+    # --- Daily Agility / Focus ---
+    for ttype in ("AGILITY", "FOCUS"):
+        daily = _legacy_daily_agg(df, ttype)
+        result[f"daily_{ttype.lower()}"] = daily.to_dict(orient="records") if not daily.empty else []
+
+    # --- Self-report aggregation per day ---
+    sr_cols = ["stress", "sleepiness", "sharpness"]
+    existing_sr = [c for c in sr_cols if c in df.columns]
+    if existing_sr:
+        daily_sr = df.groupby("date")[existing_sr].mean().reset_index()
+        daily_sr["date"] = pd.to_datetime(daily_sr["date"])
+        result["daily_self_report"] = daily_sr.sort_values("date").to_dict(orient="records")
+    else:
+        result["daily_self_report"] = []
+
+    # --- Weekly aggregation ---
+    ready_df = df[df["type"] == "READY"].copy()
+    if not ready_df.empty:
+        ready_df["iso_week"] = ready_df["local_time"].dt.isocalendar().week.astype(int)
+        ready_df["iso_year"] = ready_df["local_time"].dt.isocalendar().year.astype(int)
+        ready_df["week_label"] = ready_df["iso_year"].astype(str) + "-W" + ready_df["iso_week"].astype(str).str.zfill(2)
+
+        weekly = ready_df.groupby("week_label").agg(
+            ready_mean=("score", "mean"),
+            ready_min=("score", "min"),
+            ready_max=("score", "max"),
+            test_count=("score", "size"),
+            date_min=("date", "min"),
+            date_max=("date", "max"),
+        ).reset_index().sort_values("week_label")
+
+        baseline = result.get("ready_baseline")
+        if baseline:
+            weekly["ready_pct_baseline"] = weekly["ready_mean"] / baseline * 100
+
+        # Week-over-week diffs
+        weekly["ready_change_pct"] = weekly["ready_mean"].pct_change() * 100
+
+        # Merge in self-report weekly means
+        if existing_sr:
+            all_tests = df.copy()
+            all_tests["iso_week"] = all_tests["local_time"].dt.isocalendar().week.astype(int)
+            all_tests["iso_year"] = all_tests["local_time"].dt.isocalendar().year.astype(int)
+            all_tests["week_label"] = all_tests["iso_year"].astype(str) + "-W" + all_tests["iso_week"].astype(str).str.zfill(2)
+            weekly_sr = all_tests.groupby("week_label")[existing_sr].mean().reset_index()
+            weekly = weekly.merge(weekly_sr, on="week_label", how="left")
+
+        # Agility weekly
+        agility_df = df[df["type"] == "AGILITY"].copy()
+        if not agility_df.empty:
+            agility_df["iso_week"] = agility_df["local_time"].dt.isocalendar().week.astype(int)
+            agility_df["iso_year"] = agility_df["local_time"].dt.isocalendar().year.astype(int)
+            agility_df["week_label"] = agility_df["iso_year"].astype(str) + "-W" + agility_df["iso_week"].astype(str).str.zfill(2)
+            weekly_ag = agility_df.groupby("week_label")["score"].mean().reset_index().rename(columns={"score": "agility_mean"})
+            weekly = weekly.merge(weekly_ag, on="week_label", how="left")
+
+        # Focus weekly
+        focus_df = df[df["type"] == "FOCUS"].copy()
+        if not focus_df.empty:
+            focus_df["iso_week"] = focus_df["local_time"].dt.isocalendar().week.astype(int)
+            focus_df["iso_year"] = focus_df["local_time"].dt.isocalendar().year.astype(int)
+            focus_df["week_label"] = focus_df["iso_year"].astype(str) + "-W" + focus_df["iso_week"].astype(str).str.zfill(2)
+            weekly_fc = focus_df.groupby("week_label")["score"].mean().reset_index().rename(columns={"score": "focus_mean"})
+            weekly = weekly.merge(weekly_fc, on="week_label", how="left")
+
+        result["weekly"] = weekly.to_dict(orient="records")
+    else:
+        result["weekly"] = []
+
+    return result
+
+
+def _same(a, b, path=""):
+    if isinstance(a, dict):
+        assert list(a) == list(b), path
+        for k in a:
+            _same(a[k], b[k], f"{path}/{k}")
+    elif isinstance(a, list):
+        assert len(a) == len(b), path
+        for i, (x, y) in enumerate(zip(a, b)):
+            _same(x, y, f"{path}[{i}]")
+    elif isinstance(a, float) and isinstance(b, float):
+        # Weekly means are sums of daily sums, so they may differ in the last bit
+        # (amplified in week-over-week changes close to zero).
+        assert (math.isnan(a) and math.isnan(b)) or math.isclose(a, b, rel_tol=1e-12, abs_tol=1e-9), (path, a, b)
+    else:
+        assert type(a) is type(b) and a == b, (path, a, b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tests", type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = synthetic_tests(args.tests)
+    t0 = time.perf_counter()
+    legacy = _legacy_performance(df)
+    t_legacy = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    current = analyse_performance(df)
+    t_current = time.perf_counter() - t0
+    # The per-day rolling slope was added after the legacy version.
+    _same(legacy, dict(current, daily_ready=[
+        {k: v for k, v in day.items() if k != "slope_7d"} for day in current["daily_ready"]
+    ]))
+
+    print(f"tests: {args.tests:,}  days: {df['date'].nunique():,}  weeks: {len(current['weekly']):,}")
+    print(f"legacy filter/merge:  {t_legacy:7.3f} s")
+    print(f"single groupby:       {t_current:7.3f} s  ({t_legacy / t_current:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
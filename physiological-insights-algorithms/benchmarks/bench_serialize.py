@@ -0,0 +1,132 @@
+"""Benchmark writing and reading the analysis packet in each output format.
+
+Runs the Tier 1 analysers on a synthetic history (tests and sensor epochs,
+one year by default), assembles ``analysis_full.json``'s packet and times
+the previous ``json.dump(indent=2, default=str)`` against every
+``serialize`` format, with and without zstd and with row or columnar
+time-series sections, reporting file size and write and read time. Every
+format must read back to the same document, and the columnar sections to
+the original rows.
+
+    python benchmarks/bench_serialize.py --days 365 [--no-orjson]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_performance import synthetic_tests
+from benchmarks.synthetic import EPOCHS_PER_DAY, synthetic_epochs
+from physiological_insights import serialize
+from physiological_insights.columnar import SECTIONS, columnar_packet, from_columns, section_frame
+from physiological_insights.activity import analyse_activity
+from physiological_insights.bootstrap import bootstrap_confidence
+from physiological_insights.circadian import analyse_circadian
+from physiological_insights.context_packet import build_context_packet
+from physiological_insights.epoch_features import add_epoch_features
+from physiological_insights.hrv import analyse_hrv
+from physiological_insights.ingest import _normalize_metrics_chunk
+from physiological_insights.patterns import detect_patterns
+from physiological_insights.performance import analyse_performance
+from physiological_insights.readiness import assign_readiness_tiers
+from physiological_insights.sleep import analyse_sleep
+from physiological_insights.strain import analyse_strain
+
+
+def synthetic_packet(days: int) -> tuple[dict, dict]:
+    """(packet, results) for ``days`` of synthetic tests and sensor epochs, as ``cli.main`` builds them."""
+    tests_df = synthetic_tests(days * 12)
+    tests_df["context_note"] = ""
+    metrics_df = _normalize_metrics_chunk(synthetic_epochs(days * EPOCHS_PER_DAY))
+    add_epoch_features(metrics_df)
+
+    sleep = analyse_sleep(metrics_df)
+    results = {
+        "performance": analyse_performance(tests_df),
+        "circadian": analyse_circadian(tests_df),
+        "hrv": analyse_hrv(metrics_df, sleep_nights=sleep["nights"]),
+        "sleep": sleep,
+        "activity": analyse_activity(metrics_df),
+        "strain": analyse_strain(metrics_df),
+    }
+    results["confidence"] = bootstrap_confidence(tests_df)
+    results["readiness"] = assign_readiness_tiers(results)
+    results["patterns"] = detect_patterns(tests_df, results)
+    packet = build_context_packet(tests_df, metrics_df, None, results, "graphs")
+    return packet, results
+
+
+def _legacy_write(obj, path: str) -> str:
+    with open(path, "w") as f:
+        json.dump(obj, f, indent=2, default=str)
+    return path
+
+
+def _legacy_read(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--no-orjson", action="store_true", help="Encode with the standard library even if orjson is installed")
+    args = parser.parse_args()
+    if args.no_orjson:
+        sys.modules["orjson"] = None  # makes ``import orjson`` fail
+
+    t0 = time.perf_counter()
+    packet, _ = synthetic_packet(args.days)
+    print(f"{args.days} days of history; packet built in {time.perf_counter() - t0:.1f} s")
+    print(f"orjson: {'yes' if serialize._optional('orjson') else 'no'}")
+    columnar = columnar_packet(packet)
+    for path in SECTIONS:
+        rows, section = packet, columnar
+        for key in path:
+            rows, section = (rows or {}).get(key), (section or {}).get(key)
+        if isinstance(rows, list):
+            assert from_columns(section) == serialize.to_jsonable(rows), ".".join(path)
+    rows = packet["daily_summaries"]
+    t0 = time.perf_counter()
+    section_frame(rows)
+    t_rows = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    section_frame(columnar["daily_summaries"])
+    print(f"daily_summaries -> DataFrame: rows {t_rows * 1000:.1f} ms, columnar {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    variants = [("json.dump(default=str)", packet, _legacy_write, _legacy_read, None, None)]
+    for layout, obj in (("", packet), (" columnar", columnar)):
+        for fmt in serialize.FORMATS:
+            for compress in (None,) + serialize.COMPRESSIONS:
+                if serialize.check_available(fmt, compress):
+                    continue
+                name = fmt + (f"+{compress}" if compress else "") + layout
+                variants.append((name, obj, None, serialize.read, fmt, compress))
+
+    reference = {}
+    print(f"{'format':<30} {'size KB':>9} {'write ms':>9} {'read ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, obj, write, read, fmt, compress in variants:
+            base = os.path.join(tmp, "analysis_full.json")
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                path = write(obj, base) if write else serialize.write(obj, base, fmt, compress)
+            t_write = (time.perf_counter() - t0) / args.repeat
+            t0 = time.perf_counter()
+            for _ in range(args.repeat):
+                loaded = read(path)
+            t_read = (time.perf_counter() - t0) / args.repeat
+
+            assert loaded == reference.setdefault(id(obj), loaded), name
+            print(f"{name:<30} {os.path.getsize(path) / 1024:9.1f} {t_write * 1000:9.1f} {t_read * 1000:9.1f}")
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Parity check and scaling benchmark for ``sleep.analyse_sleep``.
+
+Runs the single-pass implementation against the previous per-night loop
+(kept here verbatim as ``_per_night_sleep``) and the online
+``SleepStateMachine`` on perturbed synthetic streams: NaN heart rate,
+missing or all-NaN RMSSD, off-wrist gaps and both DST transitions. Outputs
+must match exactly. Then times both at increasing lengths to show linear
+scaling.
+
+    python benchmarks/bench_sleep.py --parity-days 20 --days 90 365
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import EPOCHS_PER_DAY, synthetic_epochs
+from physiological_insights.epoch_features import sleep_energy
+from physiological_insights.ingest import _metrics_dtypes, _normalize_metrics_chunk
+from physiological_insights.sleep import analyse_sleep
+from physiological_insights.sleep_stream import SleepStateMachine
+
+_DST_STARTS = (1772600000, 1792500000)  # a few days before 2026-03-08 and 2026-11-01
+
+
+def _per_night_sleep(df: pd.DataFrame) -> dict:
+    """``analyse_sleep`` as it was before the single-pass rewrite."""
+    wear = df[df["wear_mode"] == "wear_on"].copy()
+    if wear.empty or "heart_rate_mean" not in wear.columns:
+        return {"nights": [], "latest_night": None}
+
+    wear = wear.sort_values("datetime").reset_index(drop=True)
+    wear["acc_energy"] = sleep_energy(wear)
+    wear["night_date"] = (wear["datetime_et"] - pd.Timedelta(hours=18)).dt.date
+
+    nights = []
+    for night_date, night_df in wear.groupby("night_date"):
+        rmssd = night_df.get("cardio_RMSSD_ms")
+        hour_of_day = night_df["datetime_et"].dt.hour
+        sleep_window = night_df[(hour_of_day >= 21) | (hour_of_day <= 3)]
+        if sleep_window.empty:
+            continue
+
+        onset_candidates = sleep_window[sleep_window["heart_rate_mean"] < 65]
+        if rmssd is not None and not rmssd.isna().all():
+            onset_candidates = onset_candidates[onset_candidates.get("cardio_RMSSD_ms", pd.Series(dtype=float)) > 70]
+        if onset_candidates.empty:
+            onset_candidates = sleep_window[sleep_window["heart_rate_mean"] < 70]
+        if onset_candidates.empty:
+            continue
+
+        sleep_onset = onset_candidates["datetime_et"].iloc[0]
+        post_onset = night_df[night_df["datetime_et"] >= sleep_onset]
+        wake_candidates = post_onset[post_onset["heart_rate_mean"] >= 70]
+
+        if not wake_candidates.empty:
+            wake_idx = wake_candidates.index
+            consecutive = 1
+            sleep_offset_idx = wake_idx[0]
+            for i in range(1, len(wake_idx)):
+                if wake_idx[i] == wake_idx[i - 1] + 1:
+                    consecutive += 1
+                    if consecutive >= 5:
+                        sleep_offset_idx = wake_idx[i - consecutive + 1]
+                        break
+                else:
+                    consecutive = 1
+            sleep_offset = post_onset.loc[sleep_offset_idx, "datetime_et"]
+        else:
+            sleep_offset = post_onset["datetime_et"].iloc[-1]
+
+        duration_min = (sleep_offset - sleep_onset).total_seconds() / 60
+        if duration_min < 60:
+            continue
+
+        sleep_period = night_df[
+            (night_df["datetime_et"] >= sleep_onset) & (night_df["datetime_et"] <= sleep_offset)
+        ]
+        hr_rolling = sleep_period["heart_rate_mean"].rolling(60, min_periods=10).mean()
+        hr_nadir = float(hr_rolling.min()) if not hr_rolling.isna().all() else None
+
+        wake_episodes = 0
+        if not sleep_period.empty:
+            wake_epochs = sleep_period[(sleep_period["heart_rate_mean"] > 70) & (sleep_period["acc_energy"] > 500)]
+            if not wake_epochs.empty:
+                wake_episodes = int(np.sum(np.diff(wake_epochs.index.values) > 5)) + 1
+
+        continuity = round(1 - (wake_episodes * 5 / max(duration_min, 1)), 3)
+        continuity = max(0.0, min(1.0, continuity))
+        nights.append({
+            "night_date": str(night_date),
+            "sleep_onset": str(sleep_onset),
+            "sleep_offset": str(sleep_offset),
+            "duration_min": round(duration_min, 1),
+            "hr_nadir_bpm": round(hr_nadir, 1) if hr_nadir else None,
+            "wake_episodes": wake_episodes,
+            "continuity_score": continuity,
+        })
+
+    return {"nights": nights, "latest_night": nights[-1] if nights else None}
+
+
+def _frame(days: float, seed: int, start_ts: int | None = None) -> pd.DataFrame:
+    kwargs = {} if start_ts is None else {"start_ts": start_ts}
+    df = synthetic_epochs(int(days * EPOCHS_PER_DAY), seed=seed, **kwargs)
+    return _normalize_metrics_chunk(df.astype(_metrics_dtypes(df.columns)))
+
+
+def _streamed_nights(df: pd.DataFrame, batch: int) -> list[dict]:
+    machine = SleepStateMachine()
+    events = []
+    for start in range(0, len(df), batch):
+        events.extend(machine.update(df.iloc[start:start + batch]))
+    events.extend(machine.flush())
+    return [e["night"] for e in events if e["event"] == "night"]
+
+
+def _parity_cases(days: float):
+    rng = np.random.default_rng(7)
+    yield "baseline", _frame(days, 1)
+    for start in _DST_STARTS:
+        yield f"dst@{start}", _frame(days, 2, start)
+
+    df = _frame(days, 3)
+    df.loc[rng.random(len(df)) < 0.2, "heart_rate_mean"] = np.nan
+    yield "nan-hr", df
+
+    df = _frame(days, 4)
+    df["heart_rate_mean"] += rng.normal(0, 8, len(df))  # more threshold crossings
+    yield "noisy-hr", df
+
+    yield "no-rmssd", _frame(days, 5).drop(columns="cardio_RMSSD_ms")
+
+    df = _frame(days, 6)
+    df["cardio_RMSSD_ms"] = np.nan
+    yield "all-nan-rmssd", df
+
+    df = _frame(days, 7)
+    gap_day = df["datetime"].dt.floor("D").isin(df["datetime"].dt.floor("D").unique()[1::4])
+    df.loc[gap_day, "wear_mode"] = "wear_off"
+    yield "off-wrist-days", df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--parity-days", type=float, default=20)
+    parser.add_argument("--days", type=float, nargs="+", default=[90, 365])
+    args = parser.parse_args()
+
+    for name, df in _parity_cases(args.parity_days):
+        expected = _per_night_sleep(df.copy())
+        actual = analyse_sleep(df.copy())
+        assert actual == expected, f"parity mismatch in case {name!r}"
+        assert _streamed_nights(df, batch=97) == expected["nights"], f"stream mismatch in case {name!r}"
+        print(f"parity ok: {name:<16} {len(actual['nights'])} nights")
+
+    print()
+    for days in args.days:
+        df = _frame(days, 0)
+        for label, run in (("batch", lambda: analyse_sleep(df)["nights"]),
+                           ("stream", lambda: _streamed_nights(df, batch=2880))):
+            t0 = time.perf_counter()
+            nights = run()
+            elapsed = time.perf_counter() - t0
+            print(f"{label:<6} {days:7.0f} days  {len(df):>10,} epochs  {len(nights):5d} nights  "
+                  f"{elapsed:7.3f} s  {elapsed / len(df) * 1e6:6.2f} us/epoch")
+
+
+if __name__ == "__main__":
+    main()
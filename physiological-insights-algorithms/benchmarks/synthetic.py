@@ -0,0 +1,96 @@
+"""Synthetic decoded-metrics epoch files for benchmarking the Tier-1 pipeline.
+
+The generator mimics the shape of a real decoded-metrics export: 30-second
+epochs, a nightly sleep period with low HR / high RMSSD, daytime activity
+bursts, off-wrist gaps, and a block of sensor columns the analysers never read.
+
+    python benchmarks/synthetic.py --days 365 --out /tmp/epochs.csv
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+EPOCH_SEC = 30
+EPOCHS_PER_DAY = 24 * 3600 // EPOCH_SEC
+_START_TS = 1767225600  # 2026-01-01 00:00 UTC
+
+# Unused vendor columns, present in real exports and skipped by the pruned loader.
+_UNUSED_COLUMNS = [f"ppg_ch{i}_{stat}" for i in range(4) for stat in ("mean", "std", "min", "max")] + [
+    "skin_temp_c", "battery_pct", "ble_rssi", "firmware_flags",
+]
+
+
+def synthetic_epochs(n_epochs: int, seed: int = 0, start_ts: int = _START_TS) -> pd.DataFrame:
+    """Return ``n_epochs`` rows of synthetic decoded metrics."""
+    rng = np.random.default_rng(seed)
+    ts = start_ts + np.arange(n_epochs, dtype=np.int64) * EPOCH_SEC
+    # Local (UTC-5) hour of day drives the sleep/wake cycle.
+    hour = ((ts - 5 * 3600) % 86400) / 3600.0
+    asleep = (hour >= 23) | (hour < 7)
+
+    hr = np.where(asleep, 56, 74) + rng.normal(0, 6, n_epochs)
+    rmssd = np.where(asleep, 85, 40) + rng.normal(0, 15, n_epochs)
+
+    active = ~asleep & (rng.random(n_epochs) < 0.08)
+    burst = np.convolve(active.astype(float), np.ones(20), mode="same") > 0
+    hr = hr + burst * rng.uniform(20, 60, n_epochs)
+
+    motion = np.where(asleep, 10, 120) * rng.lognormal(0, 0.8, n_epochs) + burst * 900
+    axis_share = rng.dirichlet([2, 2, 2], n_epochs)
+
+    wear_on = rng.random(n_epochs) > 0.03
+    day = np.arange(n_epochs) // EPOCHS_PER_DAY
+    steps = np.cumsum(burst * rng.integers(20, 60, n_epochs) + ~asleep * rng.integers(0, 3, n_epochs))
+    calories = np.cumsum(np.where(asleep, 0.5, 0.8) + burst * 3.0)
+
+    data = {
+        "timestamp": ts,
+        "wear_mode": np.where(wear_on, "wear_on", "wear_off"),
+        "lifecycle_state": np.where(day % 30 == 29, "charging", "active"),
+        "acc_x_count": rng.integers(900, 1000, n_epochs),
+        "heart_rate_mean": np.round(hr, 1),
+        "cardio_RMSSD_ms": np.round(np.clip(rmssd, 5, None), 1),
+        "cardio_SDNN_ms": np.round(np.clip(rmssd * 1.3 + rng.normal(0, 5, n_epochs), 5, None), 1),
+        "cardio_confidence_median": np.round(rng.uniform(0.5, 1.0, n_epochs), 3),
+        "steps": steps,
+        "calories": np.round(calories, 1),
+    }
+    for i, axis in enumerate("xyz"):
+        data[f"acc_{axis}_rms"] = np.round(motion * axis_share[:, i], 2)
+        data[f"acc_{axis}_energyPerSec"] = np.round(motion * axis_share[:, i] * 1.7, 2)
+    for c in _UNUSED_COLUMNS:
+        data[c] = np.round(rng.normal(0, 1, n_epochs), 4)
+    return pd.DataFrame(data)
+
+
+def write_synthetic_csv(path: str, days: float, seed: int = 0, block_days: int = 30) -> int:
+    """Write ``days`` of synthetic epochs to ``path`` in blocks; return the row count."""
+    total = int(days * EPOCHS_PER_DAY)
+    block = block_days * EPOCHS_PER_DAY
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    written = 0
+    with open(path, "w") as f:
+        while written < total:
+            n = min(block, total - written)
+            df = synthetic_epochs(n, seed=seed + written, start_ts=_START_TS + written * EPOCH_SEC)
+            df.to_csv(f, index=False, header=written == 0)
+            written += n
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic decoded-metrics CSV.")
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+    rows = write_synthetic_csv(args.out, args.days, seed=args.seed)
+    size_mb = os.path.getsize(args.out) / 1e6
+    print(f"wrote {rows} epochs ({size_mb:.0f} MB) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@
 import numpy as np
 import pandas as pd
 
+from physiological_insights.epoch_features import activity_energy
+
 
 # Thresholds calibrated for wrist-worn 30-sec epoch data
 _SEDENTARY_ENERGY = 50
@@ -10,122 +12,126 @@ _LIGHT_ENERGY = 200
 _MODERATE_ENERGY = 600
 
 
-def _epoch_energy(row: pd.Series) -> float:
-    """Total accelerometer energy from energyPerSec columns."""
-    cols = [c for c in row.index if "energyPerSec" in c and c.startswith("acc_")]
-    if cols:
-        vals = row[cols].dropna()
-        return float(vals.sum()) if not vals.empty else 0.0
-    rms_cols = [c for c in row.index if c.startswith("acc_") and "rms" in c.lower()]
-    if rms_cols:
-        vals = row[rms_cols].dropna()
-        return float(np.sqrt((vals ** 2).sum())) if not vals.empty else 0.0
-    return 0.0
+ACTIVITY_LEVELS = ("sedentary", "light", "moderate", "vigorous")
+_LOAD_LABELS = np.array(["low", "moderate", "high"])
+_LOAD_BOUNDS = [500, 2000]
+
+_EXERCISE_HR_BPM = 100
+# Exercise epochs more than this many rows apart start a new session.
+_EXERCISE_GAP_ROWS = 2
+_EXERCISE_MIN_EPOCHS = 4  # at least 2 min
+
+
+def _classify_epochs(energy: np.ndarray, hr: np.ndarray) -> np.ndarray:
+    """Activity level per epoch as an index into ``ACTIVITY_LEVELS``."""
+    return np.select(
+        [
+            (energy < _SEDENTARY_ENERGY) & (hr < 80),
+            energy < _LIGHT_ENERGY,
+            (energy < _MODERATE_ENERGY) | ((hr >= 80) & (hr < 100)),
+        ],
+        [0, 1, 2],
+        default=3,
+    ).astype(np.int8)
 
 
-def _classify_epoch(energy: float, hr: float) -> str:
-    if energy < _SEDENTARY_ENERGY and hr < 80:
-        return "sedentary"
-    elif energy < _LIGHT_ENERGY:
-        return "light"
-    elif energy < _MODERATE_ENERGY or (80 <= hr < 100):
-        return "moderate"
-    else:
-        return "vigorous"
+def _counter_range(day: np.ndarray, values: pd.Series) -> np.ndarray:
+    """Per-day max - min of a cumulative counter; NaN for days without readings."""
+    g = values.groupby(day, sort=True)
+    return (g.max() - g.min()).to_numpy(dtype=np.float64)
 
 
 def analyse_activity(df: pd.DataFrame) -> dict:
-    """Classify epochs and compute daily physical load metrics."""
-    wear = df[df["wear_mode"] == "wear_on"].copy()
+    """Classify epochs and compute daily physical load metrics.
+
+    Epochs are classified with one ``np.select`` over the whole frame and
+    aggregated per day with a single ``groupby`` plus a day x level pivot of
+    epoch counts.
+    """
+    wear = df[df["wear_mode"] == "wear_on"]
     if wear.empty:
         return {"daily_activity": [], "exercise_sessions": []}
 
-    wear["acc_energy"] = wear.apply(_epoch_energy, axis=1)
+    energy = activity_energy(wear)
     hr_col = "heart_rate_mean" if "heart_rate_mean" in wear.columns else None
-    hr_values = wear[hr_col].fillna(60) if hr_col else pd.Series(60, index=wear.index)
-
-    wear["activity_level"] = [
-        _classify_epoch(e, h) for e, h in zip(wear["acc_energy"], hr_values)
-    ]
-
-    wear["date"] = wear["datetime_et"].dt.date
+    hr = wear[hr_col].to_numpy(dtype=np.float64) if hr_col else np.full(len(wear), np.nan)
+    level = _classify_epochs(energy, np.nan_to_num(hr, nan=60.0))
+
+    day, days = pd.factorize(wear["datetime_et"].dt.normalize(), sort=True)
+    n_days = len(days)
+    moderate_vigorous = level >= 2
+    by_day = pd.DataFrame({
+        "energy": np.where(moderate_vigorous, energy, 0.0),
+        "mv": moderate_vigorous,
+    }).groupby(day, sort=True).agg(
+        total=("mv", "size"), mv_epochs=("mv", "sum"), load=("energy", "sum"),
+    )
+    counts = np.bincount(
+        day * len(ACTIVITY_LEVELS) + level, minlength=n_days * len(ACTIVITY_LEVELS)
+    ).reshape(n_days, len(ACTIVITY_LEVELS))
+
+    # Steps and calories are cumulative counters — daily total = max − min
+    steps = _counter_range(day, wear["steps"]) if "steps" in wear.columns else np.full(n_days, np.nan)
+    calories = _counter_range(day, wear["calories"]) if "calories" in wear.columns else np.full(n_days, np.nan)
+
+    load = by_day["load"].to_numpy()
+    has_load = by_day["mv_epochs"].to_numpy() > 0
+    load_label = _LOAD_LABELS[np.digitize(np.where(has_load, load, 0.0), _LOAD_BOUNDS)]
+    total = by_day["total"].to_numpy()
 
-    # Daily aggregation
     daily_list = []
-    for date, day_df in wear.groupby("date"):
-        counts = day_df["activity_level"].value_counts()
-        total = len(day_df)
-        moderate_vigorous = day_df[day_df["activity_level"].isin(["moderate", "vigorous"])]
-        load_energy = float(moderate_vigorous["acc_energy"].sum()) if not moderate_vigorous.empty else 0
-
-        # Steps and calories are cumulative counters — daily total = max − min
-        steps = 0
-        if "steps" in day_df.columns:
-            s = day_df["steps"].dropna()
-            if not s.empty:
-                steps = max(0, float(s.max() - s.min()))
-
-        calories = 0
-        if "calories" in day_df.columns:
-            c = day_df["calories"].dropna()
-            if not c.empty:
-                calories = max(0, float(c.max() - c.min()))
-
+    for i, date in enumerate(days):
         daily_list.append({
-            "date": str(date),
-            "sedentary_epochs": int(counts.get("sedentary", 0)),
-            "light_epochs": int(counts.get("light", 0)),
-            "moderate_epochs": int(counts.get("moderate", 0)),
-            "vigorous_epochs": int(counts.get("vigorous", 0)),
-            "total_epochs": total,
-            "moderate_vigorous_min": round((counts.get("moderate", 0) + counts.get("vigorous", 0)) * 0.5, 1),
-            "physical_load": round(load_energy, 1),
-            "exercise_load": _load_label(load_energy),
-            "steps": steps,
-            "calories": round(calories, 1),
+            "date": str(date.date()),
+            "sedentary_epochs": int(counts[i, 0]),
+            "light_epochs": int(counts[i, 1]),
+            "moderate_epochs": int(counts[i, 2]),
+            "vigorous_epochs": int(counts[i, 3]),
+            "total_epochs": int(total[i]),
+            "moderate_vigorous_min": round((int(counts[i, 2]) + int(counts[i, 3])) * 0.5, 1),
+            "physical_load": round(float(load[i]), 1) if has_load[i] else 0,
+            "exercise_load": str(load_label[i]),
+            "steps": float(steps[i]) if steps[i] > 0 else 0,
+            "calories": round(float(calories[i]), 1) if calories[i] > 0 else 0,
         })
 
     # Exercise session detection: contiguous epochs with HR > 100 and high acc energy
-    sessions = _detect_exercise_sessions(wear, hr_col)
+    sessions = _detect_exercise_sessions(wear, hr_col, hr, energy) if hr_col else []
 
     return {"daily_activity": daily_list, "exercise_sessions": sessions}
 
 
-def _load_label(energy: float) -> str:
-    if energy < 500:
-        return "low"
-    elif energy < 2000:
-        return "moderate"
-    else:
-        return "high"
-
-
-def _detect_exercise_sessions(df: pd.DataFrame, hr_col: str | None) -> list[dict]:
-    """Find contiguous epochs of elevated HR + accelerometer energy."""
-    if hr_col is None:
-        return []
-
-    mask = (df[hr_col] > 100) & (df["acc_energy"] > _MODERATE_ENERGY)
-    exercise_epochs = df[mask]
-    if exercise_epochs.empty:
+def _detect_exercise_sessions(wear: pd.DataFrame, hr_col: str, hr: np.ndarray,
+                              energy: np.ndarray) -> list[dict]:
+    """Find runs of elevated HR + accelerometer energy via run-length boundaries on the row index."""
+    pos = np.flatnonzero((hr > _EXERCISE_HR_BPM) & (energy > _MODERATE_ENERGY))
+    if len(pos) == 0:
         return []
 
-    sessions = []
-    idx_arr = exercise_epochs.index.values
-    groups = np.split(idx_arr, np.where(np.diff(idx_arr) > 2)[0] + 1)
-
-    for group in groups:
-        if len(group) < 4:  # at least 2 min
-            continue
-        start = df.loc[group[0], "datetime_et"]
-        end = df.loc[group[-1], "datetime_et"]
-        dur = (end - start).total_seconds() / 60
-        avg_hr = float(df.loc[group, hr_col].mean())
-        sessions.append({
+    row = wear.index.to_numpy()[pos]
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(row) > _EXERCISE_GAP_ROWS) + 1])
+    ends = np.append(starts[1:], len(pos))
+    keep = ends - starts >= _EXERCISE_MIN_EPOCHS
+    starts, ends = starts[keep], ends[keep]
+    first, last = pos[starts], pos[ends - 1]
+    # Averaged in the column's own dtype so values match a pandas mean per session.
+    session_hr = wear[hr_col].to_numpy()[pos]
+    avg_hr = [session_hr[a:b].mean() for a, b in zip(starts, ends)]
+
+    dt_et = wear["datetime_et"]
+    start_ts = dt_et.iloc[first]
+    end_ts = dt_et.iloc[last]
+    # datetime_et is tz-aware; subtract int64 UTC instants (as in sleep.py) so the
+    # difference is numeric and stays correct across DST changes.
+    t = dt_et.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy().astype("datetime64[ns]").astype(np.int64)
+    duration = (t[last] - t[first]) / 60e9
+
+    return [
+        {
             "start": str(start),
             "end": str(end),
-            "duration_min": round(dur, 1),
-            "avg_hr": round(avg_hr, 1),
-        })
-
-    return sessions
+            "duration_min": round(float(dur), 1),
+            "avg_hr": round(float(h), 1),
+        }
+        for start, end, dur, h in zip(start_ts, end_ts, duration, avg_hr)
+    ]
@@ -1,11 +1,73 @@
-"""Build the lean agent_payload.json (<2K tokens) from the full analysis packet."""
+"""Build the lean agent_payload.json from the full analysis packet, within a token budget.
+
+``estimate_tokens`` approximates a BPE tokenizer's count for the compact JSON
+without loading one: it counts letter runs, digit groups and punctuation
+runs, the pieces tokenizers split JSON into, with per-class weights that
+``benchmarks/bench_payload_budget.py --fit`` refits against a real tokenizer.
+The weights were fitted on the sections of a one-year synthetic payload at
+each default budget with o200k_base: total error +0.8%, median per-section
+error 6%, worst section 24% (``len(json) // 4`` is -26% in total). Whole
+payloads built from Daniel's and Jerry's data land within -11% to +3% of
+the real count, so budgets below ~500 can run slightly over.
+When the payload is over budget, sections are summarized and then dropped,
+lowest priority (``SECTION_PRIORITY``) first; ``budget`` records what was cut.
+"""
 
 import datetime
-import numpy as np
+import json
+import re
 
+import numpy as np
 
-def build_agent_payload(full_packet: dict, results: dict) -> dict:
-    """Deterministically trim analysis_full.json into an agent-ready payload."""
+# Bootstrap acrophase CI width (hours) up to which the peak window is high / medium confidence.
+_PEAK_CI_HIGH_HOURS = 3.0
+_PEAK_CI_MEDIUM_HOURS = 6.0
+# Share of bootstrap resamples agreeing on the chronotype for high / medium confidence.
+_CHRONOTYPE_AGREEMENT_HIGH = 0.9
+_CHRONOTYPE_AGREEMENT_MEDIUM = 0.7
+# Most recent points of each slope trajectory kept in the payload.
+_TRAJECTORY_POINTS = 7
+
+TOKEN_BUDGET = 2000
+# Payload sections, most important first; the last ones are cut first when over budget.
+SECTION_PRIORITY = (
+    "alerts", "agent_state", "recovery", "sleep_debt", "latest_day", "baseline", "strain",
+    "circadian", "data_quality", "sleep_performance", "sleep_architecture_summary", "meta", "trends",
+)
+# Fields a section keeps when summarized (sections not listed keep their scalar fields).
+_SUMMARY_FIELDS = {
+    "agent_state": ("readiness_regime", "recommended_strain_ceiling", "deep_work_capacity",
+                    "peak_cognitive_window_local"),
+    "recovery": ("latest", "zone", "trend", "recovery_limiting_factor"),
+    "sleep_debt": ("current_debt_hours", "trend", "recommended_bedtime_tonight_local"),
+    "latest_day": ("date", "readiness_tier", "ready_pct_baseline"),
+    "baseline": ("ready_score", "agility_peak", "rmssd_sleep_peak_ms"),
+    "strain": ("latest_score", "latest_level", "rest_day_overdue"),
+    "circadian": ("estimated_peak_window", "worst_window", "chronotype_estimate"),
+    "data_quality": ("overall_confidence", "chronotype_confidence"),
+    "sleep_performance": ("composite_score",),
+    "sleep_architecture_summary": ("avg_deep_pct", "avg_rem_pct", "rem_debt_min_3night"),
+    "meta": ("analysis_generated_at",),
+    "trends": ("ready_7d_slope", "ready_trend_direction", "rmssd_7d_slope", "agility_trend"),
+}
+_ALERT_SUMMARY_FIELDS = ("id", "severity", "message")
+
+# Tokens per letter run, per started group of 3 digits and per punctuation run, plus the
+# extra tokens per further _WORD_CHARS letters in a run (long keys split into sub-words).
+# Fitted against o200k_base (the default gpt-4o-mini model's encoding); see the module docstring.
+_TOKEN_WEIGHTS = {"word": 0.36, "word_extra": 0.43, "digits": 1.01, "punct": 1.29}
+_WORD_CHARS = 6
+_PIECE_RE = re.compile(r"([A-Za-z]+)|([0-9]+)|([^A-Za-z0-9\s]+)")
+
+
+def build_agent_payload(full_packet: dict, results: dict, token_budget: int | None = TOKEN_BUDGET,
+                        priority: tuple = SECTION_PRIORITY) -> dict:
+    """Deterministically trim analysis_full.json into an agent-ready payload.
+
+    With ``token_budget`` (None for no limit) sections are summarized, then
+    dropped, in reverse ``priority`` order until ``estimate_tokens`` fits;
+    ``schema_version`` and ``budget`` are always kept.
+    """
     payload = {
         "schema_version": "3.0",
         "meta": _build_meta(full_packet),
@@ -20,9 +82,118 @@ def build_agent_payload(full_packet: dict, results: dict) -> dict:
         "sleep_performance": _trim_sleep_performance(full_packet),
         "sleep_architecture_summary": _trim_arch_summary(full_packet),
         "strain": _build_strain(full_packet, results),
-        "trends": full_packet.get("trends"),
+        "trends": _trim_trends(full_packet),
     }
-    return _strip_nulls(payload)
+    payload = _strip_nulls(payload)
+    if token_budget is not None:
+        payload = _fit_budget(payload, token_budget, priority)
+    return payload
+
+
+# ---------------------------------------------------------------------------
+# Token budget
+# ---------------------------------------------------------------------------
+
+def token_pieces(text: str) -> dict:
+    """Counts of the piece classes ``estimate_tokens`` weighs, for one string."""
+    counts = dict.fromkeys(_TOKEN_WEIGHTS, 0)
+    for word, digits, punct in _PIECE_RE.findall(text):
+        if word:
+            counts["word"] += 1
+            counts["word_extra"] += (len(word) - 1) // _WORD_CHARS
+        elif digits:
+            counts["digits"] += (len(digits) + 2) // 3
+        else:
+            counts["punct"] += 1
+    return counts
+
+
+def estimate_tokens(obj) -> int:
+    """Approximate tokenizer count of ``obj`` as compact JSON (strings are counted as is)."""
+    return round(_weighted_pieces(obj))
+
+
+def _weighted_pieces(obj) -> float:
+    text = obj if isinstance(obj, str) else json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+    counts = token_pieces(text)
+    return sum(_TOKEN_WEIGHTS[k] * n for k, n in counts.items())
+
+
+def _summarize_section(name: str, section):
+    if name == "alerts":
+        return [{k: a[k] for k in _ALERT_SUMMARY_FIELDS if k in a} for a in section]
+    if not isinstance(section, dict):
+        return section
+    fields = _SUMMARY_FIELDS.get(name)
+    if fields is None:
+        return {k: v for k, v in section.items() if not isinstance(v, (dict, list))}
+    return {k: section[k] for k in fields if k in section}
+
+
+def _fit_budget(payload: dict, token_budget: int, priority: tuple) -> dict:
+    """Summarize, then drop, one section at a time from the lowest priority until the payload fits.
+
+    Section sizes are estimated once each (as ``{name: section}``) and updated
+    as they change; the ``budget`` record added to the payload counts towards
+    the total. Its ``estimated_tokens`` is the estimate of the final payload.
+    """
+    sizes = {k: _weighted_pieces({k: v}) for k, v in payload.items()}
+    trimmed = {}  # section -> "summarized" / "dropped"
+    alerts_dropped = 0
+
+    def record(estimated):
+        budget = {"token_budget": token_budget, "estimated_tokens": estimated}
+        for action in ("summarized", "dropped"):
+            names = [name for name, done in trimmed.items() if done == action]
+            if names:
+                budget[action] = names
+        if alerts_dropped:
+            budget["alerts_dropped"] = alerts_dropped
+        return budget
+
+    def total():
+        # Joined into one object, each section's closing brace run merges with the
+        # next one's opening '{"' run, so there is one punctuation piece less per join.
+        joins = len(sizes) * _TOKEN_WEIGHTS["punct"]
+        return round(sum(sizes.values()) + _weighted_pieces({"budget": record(token_budget)}) - joins)
+
+    def update(name, section, action):
+        payload[name] = section
+        sizes[name] = _weighted_pieces({name: section})
+        trimmed[name] = action
+
+    order = [k for k in payload if k != "schema_version" and k not in priority]  # unranked go first
+    order += [k for k in reversed(priority) if k in payload]
+
+    # One section at a time: summarize it, then drop it if still over budget, so
+    # a section is only touched once everything ranked below it is gone.
+    for name in order:
+        if total() <= token_budget:
+            break
+        summary = _summarize_section(name, payload[name])
+        if summary and summary != payload[name]:
+            update(name, summary, "summarized")
+            if total() <= token_budget:
+                break
+        if name == "alerts":
+            # Sorted most severe first (see ``_build_alerts``), so the least severe go first.
+            alerts = list(payload[name])
+            while len(alerts) > 1 and total() > token_budget:
+                alerts.pop()
+                alerts_dropped += 1
+                update(name, alerts, "summarized")
+            if total() <= token_budget:
+                break
+            alerts_dropped = 0
+        del payload[name]
+        del sizes[name]
+        trimmed[name] = "dropped"
+
+    payload["budget"] = record(total())
+    # Twice, since the count written in the first pass can itself change the estimate.
+    for _ in range(2):
+        payload["budget"]["estimated_tokens"] = estimate_tokens(payload)
+    return payload
 
 
 # ---------------------------------------------------------------------------
@@ -71,10 +242,7 @@ def _build_agent_state(pkt: dict, results: dict) -> dict:
     nap_recommended = rem_deficit_alert and debt_hours > 1.5
     nap_window = _derive_nap_window(peak_window)
 
-    perf = results.get("performance", {})
-    daily_ready = perf.get("daily_ready", [])
-    n_ready = sum(d.get("n", 0) for d in daily_ready) if daily_ready else 0
-    peak_confidence = _peak_cognitive_confidence(n_ready, zone)
+    peak_confidence = _peak_cognitive_confidence(circ.get("acrophase_ci_width_hours"), zone)
 
     return {
         "readiness_regime": readiness_regime,
@@ -149,10 +317,13 @@ def _derive_nap_window(peak_window):
         return "13:00-15:00"
 
 
-def _peak_cognitive_confidence(n_ready, zone):
-    if n_ready >= 30 and zone in ("green", None):
+def _peak_cognitive_confidence(ci_width_hours, zone):
+    """Confidence in the peak window from the width of the bootstrap acrophase CI."""
+    if ci_width_hours is None:
+        return "low"
+    if ci_width_hours <= _PEAK_CI_HIGH_HOURS and zone in ("green", None):
         return "high"
-    if n_ready >= 15:
+    if ci_width_hours <= _PEAK_CI_MEDIUM_HOURS:
         return "medium"
     return "low"
 
@@ -185,10 +356,12 @@ def _build_data_quality(pkt: dict, results: dict) -> dict:
     sr_populated = sum(1 for d in daily_sr if any(d.get(k) is not None for k in ("stress", "sleepiness", "sharpness")))
     sr_pct = round(sr_populated / len(daily_sr) * 100) if daily_sr else 0
 
+    # Share of nights with HRV epochs in the hour before wake (hrv.daily_rmssd_pct_baseline).
     hrv_populated_pct = 0
-    hrv_ts = results.get("hrv", {}).get("timeseries", [])
-    if hrv_ts and all_nights:
-        hrv_populated_pct = min(100, round(len(hrv_ts) / max(1, primary_count) * 100 / 50))
+    woken = [n for n in results.get("sleep", {}).get("nights", []) if n.get("sleep_offset")]
+    if woken:
+        mornings = {d["date"] for d in results.get("hrv", {}).get("daily_rmssd_pct_baseline", [])}
+        hrv_populated_pct = min(100, round(len(mornings) / len(woken) * 100))
 
     strain_data = results.get("strain", {}).get("daily_strain", [])
     scores = [d["strain_score"] for d in strain_data if d.get("strain_score") is not None]
@@ -199,9 +372,12 @@ def _build_data_quality(pkt: dict, results: dict) -> dict:
     elif len(scores) >= 2:
         strain_var = "low"
 
-    circ = results.get("circadian", {})
-    cosinor_n = circ.get("cosinor_n", 0)
-    chronotype_conf = "high" if cosinor_n >= 30 else "medium" if cosinor_n >= 15 else "low"
+    agreement = results.get("confidence", {}).get("chronotype_agreement")
+    if agreement is None:
+        chronotype_conf = "low"
+    else:
+        chronotype_conf = ("high" if agreement >= _CHRONOTYPE_AGREEMENT_HIGH
+                           else "medium" if agreement >= _CHRONOTYPE_AGREEMENT_MEDIUM else "low")
 
     overall = _overall_confidence(sensor_days, primary_count, n_ready, sr_pct)
 
@@ -358,6 +534,8 @@ def _build_baseline(pkt: dict, results: dict) -> dict | None:
 
     out = {
         "ready_score": b.get("ready_score"),
+        "ready_top_mean": b.get("ready_top_mean"),
+        "ready_top_mean_ci": b.get("ready_top_mean_ci"),
         "agility_peak": b.get("agility_peak"),
         "rmssd_sleep_peak_ms": b.get("rmssd_sleep_peak_ms"),
     }
@@ -408,7 +586,8 @@ def _build_circadian(pkt: dict) -> dict | None:
         circ_raw[k] = cp.get(k)
     # Enhanced fields are stored in analysis_full under circadian_profile since we added them
     for k in ("peak_score_variance", "natural_sleep_onset_local", "natural_wake_local",
-              "bedtime_variance_min", "chronotype_estimate", "cosinor_n"):
+              "bedtime_variance_min", "chronotype_estimate", "cosinor_n",
+              "acrophase_ci_hours", "peak_window_ci", "acrophase_drift_min_per_day"):
         circ_raw[k] = cp.get(k)
     return circ_raw
 
@@ -559,6 +738,21 @@ def _build_strain(pkt: dict, results: dict) -> dict | None:
     }
 
 
+# ---------------------------------------------------------------------------
+# Trends (slope trajectories cut to the last week)
+# ---------------------------------------------------------------------------
+
+def _trim_trends(pkt: dict) -> dict | None:
+    trends = pkt.get("trends")
+    if not trends:
+        return None
+    trimmed = dict(trends)
+    for k in ("ready_slope_trajectory", "rmssd_slope_trajectory"):
+        if trimmed.get(k):
+            trimmed[k] = trimmed[k][-_TRAJECTORY_POINTS:]
+    return trimmed
+
+
 # ---------------------------------------------------------------------------
 # Null-stripping utility
 # ---------------------------------------------------------------------------
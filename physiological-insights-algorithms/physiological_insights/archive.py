@@ -0,0 +1,207 @@
+"""Windowed context packets with per-month archive segments.
+
+``window_packet`` keeps the last ``window_days`` of daily summaries, sleep
+nights and weekly summaries inline and moves older history into one JSON
+segment per calendar month (``YYYY-MM.json`` in the archive directory). Only
+months that end before the window starts are archived, so a segment's
+content is final when it is first written: segments are written once and
+never rewritten, and a run that finds a month's segment already on disk does
+no work for it. Inline history therefore spans ``window_days`` plus at most
+the rest of the oldest month in the window (``archive.inline_from``).
+
+Months in the manifest never come back inline, so widening the window does
+not duplicate archived days. A day that arrives after its month was sealed
+(its date is missing from the dates the manifest records for the segment)
+is kept inline, counted per month in ``archive.backfilled``, with a
+warning, since the immutable segment cannot take it. Other changes to
+sealed items, such as a moved baseline, are not tracked.
+
+The packet references the segments through ``archive``; the full list, with
+item counts, dates and content hashes, is kept in the archive's ``manifest.json``.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import warnings
+
+from physiological_insights.serialize import dumps
+
+MANIFEST_NAME = "manifest.json"
+
+_FORMAT_VERSION = 1
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _load_manifest(archive_dir: str) -> dict:
+    try:
+        with open(os.path.join(archive_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {"version": _FORMAT_VERSION, "segments": {}}
+    manifest.setdefault("segments", {})
+    return manifest
+
+
+def _month(date) -> str:
+    return str(date or "")[:7]
+
+
+def _split(items: list, date_of, archived: set, sealed_before: str) -> tuple[list, dict]:
+    """Items of archived months or months before ``sealed_before`` (YYYY-MM), grouped by month; the rest stay inline."""
+    inline, by_month = [], {}
+    for item in items:
+        month = _month(date_of(item))
+        if month and (month in archived or month < sealed_before):
+            by_month.setdefault(month, []).append(item)
+        else:
+            inline.append(item)
+    return inline, by_month
+
+
+_SECTIONS = (
+    ("daily_summaries", lambda d: d.get("date")),
+    ("sleep_nights", lambda n: n.get("night_date")),
+    ("weekly_summaries", lambda w: (w.get("date_range") or {}).get("to")),
+)
+
+
+def _segment_dates(segment: dict) -> dict:
+    """Date key of every item in ``segment``, per section."""
+    return {key: [str(date_of(item)) for item in segment.get(key, [])] for key, date_of in _SECTIONS}
+
+
+def window_packet(packet: dict, window_days: int, archive_dir: str) -> dict:
+    """Copy of ``packet`` with only recent history inline; older months go to archive segments.
+
+    Days are counted back from the latest daily summary or sleep night. Months
+    already in the manifest are never inline, whatever the window, and are
+    compared with the recomputed history by date only: items whose date the
+    segment lacks (backfilled days) stay inline and a warning is raised. The
+    input packet is left unchanged.
+    """
+    daily = packet.get("daily_summaries") or []
+    weekly = packet.get("weekly_summaries") or []
+    sleep_sessions = packet.get("sleep_sessions") or {}
+    nights = sleep_sessions.get("nights") or []
+
+    dates = [d["date"] for d in daily if d.get("date")] + [n["night_date"] for n in nights if n.get("night_date")]
+    if not dates:
+        return packet
+    latest = datetime.date.fromisoformat(max(str(d)[:10] for d in dates))
+    inline_from = (latest - datetime.timedelta(days=window_days - 1)).isoformat()
+    sealed_before = inline_from[:7]
+
+    os.makedirs(archive_dir, exist_ok=True)
+    manifest = _load_manifest(archive_dir)
+    archived = {
+        month for month, entry in manifest["segments"].items()
+        if os.path.exists(os.path.join(archive_dir, entry["file"]))
+    }
+
+    inline, old = {}, {}
+    for (key, date_of), items in zip(_SECTIONS, (daily, nights, weekly)):
+        inline[key], old[key] = _split(items, date_of, archived, sealed_before)
+
+    changed = False
+    backfilled = {}  # month -> items kept inline because its sealed segment lacks them
+    for month in sorted(set().union(*(old[key] for key, _ in _SECTIONS))):
+        filename = f"{month}.json"
+        path = os.path.join(archive_dir, filename)
+        entry = manifest["segments"].get(month) if month in archived else None
+        if entry is None:
+            segment = {
+                "version": _FORMAT_VERSION,
+                "month": month,
+                **{key: old[key].get(month, []) for key, _ in _SECTIONS},
+            }
+            if os.path.exists(path):
+                # Written by a run that stopped before updating the manifest
+                with open(path, "rb") as f:
+                    data = f.read()
+                stored = json.loads(data)
+            else:
+                data = dumps(segment)
+                _write_atomic(path, data)
+                stored = segment
+            manifest["segments"][month] = entry = {
+                "file": filename,
+                "sha256": hashlib.sha256(data).hexdigest(),
+                **{key: len(stored.get(key, [])) for key, _ in _SECTIONS},
+                "dates": _segment_dates(stored),
+            }
+            changed = True
+            if stored is segment:
+                continue
+        elif "dates" not in entry:
+            # Manifest written before segment dates were recorded: read the segment once.
+            with open(path) as f:
+                entry["dates"] = _segment_dates(json.load(f))
+            changed = True
+
+        # Sealed segments are never re-serialized or rewritten; only recomputed
+        # items whose date the segment lacks (backfilled days) are kept, inline.
+        extra = 0
+        for key, date_of in _SECTIONS:
+            have = set(entry["dates"].get(key, []))
+            missing = [item for item in old[key].get(month, []) if str(date_of(item)) not in have]
+            inline[key].extend(missing)
+            extra += len(missing)
+        if extra:
+            backfilled[month] = extra
+            warnings.warn(
+                f"archive segment {filename} lacks {extra} recomputed item(s); they stay inline",
+                stacklevel=2,
+            )
+    if changed or not os.path.exists(os.path.join(archive_dir, MANIFEST_NAME)):
+        manifest["segments"] = dict(sorted(manifest["segments"].items()))
+        _write_atomic(os.path.join(archive_dir, MANIFEST_NAME), dumps(manifest))
+
+    if backfilled:
+        # Backfilled items were appended; restore date order.
+        for key, date_of in _SECTIONS:
+            inline[key].sort(key=lambda item: str(date_of(item) or ""))
+
+    # Inline history starts after the newest archived month, even if the window reaches further back.
+    last_archived = max(manifest["segments"], default="")
+    if last_archived >= sealed_before:
+        year, month = map(int, last_archived.split("-"))
+        sealed_before = f"{year + month // 12:04d}-{month % 12 + 1:02d}"
+
+    windowed = dict(packet)
+    windowed["daily_summaries"] = inline["daily_summaries"]
+    windowed["weekly_summaries"] = inline["weekly_summaries"]
+    if nights:
+        windowed["sleep_sessions"] = dict(sleep_sessions, nights=inline["sleep_nights"])
+    windowed["archive"] = {
+        "window_days": window_days,
+        "inline_from": f"{sealed_before}-01",
+        "directory": archive_dir,
+        "manifest": MANIFEST_NAME,
+        "segments": [
+            {"month": month, "file": entry["file"], "sha256": entry["sha256"]}
+            for month, entry in manifest["segments"].items()
+        ],
+    }
+    if backfilled:
+        windowed["archive"]["backfilled"] = backfilled
+    return windowed
+
+
+def load_archived_history(archive_dir: str) -> dict:
+    """All archived daily summaries, sleep nights and weekly summaries, oldest month first."""
+    manifest = _load_manifest(archive_dir)
+    history = {"daily_summaries": [], "sleep_nights": [], "weekly_summaries": []}
+    for month in sorted(manifest["segments"]):
+        with open(os.path.join(archive_dir, manifest["segments"][month]["file"])) as f:
+            segment = json.load(f)
+        for key in history:
+            history[key].extend(segment.get(key, []))
+    return history
@@ -0,0 +1,186 @@
+"""Vectorized bootstrap confidence intervals for the circadian fit and baselines.
+
+Every resample is drawn at once as an (n_boot x n) index matrix. For the
+cosinor, the matrix is turned into per-resample observation counts, so each
+resample's sufficient statistics (``X'X``, ``X'y``, ``y'y``) are a
+counts-weighted matrix product over the design rows, and all resamples are fitted in a single
+batched ``cosinor.solve``. The RMSSD baseline is resampled by whole UTC
+days from the sketch's per-day bin counts: epochs within a night are
+strongly autocorrelated, so days, not epochs, are the independent units.
+Each resample's bin counts are a day-weights x day-bins matrix product, and
+no resample touches the raw epochs.
+
+The published Ready baseline (the first baseline test, else the best Ready
+score) is a single observation with no sampling distribution, so it gets no
+interval. Instead the mean of the top ``TOP_FRACTION`` of Ready scores, the
+RMSSD baseline's estimator, is reported as ``ready_top_mean`` and
+bootstrapped on an index matrix over the Ready scores.
+
+Intervals are percentile intervals. The acrophase interval is taken on the
+circle: resampled acrophases are expressed as offsets from the point estimate
+in [-12, 12) hours before taking percentiles.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from physiological_insights.circadian import chronotype_from_acrophase, peak_window
+from physiological_insights.cosinor import PERIOD_HOURS, design, fit_cosinor, solve
+from physiological_insights.hrv_baseline import TOP_FRACTION, RmssdSketch
+
+N_BOOT = 1000
+CI_LEVEL = 0.95
+SEED = 0
+
+# Fewer successful resample fits than this fraction and no interval is reported.
+_MIN_OK_FRACTION = 0.5
+_MIN_COSINOR_N = 6
+_MIN_READY_N = 5
+_MIN_RMSSD_DAYS = 5
+
+
+def _index_matrix(rng: np.random.Generator, n: int, n_boot: int) -> np.ndarray:
+    return rng.integers(0, n, size=(n_boot, n))
+
+
+def _resample_counts(idx: np.ndarray, n: int) -> np.ndarray:
+    """How often each of the ``n`` observations appears in each resample (n_boot x n)."""
+    n_boot = idx.shape[0]
+    offsets = np.arange(n_boot)[:, None] * n
+    return np.bincount((idx + offsets).ravel(), minlength=n_boot * n).reshape(n_boot, n)
+
+
+def _interval(values: np.ndarray, level: float) -> list[float] | None:
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return None
+    tail = (1 - level) / 2 * 100
+    lo, hi = np.percentile(values, [tail, 100 - tail])
+    return [round(float(lo), 1), round(float(hi), 1)]
+
+
+def _cosinor_confidence(hours: np.ndarray, scores: np.ndarray, rng: np.random.Generator,
+                        n_boot: int, level: float) -> dict:
+    empty = {
+        "acrophase_hour_ci": None,
+        "acrophase_ci_width_hours": None,
+        "peak_window_ci": None,
+        "chronotype_agreement": None,
+    }
+    valid = ~np.isnan(hours) & ~np.isnan(scores)
+    hours, scores = hours[valid], scores[valid]
+    n = len(hours)
+    if n < _MIN_COSINOR_N:
+        return empty
+    point = fit_cosinor(hours, scores)
+    if not point["ok"][0]:
+        return empty
+    mesor, amplitude, acrophase = point["mesor"][0], point["amplitude"][0], point["acrophase_hour"][0]
+
+    w = _resample_counts(_index_matrix(rng, n, n_boot), n).astype(np.float64)
+    x = design(hours)
+    # Counts-weighted sums of per-observation outer products: one matmul per statistic.
+    xtx = (w @ (x[:, :, None] * x[:, None, :]).reshape(n, 9)).reshape(n_boot, 3, 3)
+    xty = w @ (x * scores[:, None])
+    yty = w @ (scores * scores)
+    fit = solve(xtx, xty, yty, np.full(n_boot, n))
+
+    ok = fit["ok"]
+    if ok.mean() < _MIN_OK_FRACTION:
+        return empty
+    boot = fit["acrophase_hour"][ok]
+    half = PERIOD_HOURS / 2
+    offset = (boot - acrophase + half) % PERIOD_HOURS - half
+    tail = (1 - level) / 2 * 100
+    lo, hi = np.percentile(offset, [tail, 100 - tail])
+
+    chronotype = chronotype_from_acrophase(acrophase)
+    agreement = np.mean([chronotype_from_acrophase(a) == chronotype for a in boot])
+    return {
+        "acrophase_hour_ci": [round(float((acrophase + lo) % PERIOD_HOURS), 2),
+                              round(float((acrophase + hi) % PERIOD_HOURS), 2)],
+        "acrophase_ci_width_hours": round(float(hi - lo), 2),
+        "peak_window_ci": {
+            "earliest": peak_window(mesor, amplitude, (acrophase + lo) % PERIOD_HOURS),
+            "latest": peak_window(mesor, amplitude, (acrophase + hi) % PERIOD_HOURS),
+        },
+        "chronotype_agreement": round(float(agreement), 2),
+    }
+
+
+def _top_mean(values: np.ndarray, fraction: float) -> np.ndarray:
+    """Mean of the top ``fraction`` of ``values`` along the last axis (the RMSSD baseline's ``keep`` rule)."""
+    n = values.shape[-1]
+    keep = n - math.ceil((n - 1) * (1 - fraction))
+    return np.partition(values, n - keep, axis=-1)[..., n - keep:].mean(axis=-1)
+
+
+def _ready_top_mean(df: pd.DataFrame, rng: np.random.Generator, n_boot: int,
+                    fraction: float = TOP_FRACTION) -> tuple[float | None, np.ndarray]:
+    """Top-``fraction`` mean of the Ready scores and its value on every resample."""
+    score = df.loc[df["type"] == "READY", "score"].to_numpy(dtype=np.float64)
+    score = score[~np.isnan(score)]
+    if len(score) < _MIN_READY_N:
+        return None, np.array([])
+    boot = _top_mean(score[_index_matrix(rng, len(score), n_boot)], fraction)
+    return round(float(_top_mean(score, fraction)), 1), boot
+
+
+def _rmssd_baseline_resamples(sketch: RmssdSketch, rng: np.random.Generator, n_boot: int,
+                              fraction: float = TOP_FRACTION) -> np.ndarray:
+    """``RmssdSketch.top_mean`` estimate for resamples of the sketch's days (empty with too few days)."""
+    _, _, counts, sums = sketch.bins()
+    days, day_counts = sketch.day_bin_counts()
+    if len(days) < _MIN_RMSSD_DAYS:
+        return np.array([])
+    means = sums / counts
+    boot = _resample_counts(_index_matrix(rng, len(days), n_boot), len(days)) @ day_counts
+    total = boot.sum(axis=1)
+
+    keep = total - np.ceil((total - 1) * (1 - fraction)).astype(np.int64)
+    from_top = np.cumsum(boot[:, ::-1], axis=1)
+    sum_from_top = np.cumsum(boot[:, ::-1] * means[::-1], axis=1)
+    # Boundary bin (counted from the top): first where the top-down count reaches ``keep``.
+    j = (from_top < keep[:, None]).sum(axis=1)
+    rows = np.arange(n_boot)
+    above_n = from_top[rows, j] - boot[rows, -1 - j]
+    above_sum = sum_from_top[rows, j] - boot[rows, -1 - j] * means[-1 - j]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, (above_sum + (keep - above_n) * means[-1 - j]) / keep, np.nan)
+
+
+def bootstrap_confidence(tests_df: pd.DataFrame | None, rmssd_sketch: RmssdSketch | None = None,
+                         n_boot: int = N_BOOT, level: float = CI_LEVEL, seed: int = SEED) -> dict:
+    """Percentile confidence intervals for the circadian fit and the personal baselines.
+
+    Returns the acrophase interval (``acrophase_hour_ci``, as clock hours that
+    may wrap past midnight, plus its width), the peak windows at either end
+    of it, the share of resamples giving the same chronotype,
+    ``ready_top_mean`` with its interval, and the ``rmssd_baseline`` (ms)
+    interval. Missing inputs (or fewer than 5 Ready scores, or sketch days)
+    give None. Seeded, so repeated runs on the same data agree.
+    """
+    rng = np.random.default_rng(seed)
+    result: dict = {"n_boot": n_boot, "level": level}
+
+    hours = scores = np.array([])
+    if tests_df is not None and "hour" in tests_df.columns:
+        ready = tests_df[tests_df["type"] == "READY"]
+        hours, scores = ready["hour"].to_numpy(dtype=np.float64), ready["score"].to_numpy(dtype=np.float64)
+    result.update(_cosinor_confidence(hours, scores, rng, n_boot, level))
+
+    result["ready_top_mean"] = result["ready_top_mean_ci"] = None
+    if tests_df is not None and not tests_df.empty:
+        point, boot = _ready_top_mean(tests_df, rng, n_boot)
+        if point is not None:
+            result["ready_top_mean"] = point
+            result["ready_top_mean_ci"] = _interval(boot, level)
+
+    if rmssd_sketch is not None and rmssd_sketch.count:
+        result["rmssd_baseline_ci"] = _interval(_rmssd_baseline_resamples(rmssd_sketch, rng, n_boot), level)
+    else:
+        result["rmssd_baseline_ci"] = None
+
+    return result
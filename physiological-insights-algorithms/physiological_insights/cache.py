@@ -0,0 +1,167 @@
+"""Content-addressed cache for normalized ingest output.
+
+Entries are keyed on the SHA-256 of the input file plus the loader name,
+its keyword arguments and ``ingest.LOADER_VERSION``, so an unchanged export
+loads from a binary columnar file instead of being re-parsed. Parquet is used
+when pyarrow is installed, with the loader's dtypes recorded so a cached
+frame reads back with the same dtypes as a fresh parse; otherwise frames are
+stored as pandas pickles.
+The cache directory is capped in size and evicted least-recently-used first.
+"""
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from physiological_insights.ingest import LOADER_VERSION
+
+DEFAULT_CACHE_DIR = os.path.join("output", ".cache")
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+_HASH_INDEX = "file_hashes.json"
+_HASH_BLOCK = 1 << 20
+# DataFrame.attrs key holding the loader's dtypes in Parquet entries.
+_DTYPES_ATTR = "physiological_insights.dtypes"
+
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _file_sha256(path: str, cache_dir: str) -> str:
+    """Content hash of ``path``, memoized on (size, mtime) so unchanged files aren't re-read."""
+    st = os.stat(path)
+    stamp = f"{st.st_size}:{st.st_mtime_ns}"
+    index_path = os.path.join(cache_dir, _HASH_INDEX)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+
+    real = os.path.realpath(path)
+    known = index.get(real)
+    if known and known.get("stamp") == stamp:
+        return known["sha256"]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            h.update(block)
+    digest = h.hexdigest()
+
+    index[real] = {"stamp": stamp, "sha256": digest}
+    tmp = index_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, index_path)
+    return digest
+
+
+def _cache_key(loader, path: str, kwargs: dict, cache_dir: str) -> str:
+    ident = json.dumps({
+        "loader": f"{loader.__module__}.{loader.__name__}",
+        "version": LOADER_VERSION,
+        "kwargs": kwargs,
+        "sha256": _file_sha256(path, cache_dir),
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(ident.encode()).hexdigest()[:32]
+
+
+def _entry_paths(cache_dir: str, key: str) -> tuple[str, str]:
+    base = os.path.join(cache_dir, key)
+    return base + ".parquet", base + ".pkl"
+
+
+def _restore_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast columns back to the dtypes recorded at write time (Parquet stores datetime64[s] as [ms])."""
+    dtypes = df.attrs.pop(_DTYPES_ATTR)  # KeyError for entries written without it: re-parse
+    changed = {c: dtype for c, dtype in dtypes.items() if c in df.columns and str(df[c].dtype) != dtype}
+    return df.astype(changed) if changed else df
+
+
+def _read_entry(cache_dir: str, key: str) -> pd.DataFrame | None:
+    for entry in _entry_paths(cache_dir, key):
+        if not os.path.exists(entry):
+            continue
+        try:
+            if entry.endswith(".parquet"):
+                df = _restore_dtypes(pd.read_parquet(entry))
+            else:
+                df = pd.read_pickle(entry)
+        except Exception:
+            os.remove(entry)
+            continue
+        os.utime(entry)  # mark as recently used
+        return df
+    return None
+
+
+def _write_entry(cache_dir: str, key: str, df: pd.DataFrame) -> None:
+    parquet_path, pickle_path = _entry_paths(cache_dir, key)
+    if _parquet_available():
+        tmp = parquet_path + ".tmp"
+        try:
+            stored = df.copy(deep=False)
+            stored.attrs = {**df.attrs, _DTYPES_ATTR: {str(c): str(t) for c, t in df.dtypes.items()}}
+            stored.to_parquet(tmp, index=False)
+            os.replace(tmp, parquet_path)
+            return
+        except Exception:
+            # Mixed-type object columns can't be expressed in Arrow; pickle instead.
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    tmp = pickle_path + ".tmp"
+    df.to_pickle(tmp)
+    os.replace(tmp, pickle_path)
+
+
+def evict(cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES) -> int:
+    """Delete least-recently-used entries until the cache fits in ``max_bytes``.
+
+    Returns the number of entries removed.
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith((".parquet", ".pkl")):
+            full = os.path.join(cache_dir, name)
+            st = os.stat(full)
+            entries.append((st.st_mtime, st.st_size, full))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, full in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(full)
+        total -= size
+        removed += 1
+    return removed
+
+
+def cached_load(loader, path: str, cache_dir: str = DEFAULT_CACHE_DIR, rebuild: bool = False,
+                max_bytes: int = DEFAULT_MAX_BYTES, **kwargs) -> pd.DataFrame:
+    """Return ``loader(path, **kwargs)``, served from the cache when the file is unchanged.
+
+    ``rebuild=True`` ignores any existing entry and overwrites it.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    key = _cache_key(loader, path, kwargs, cache_dir)
+
+    if not rebuild:
+        df = _read_entry(cache_dir, key)
+        if df is not None:
+            return df
+
+    df = loader(path, **kwargs)
+    _write_entry(cache_dir, key, df)
+    evict(cache_dir, max_bytes)
+    return df
@@ -2,16 +2,23 @@
 
 import numpy as np
 import pandas as pd
-from scipy.optimize import curve_fit
 
+from physiological_insights.cosinor import PERIOD_HOURS, curve, fit_cosinor, solve, sufficient_stats
+from physiological_insights.trends import linear_trend
 
-def _cosinor(t: np.ndarray, mesor: float, amplitude: float, acrophase: float) -> np.ndarray:
-    """24-hour cosine model: y = MESOR + amplitude * cos(2*pi*(t - acrophase)/24)"""
-    return mesor + amplitude * np.cos(2 * np.pi * (t - acrophase) / 24)
+ROLLING_WINDOW_DAYS = 14
+ROLLING_STEP_DAYS = 1
 
+_MIN_FIT_N = 6
 
-def analyse_circadian(df: pd.DataFrame, sleep_df=None) -> dict:
-    """Fit a cosinor model to Ready scores by time-of-day."""
+
+def analyse_circadian(df: pd.DataFrame, sleep_df=None, window_days: int = ROLLING_WINDOW_DAYS,
+                      step_days: int = ROLLING_STEP_DAYS) -> dict:
+    """Fit a cosinor model to Ready scores by time-of-day.
+
+    Besides the fit over the whole history, ``rolling`` tracks the acrophase
+    over a sliding ``window_days`` window (see ``rolling_acrophase``).
+    """
     ready = df[df["type"] == "READY"].copy()
     if ready.empty or "hour" not in ready.columns:
         return {
@@ -25,6 +32,7 @@ def analyse_circadian(df: pd.DataFrame, sleep_df=None) -> dict:
             "cosinor_n": 0,
             "peak_score_variance": None,
             "chronotype_estimate": None,
+            "rolling": rolling_acrophase(ready, window_days, step_days),
         }
 
     hours = ready["hour"].values
@@ -39,6 +47,7 @@ def analyse_circadian(df: pd.DataFrame, sleep_df=None) -> dict:
 
     result: dict = {
         "hourly_bins": hourly.to_dict(orient="records"),
+        "rolling": rolling_acrophase(ready, window_days, step_days),
     }
 
     # Cosinor fit
@@ -48,7 +57,7 @@ def analyse_circadian(df: pd.DataFrame, sleep_df=None) -> dict:
 
     result["cosinor_n"] = int(len(t_fit))
 
-    if len(t_fit) < 6:
+    if len(t_fit) < _MIN_FIT_N:
         result["cosinor_fit"] = False
         result["mesor"] = float(np.mean(y_fit)) if len(y_fit) else None
         result["amplitude"] = None
@@ -60,32 +69,16 @@ def analyse_circadian(df: pd.DataFrame, sleep_df=None) -> dict:
         _add_sleep_timing(result, sleep_df)
         return result
 
-    mesor_guess = float(np.mean(y_fit))
-    amp_guess = float((np.max(y_fit) - np.min(y_fit)) / 2)
-    acro_guess = float(t_fit[np.argmax(y_fit)])
-
-    try:
-        popt, _ = curve_fit(
-            _cosinor, t_fit, y_fit,
-            p0=[mesor_guess, amp_guess, acro_guess],
-            maxfev=10000,
-        )
-        mesor, amplitude, acrophase = popt
-        amplitude = abs(amplitude)
-        acrophase = acrophase % 24
-
-        # Peak window: range where fitted curve > 90% of peak value
-        t_dense = np.linspace(0, 24, 240)
-        y_dense = _cosinor(t_dense, mesor, amplitude, acrophase)
-        peak_val = y_dense.max()
-        threshold = mesor + 0.9 * amplitude  # 90% of way from mean to peak
-        above = t_dense[y_dense >= threshold]
-        if len(above) >= 2:
-            peak_start = float(above[0])
-            peak_end = float(above[-1])
-            result["estimated_peak_window"] = f"{int(peak_start):02d}:00-{int(peak_end):02d}:00"
-        else:
-            result["estimated_peak_window"] = f"{int(acrophase):02d}:00-{int(acrophase + 2) % 24:02d}:00"
+    # Closed-form least squares: y = MESOR + b1*cos(wt) + b2*sin(wt)
+    fit = fit_cosinor(t_fit, y_fit)
+
+    if fit["ok"][0]:
+        mesor = fit["mesor"][0]
+        amplitude = fit["amplitude"][0]
+        acrophase = fit["acrophase_hour"][0]
+
+        t_dense, y_dense, above = _curve_peak(mesor, amplitude, acrophase)
+        result["estimated_peak_window"] = peak_window(mesor, amplitude, acrophase)
 
         # Worst window: where curve is lowest
         worst_hour = float(t_dense[np.argmin(y_dense)])
@@ -95,6 +88,9 @@ def analyse_circadian(df: pd.DataFrame, sleep_df=None) -> dict:
         result["mesor"] = round(float(mesor), 2)
         result["amplitude"] = round(float(amplitude), 2)
         result["acrophase_hour"] = round(float(acrophase), 2)
+        result["mesor_se"] = round(float(fit["mesor_se"][0]), 2)
+        result["amplitude_se"] = round(float(fit["amplitude_se"][0]), 2)
+        result["acrophase_se_hours"] = round(float(fit["acrophase_se_hours"][0]), 2)
 
         # Store fitted curve for visualization
         result["fitted_curve"] = [
@@ -111,11 +107,12 @@ def analyse_circadian(df: pd.DataFrame, sleep_df=None) -> dict:
             result["peak_score_variance"] = None
 
         # Chronotype from acrophase
-        result["chronotype_estimate"] = _chronotype_from_acrophase(acrophase)
+        result["chronotype_estimate"] = chronotype_from_acrophase(acrophase)
 
-    except (RuntimeError, ValueError):
+    else:
+        # Hours too concentrated to separate the cosine and sine terms.
         result["cosinor_fit"] = False
-        result["mesor"] = mesor_guess
+        result["mesor"] = float(np.mean(y_fit))
         result["amplitude"] = None
         result["acrophase_hour"] = None
         result["estimated_peak_window"] = None
@@ -127,7 +124,81 @@ def analyse_circadian(df: pd.DataFrame, sleep_df=None) -> dict:
     return result
 
 
-def _chronotype_from_acrophase(acrophase_hour: float) -> str:
+def rolling_acrophase(ready: pd.DataFrame, window_days: int = ROLLING_WINDOW_DAYS,
+                      step_days: int = ROLLING_STEP_DAYS) -> dict:
+    """Cosinor acrophase over a sliding window of local days, plus its drift.
+
+    Sufficient statistics are summed per day once and accumulated; a
+    window's statistics are the running total at its end minus the total
+    where it starts (tests entering minus tests leaving), so every window is
+    fitted in one batched solve without revisiting individual tests.
+    Windows with fewer than 6 tests or an unidentifiable fit are left out
+    of ``acrophase_series``. The drift rate is the least-squares slope of the
+    (unwrapped) acrophase against window end date, in minutes per day.
+    """
+    if window_days < 1 or step_days < 1:
+        raise ValueError(f"window_days and step_days must be at least 1 (got {window_days}, {step_days})")
+    result = {
+        "window_days": window_days,
+        "step_days": step_days,
+        "acrophase_series": [],
+        "acrophase_drift_min_per_day": None,
+    }
+    if ready.empty or "hour" not in ready.columns:
+        return result
+
+    valid = ready["score"].notna() & ready["hour"].notna()
+    day = pd.to_datetime(ready.loc[valid, "date"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+    if not len(day):
+        return result
+    first_day = int(day.min())
+    n_days = int(day.max()) - first_day + 1
+    if n_days < window_days:
+        return result
+
+    stats = sufficient_stats(ready.loc[valid, "hour"], ready.loc[valid, "score"], day - first_day, n_days)
+    ends = np.arange(window_days, n_days + 1, step_days)
+    window = []
+    for daily in stats:
+        running = np.concatenate([np.zeros((1,) + daily.shape[1:], dtype=daily.dtype), np.cumsum(daily, axis=0)])
+        window.append(running[ends] - running[ends - window_days])
+    fit = solve(*window)
+
+    fitted = np.flatnonzero(fit["ok"] & (fit["n"] >= _MIN_FIT_N))
+    end_days = first_day + ends[fitted] - 1
+    acrophase = fit["acrophase_hour"][fitted]
+    result["acrophase_series"] = [
+        {
+            "window_end": str(np.datetime64(int(d), "D")),
+            "acrophase_hour": round(float(a), 2),
+            "acrophase_se_hours": round(float(se), 2),
+            "n": int(k),
+        }
+        for d, a, se, k in zip(end_days, acrophase, fit["acrophase_se_hours"][fitted], fit["n"][fitted])
+    ]
+    if len(fitted) >= 3:
+        slope = linear_trend(np.unwrap(acrophase, period=PERIOD_HOURS), end_days)["slope"]
+        result["acrophase_drift_min_per_day"] = round(float(slope) * 60, 1)
+    return result
+
+
+def _curve_peak(mesor: float, amplitude: float, acrophase: float):
+    """Dense fitted curve and the hours where it is > 90% of the way from mean to peak."""
+    t_dense = np.linspace(0, 24, 240)
+    y_dense = curve(t_dense, mesor, amplitude, acrophase)
+    threshold = mesor + 0.9 * amplitude
+    return t_dense, y_dense, t_dense[y_dense >= threshold]
+
+
+def peak_window(mesor: float, amplitude: float, acrophase: float) -> str:
+    """Peak window label ("HH:00-HH:00") where the fitted curve is near its peak."""
+    _, _, above = _curve_peak(mesor, amplitude, acrophase)
+    if len(above) >= 2:
+        return f"{int(above[0]):02d}:00-{int(above[-1]):02d}:00"
+    return f"{int(acrophase):02d}:00-{int(acrophase + 2) % 24:02d}:00"
+
+
+def chronotype_from_acrophase(acrophase_hour: float) -> str:
     if acrophase_hour < 11:
         return "morning_lark"
     elif acrophase_hour < 15:
@@ -4,20 +4,29 @@ import argparse
 import json
 import os
 
+from physiological_insights.cache import DEFAULT_CACHE_DIR, cached_load
+from physiological_insights.hypnogram import STAGE_COLUMN
 from physiological_insights.ingest import load_test_results, load_decoded_metrics, load_sleep_sessions
 from physiological_insights.self_report import parse_all_comments
+from physiological_insights.tags import add_tags, tag_effects
+from physiological_insights.epoch_features import add_epoch_features
 from physiological_insights.performance import analyse_performance
-from physiological_insights.hrv import analyse_hrv
+from physiological_insights.hrv import TIMESERIES_MAX_POINTS, analyse_hrv, update_baseline_sketch
+from physiological_insights.hrv_baseline import RmssdSketch
 from physiological_insights.sleep import analyse_sleep
 from physiological_insights.sleep_sessions import analyse_sleep_sessions
 from physiological_insights.activity import analyse_activity
 from physiological_insights.strain import analyse_strain
-from physiological_insights.circadian import analyse_circadian
+from physiological_insights.circadian import ROLLING_STEP_DAYS, ROLLING_WINDOW_DAYS, analyse_circadian
+from physiological_insights.bootstrap import bootstrap_confidence
 from physiological_insights.readiness import assign_readiness_tiers
 from physiological_insights.patterns import detect_patterns
 from physiological_insights.visualizations import generate_all_graphs
 from physiological_insights.context_packet import build_context_packet
-from physiological_insights.agent_payload import build_agent_payload
+from physiological_insights.archive import window_packet
+from physiological_insights.columnar import columnar_packet
+from physiological_insights import serialize
+from physiological_insights.agent_payload import TOKEN_BUDGET, build_agent_payload, estimate_tokens
 
 
 def main():
@@ -34,15 +43,57 @@ def main():
     parser.add_argument("--briefing", default=None, help="Path for condensed agent briefing JSON (triggers Tier 2 LLM)")
     parser.add_argument("--llm-provider", default="openai", choices=["openai", "anthropic"])
     parser.add_argument("--llm-model", default="gpt-4o-mini")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Ingest cache directory (default: output/.cache)")
+    parser.add_argument("--no-cache", action="store_true", help="Re-parse input CSVs without reading or writing the cache")
+    parser.add_argument("--rebuild-cache", action="store_true", help="Re-parse input CSVs and overwrite their cache entries")
+    parser.add_argument("--baseline-sketch", default=None,
+                        help="Persisted RMSSD baseline sketch (default: output/{user}/rmssd_sketch.json)")
+    parser.add_argument("--no-baseline-sketch", action="store_true",
+                        help="Compute the RMSSD baseline from this run's metrics only, without the persisted sketch")
+    parser.add_argument("--circadian-window-days", type=int, default=ROLLING_WINDOW_DAYS,
+                        help=f"Sliding window for acrophase tracking (default: {ROLLING_WINDOW_DAYS})")
+    parser.add_argument("--circadian-step-days", type=int, default=ROLLING_STEP_DAYS,
+                        help=f"Step between acrophase windows (default: {ROLLING_STEP_DAYS})")
+    parser.add_argument("--timeseries-points", type=int, default=TIMESERIES_MAX_POINTS,
+                        help=f"Point budget for the LTTB-downsampled HRV time series (default: {TIMESERIES_MAX_POINTS})")
+    parser.add_argument("--output-format", default="json", choices=serialize.FORMATS,
+                        help="analysis_full / agent_payload encoding: indented JSON (default), compact JSON, or msgpack")
+    parser.add_argument("--compress", default=None, choices=serialize.COMPRESSIONS,
+                        help="Compress both outputs (adds .zst)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="Write analysis_full's time-series sections as {columns, data} instead of row dicts")
+    parser.add_argument("--window-days", type=int, default=None,
+                        help="Keep the last N days of history inline in analysis_full.json; "
+                             "older months go to archive segments (default: all inline)")
+    parser.add_argument("--archive-dir", default=None,
+                        help="Archive segment directory for --window-days (default: archive/ next to the output)")
+    parser.add_argument("--payload-token-budget", type=int, default=TOKEN_BUDGET,
+                        help=f"Estimated-token budget for agent_payload.json; lower-priority sections are "
+                             f"summarized or dropped to fit, 0 disables (default: {TOKEN_BUDGET})")
     args = parser.parse_args()
 
     if not args.test_csv and not args.metrics_csv and not args.sleep_csv:
         parser.error("At least one of --test-csv, --sleep-csv, or --metrics-csv is required.")
+    unavailable = serialize.check_available(args.output_format, args.compress)
+    if unavailable:
+        parser.error(unavailable)
+    if args.payload_token_budget < 0:
+        parser.error("--payload-token-budget must be 0 (no limit) or positive.")
+    if args.window_days is not None and args.window_days < 1:
+        parser.error("--window-days must be at least 1.")
+    if args.circadian_window_days < 1:
+        parser.error("--circadian-window-days must be at least 1.")
+    if args.circadian_step_days < 1:
+        parser.error("--circadian-step-days must be at least 1.")
+    if args.timeseries_points < 3:
+        parser.error("--timeseries-points must be at least 3.")
 
     user_dir = os.path.join("output", args.user_name)
     full_path = args.output or os.path.join(user_dir, "analysis_full.json")
     payload_path = os.path.join(os.path.dirname(full_path), "agent_payload.json")
     graphs_dir = args.graphs_dir or os.path.join(user_dir, "graphs")
+    sketch_path = args.baseline_sketch or os.path.join(user_dir, "rmssd_sketch.json")
+    archive_dir = args.archive_dir or os.path.join(os.path.dirname(full_path), "archive")
 
     os.makedirs(os.path.dirname(full_path) or ".", exist_ok=True)
     os.makedirs(graphs_dir, exist_ok=True)
@@ -50,40 +101,68 @@ def main():
     # --- Tier 1: Deterministic pipeline ---
     print(f"[Tier 1] Pipeline for user: {args.user_name}")
 
+    def load(loader, path, **kwargs):
+        if not path:
+            return None
+        if args.no_cache:
+            return loader(path, **kwargs)
+        return cached_load(loader, path, cache_dir=args.cache_dir, rebuild=args.rebuild_cache, **kwargs)
+
     print("[Tier 1] Loading data...")
-    tests_df = load_test_results(args.test_csv) if args.test_csv else None
-    sleep_df = load_sleep_sessions(args.sleep_csv) if args.sleep_csv else None
-    metrics_df = load_decoded_metrics(args.metrics_csv) if args.metrics_csv else None
+    tests_df = load(load_test_results, args.test_csv)
+    sleep_df = load(load_sleep_sessions, args.sleep_csv, stage_lists=(STAGE_COLUMN,))
+    metrics_df = load(load_decoded_metrics, args.metrics_csv)
 
     results = {}
+    rmssd_sketch = None
 
     if tests_df is not None:
         print("[Tier 1] Parsing self-reports from comments...")
         tests_df = parse_all_comments(tests_df)
 
+        print("[Tier 1] Tagging lifestyle context in notes...")
+        tests_df = add_tags(tests_df)
+
         print("[Tier 1] Analysing performance scores...")
         results["performance"] = analyse_performance(tests_df)
+        results["lifestyle_tags"] = tag_effects(tests_df, results["performance"].get("ready_baseline"))
 
         print("[Tier 1] Fitting circadian model...")
-        results["circadian"] = analyse_circadian(tests_df, sleep_df=sleep_df)
+        results["circadian"] = analyse_circadian(tests_df, sleep_df=sleep_df,
+                                                 window_days=args.circadian_window_days,
+                                                 step_days=args.circadian_step_days)
 
     if sleep_df is not None:
         print("[Tier 1] Analysing sleep sessions (Whoop-level)...")
         results["sleep_sessions"] = analyse_sleep_sessions(sleep_df)
 
     if metrics_df is not None:
-        print("[Tier 1] Analysing HRV...")
-        results["hrv"] = analyse_hrv(metrics_df)
+        print("[Tier 1] Computing epoch motion features...")
+        add_epoch_features(metrics_df)
 
         print("[Tier 1] Detecting sleep from sensors...")
         results["sleep"] = analyse_sleep(metrics_df)
 
+        print("[Tier 1] Analysing HRV...")
+        nights = results["sleep"]["nights"]
+        if args.no_baseline_sketch:
+            results["hrv"] = analyse_hrv(metrics_df, timeseries_points=args.timeseries_points, sleep_nights=nights)
+            rmssd_sketch = update_baseline_sketch(RmssdSketch(), metrics_df)
+        else:
+            rmssd_sketch = RmssdSketch.load(sketch_path)
+            results["hrv"] = analyse_hrv(metrics_df, baseline_sketch=rmssd_sketch,
+                                         timeseries_points=args.timeseries_points, sleep_nights=nights)
+            rmssd_sketch.save(sketch_path)
+
         print("[Tier 1] Classifying activity...")
         results["activity"] = analyse_activity(metrics_df)
 
         print("[Tier 1] Computing strain scores...")
         results["strain"] = analyse_strain(metrics_df)
 
+    print("[Tier 1] Bootstrapping confidence intervals...")
+    results["confidence"] = bootstrap_confidence(tests_df, rmssd_sketch)
+
     if tests_df is not None:
         print("[Tier 1] Assigning readiness tiers...")
         results["readiness"] = assign_readiness_tiers(results)
@@ -93,21 +172,34 @@ def main():
 
     print("[Tier 1] Assembling full analysis packet...")
     packet = build_context_packet(tests_df, metrics_df, sleep_df, results, graphs_dir)
-
-    with open(full_path, "w") as f:
-        json.dump(packet, f, indent=2, default=str)
+    # Payload, graphs and briefing below still see the full, row-form history; only the
+    # written packet is windowed (and columnar).
+    full_packet = packet
+    if args.window_days:
+        packet = window_packet(full_packet, args.window_days, archive_dir)
+        segments = packet.get("archive", {}).get("segments", [])
+        print(f"[Tier 1] Inline history from {packet.get('archive', {}).get('inline_from', '-')}; "
+              f"{len(segments)} archive segment(s) in {archive_dir}/")
+
+    if args.columnar:
+        packet = columnar_packet(packet)
+
+    full_path = serialize.write(packet, full_path, args.output_format, args.compress)
     print(f"[Tier 1] analysis_full.json -> {full_path}")
 
     print("[Tier 1] Building agent payload...")
-    payload = build_agent_payload(packet, results)
-
-    with open(payload_path, "w") as f:
-        json.dump(payload, f, indent=2, default=str)
-    payload_tokens = len(json.dumps(payload, default=str)) // 4
+    payload = build_agent_payload(full_packet, results, args.payload_token_budget or None)
+    budget = payload.get("budget", {})
+    for action in ("summarized", "dropped"):
+        if budget.get(action):
+            print(f"[Tier 1] Over the {budget['token_budget']}-token budget, {action}: {', '.join(budget[action])}")
+
+    payload_path = serialize.write(payload, payload_path, args.output_format, args.compress)
+    payload_tokens = budget.get("estimated_tokens") or estimate_tokens(payload)
     print(f"[Tier 1] agent_payload.json -> {payload_path}  (~{payload_tokens} tokens)")
 
     print("[Tier 1] Generating graphs...")
-    generate_all_graphs(tests_df, metrics_df, sleep_df, results, packet, graphs_dir)
+    generate_all_graphs(tests_df, metrics_df, sleep_df, results, full_packet, graphs_dir)
     print(f"[Tier 1] Graphs written to {graphs_dir}/")
 
     # --- Tier 2: Analyst LLM (optional) ---
@@ -116,7 +208,7 @@ def main():
         os.makedirs(os.path.dirname(briefing_path) or ".", exist_ok=True)
         print("[Tier 2] Running analyst LLM...")
         from physiological_insights.analyst import generate_briefing
-        briefing = generate_briefing(packet, provider=args.llm_provider, model=args.llm_model)
+        briefing = generate_briefing(full_packet, provider=args.llm_provider, model=args.llm_model)
         with open(briefing_path, "w") as f:
             json.dump(briefing, f, indent=2, default=str)
         print(f"[Tier 2] Agent briefing written to {briefing_path}")
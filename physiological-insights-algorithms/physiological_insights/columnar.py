@@ -0,0 +1,109 @@
+"""Opt-in columnar encoding of the packet's time-series sections.
+
+Sections such as ``daily_summaries`` are lists of row dicts that repeat
+every key name per point. ``to_columns`` stores them as
+``{"columns": [...], "data": {column: [values...]}}`` instead; nested dicts
+(e.g. a summary's ``self_report``) become dotted columns
+(``self_report.stress``) when every row has a non-empty one. Keys absent from some
+rows are stored as None and listed (by row position) under ``missing``.
+``section_frame`` turns either form into a DataFrame straight from the
+column lists, and ``from_columns`` restores the row dicts exactly.
+"""
+
+import pandas as pd
+
+# Paths of the time-series sections in the context packet (see ``context_packet``).
+SECTIONS = (
+    ("daily_summaries",),
+    ("weekly_summaries",),
+    ("trends", "ready_slope_trajectory"),
+    ("trends", "rmssd_slope_trajectory"),
+    ("circadian_profile", "acrophase_series"),
+    ("sleep_sessions", "nights"),
+)
+
+_SEP = "."
+_MISSING = object()
+
+
+def is_columnar(section) -> bool:
+    return isinstance(section, dict) and "columns" in section and "data" in section
+
+
+def _flatten(rows: list[dict], prefix: str = "") -> dict:
+    keys: dict = {}
+    for row in rows:
+        keys.update(dict.fromkeys(row))
+    data = {}
+    for key in keys:
+        values = [row.get(key, _MISSING) for row in rows]
+        if all(isinstance(v, dict) and v for v in values):
+            data.update(_flatten(values, f"{prefix}{key}{_SEP}"))
+        else:
+            data[f"{prefix}{key}"] = values
+    return data
+
+
+def to_columns(rows: list[dict]) -> dict:
+    """Columnar form of a list of row dicts."""
+    data = _flatten(rows)
+    missing = {}
+    for column, values in data.items():
+        absent = [i for i, v in enumerate(values) if v is _MISSING]
+        if absent:
+            missing[column] = absent
+            data[column] = [None if v is _MISSING else v for v in values]
+    section = {"columns": list(data), "data": data}
+    if missing:
+        section["missing"] = missing
+    return section
+
+
+def from_columns(section: dict) -> list[dict]:
+    """Row dicts from ``to_columns`` output, with dotted columns nested again."""
+    columns = section["columns"]
+    missing = {column: set(rows) for column, rows in section.get("missing", {}).items()}
+    rows = []
+    for i, values in enumerate(zip(*(section["data"][c] for c in columns))):
+        row: dict = {}
+        for column, value in zip(columns, values):
+            if column in missing and i in missing[column]:
+                continue
+            *parents, leaf = column.split(_SEP)
+            node = row
+            for parent in parents:
+                node = node.setdefault(parent, {})
+            node[leaf] = value
+        rows.append(row)
+    return rows
+
+
+def section_frame(section) -> pd.DataFrame:
+    """DataFrame of a time-series section in either form (dotted column names for nested fields)."""
+    if not is_columnar(section):
+        section = to_columns(section or [])
+    return pd.DataFrame(section["data"], columns=section["columns"])
+
+
+def _get(packet: dict, path: tuple):
+    node = packet
+    for key in path:
+        if not isinstance(node, dict):
+            return None
+        node = node.get(key)
+    return node
+
+
+def columnar_packet(packet: dict) -> dict:
+    """Copy of ``packet`` with every section in ``SECTIONS`` in columnar form."""
+    out = dict(packet)
+    for path in SECTIONS:
+        rows = _get(out, path)
+        if not isinstance(rows, list):
+            continue
+        parent = out
+        for key in path[:-1]:
+            parent[key] = dict(parent[key])
+            parent = parent[key]
+        parent[path[-1]] = to_columns(rows)
+    return out
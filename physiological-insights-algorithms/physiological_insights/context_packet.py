@@ -14,6 +14,15 @@ def _safe(val, precision=1):
         return val
 
 
+def _context_notes_by_date(tests_df, per_day: int = 5) -> dict:
+    """First ``per_day`` distinct non-blank context notes of each date, in test order."""
+    if tests_df is None or "context_note" not in tests_df.columns:
+        return {}
+    notes = pd.DataFrame({"date": tests_df["date"].astype(str), "note": tests_df["context_note"]}).dropna()
+    notes = notes[notes["note"].str.strip() != ""].drop_duplicates()
+    return notes.groupby("date", sort=False).head(per_day).groupby("date", sort=False)["note"].agg(list).to_dict()
+
+
 def _build_daily_summaries(tests_df, results: dict) -> list[dict]:
     """Build per-day summary dicts from test results and analysis outputs."""
     perf = results.get("performance", {})
@@ -40,6 +49,11 @@ def _build_daily_summaries(tests_df, results: dict) -> list[dict]:
         list(focus_by_date.keys())
     ))
 
+    daily_hrv = {d["date"]: d for d in results.get("hrv", {}).get("daily_rmssd_pct_baseline", [])}
+    # Later nights with the same date win, as when each night overwrote its day in turn
+    nights = {n.get("night_date"): n for n in results.get("sleep", {}).get("nights", [])}
+    notes_by_date = _context_notes_by_date(tests_df)
+
     baseline = perf.get("ready_baseline")
     agility_peak = perf.get("agility", {}).get("peak")
 
@@ -52,15 +66,12 @@ def _build_daily_summaries(tests_df, results: dict) -> list[dict]:
         tier_info = tiers.get(date_str, {})
         act = daily_activity.get(date_str, {})
         st = daily_strain.get(date_str, {})
+        hv = daily_hrv.get(date_str, {})
+        night = nights.get(date_str, {})
 
         ready_mean = rd.get("mean")
         agility_mean = ad.get("mean")
 
-        day_tests = tests_df[tests_df["date"].astype(str) == date_str] if tests_df is not None else pd.DataFrame()
-        notes = []
-        if "context_note" in day_tests.columns:
-            notes = [n for n in day_tests["context_note"].dropna().unique() if n.strip()]
-
         summary = {
             "date": date_str,
             "readiness_tier": tier_info.get("tier", "Unknown"),
@@ -75,13 +86,13 @@ def _build_daily_summaries(tests_df, results: dict) -> list[dict]:
                 "sharpness": _safe(sr.get("sharpness")),
             },
             "hrv": {
-                "morning_rmssd_ms": None,
-                "rmssd_pct_baseline": None,
+                "morning_rmssd_ms": _safe(hv.get("morning_rmssd_ms")),
+                "rmssd_pct_baseline": _safe(hv.get("rmssd_pct_baseline")),
             },
             "sleep": {
-                "duration_min": None,
-                "wake_episodes": None,
-                "hr_nadir_bpm": None,
+                "duration_min": _safe(night.get("duration_min")),
+                "wake_episodes": night.get("wake_episodes"),
+                "hr_nadir_bpm": _safe(night.get("hr_nadir_bpm")),
             },
             "activity": {
                 "exercise_load": act.get("exercise_load"),
@@ -93,20 +104,10 @@ def _build_daily_summaries(tests_df, results: dict) -> list[dict]:
                 "level": st.get("strain_level"),
                 "sleep_need_adjustment_min": st.get("sleep_need_adjustment_min"),
             } if st else None,
-            "context_notes": notes[:5],
+            "context_notes": notes_by_date.get(date_str, []),
         }
         summaries.append(summary)
 
-    sleep_data = results.get("sleep", {})
-    for night in sleep_data.get("nights", []):
-        night_date = night.get("night_date")
-        for s in summaries:
-            if s["date"] == night_date:
-                s["sleep"]["duration_min"] = _safe(night.get("duration_min"))
-                s["sleep"]["wake_episodes"] = night.get("wake_episodes")
-                s["sleep"]["hr_nadir_bpm"] = _safe(night.get("hr_nadir_bpm"))
-                break
-
     return summaries
 
 
@@ -333,6 +334,8 @@ def build_context_packet(tests_df, metrics_df, sleep_df, results: dict, graphs_d
     circ = results.get("circadian", {})
     sleep = results.get("sleep", {})
     readiness = results.get("readiness", {})
+    conf = results.get("confidence", {})
+    rolling = circ.get("rolling") or {}
 
     now = datetime.datetime.now(datetime.timezone.utc).isoformat()
 
@@ -373,6 +376,10 @@ def build_context_packet(tests_df, metrics_df, sleep_df, results: dict, graphs_d
         "focus_peak": perf.get("focus", {}).get("peak"),
         "rmssd_sleep_peak_ms": _safe(hrv.get("rmssd_sleep_peak")),
         "hr_nadir_bpm": None,
+        "ready_top_mean": conf.get("ready_top_mean"),
+        "ready_top_mean_ci": conf.get("ready_top_mean_ci"),
+        "rmssd_baseline_ms": _safe(hrv.get("rmssd_baseline")),
+        "rmssd_baseline_ms_ci": conf.get("rmssd_baseline_ci"),
     }
 
     latest_night = sleep.get("latest_night")
@@ -389,6 +396,13 @@ def build_context_packet(tests_df, metrics_df, sleep_df, results: dict, graphs_d
         "ready_trend_direction": "declining" if (perf.get("ready_7d_slope") or 0) < -0.5 else "improving" if (perf.get("ready_7d_slope") or 0) > 0.5 else "stable",
         "rmssd_7d_slope": _safe(hrv.get("rmssd_7d_slope")),
         "agility_trend": "stable",
+        "ready_slope_trajectory": [
+            {"date": str(d["date"])[:10], "slope": _safe(d["slope_7d"], 2)}
+            for d in perf.get("daily_ready", []) if _safe(d.get("slope_7d")) is not None
+        ],
+        "rmssd_slope_trajectory": [
+            {"date": d["date"], "slope": _safe(d["slope"], 2)} for d in hrv.get("rmssd_slope_trajectory", [])
+        ],
     }
 
     circadian_profile = {
@@ -402,6 +416,13 @@ def build_context_packet(tests_df, metrics_df, sleep_df, results: dict, graphs_d
         "natural_wake_local": circ.get("natural_wake_local"),
         "bedtime_variance_min": _safe(circ.get("bedtime_variance_min"), 0),
         "chronotype_estimate": circ.get("chronotype_estimate"),
+        "acrophase_ci_hours": conf.get("acrophase_hour_ci"),
+        "acrophase_ci_width_hours": conf.get("acrophase_ci_width_hours"),
+        "peak_window_ci": conf.get("peak_window_ci"),
+        "chronotype_agreement": conf.get("chronotype_agreement"),
+        "acrophase_series": rolling.get("acrophase_series", []),
+        "acrophase_drift_min_per_day": rolling.get("acrophase_drift_min_per_day"),
+        "rolling_window_days": rolling.get("window_days"),
     }
 
     latest_tier = readiness.get("latest_tier", {})
@@ -430,6 +451,7 @@ def build_context_packet(tests_df, metrics_df, sleep_df, results: dict, graphs_d
         "weekly_summaries": weekly_summaries,
         "trends": trends,
         "patterns_detected": results.get("patterns", []),
+        "lifestyle_tags": results.get("lifestyle_tags", {}),
         "circadian_profile": circadian_profile,
         "task_matching": task_matching,
         "sleep_sessions": _build_sleep_session_section(results),
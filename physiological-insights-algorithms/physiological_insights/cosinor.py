@@ -0,0 +1,105 @@
+"""Closed-form least-squares cosinor fits, batched over users or test types.
+
+The 24-hour model ``y = MESOR + A*cos(2*pi*(t - acrophase)/24)`` is linear in
+``[1, cos(wt), sin(wt)]`` (coefficients MESOR, A*cos(w*acrophase),
+A*sin(w*acrophase)), so each fit is a 3x3 normal-equation solve. Fits are
+built from per-group sufficient statistics (``X'X``, ``X'y``, ``y'y``, n), which
+lets one numpy call fit any number of groups, and lets callers add or remove
+observations without refitting from scratch.
+
+Standard errors come from the residual variance and ``(X'X)^-1``. Amplitude
+and acrophase errors use the delta method.
+"""
+
+import numpy as np
+
+PERIOD_HOURS = 24.0
+_OMEGA = 2 * np.pi / PERIOD_HOURS
+# Below this reciprocal condition number the hours don't identify a rhythm.
+_MIN_RCOND = 1e-10
+
+
+def design(hours) -> np.ndarray:
+    """Cosinor design matrix ``[1, cos(wt), sin(wt)]`` along a new last axis."""
+    t = np.asarray(hours, dtype=np.float64) * _OMEGA
+    return np.stack([np.ones_like(t), np.cos(t), np.sin(t)], axis=-1)
+
+
+def sufficient_stats(hours, scores, groups=None, n_groups: int | None = None):
+    """Per-group ``(X'X, X'y, y'y, n)`` for observations with a non-NaN score.
+
+    ``groups`` holds an integer group id per observation (default: one group).
+    Returns arrays shaped (G, 3, 3), (G, 3), (G,) and (G,).
+    """
+    hours = np.asarray(hours, dtype=np.float64)
+    scores = np.asarray(scores, dtype=np.float64)
+    groups = np.zeros(len(hours), dtype=np.int64) if groups is None else np.asarray(groups)
+    if n_groups is None:
+        n_groups = int(groups.max()) + 1 if len(groups) else 1
+
+    keep = ~np.isnan(scores) & ~np.isnan(hours)
+    x, y, g = design(hours[keep]), scores[keep], groups[keep]
+
+    xtx = np.empty((n_groups, 3, 3))
+    for i in range(3):
+        for j in range(i, 3):
+            xtx[:, i, j] = xtx[:, j, i] = np.bincount(g, weights=x[:, i] * x[:, j], minlength=n_groups)
+    xty = np.stack([np.bincount(g, weights=x[:, i] * y, minlength=n_groups) for i in range(3)], axis=-1)
+    yty = np.bincount(g, weights=y * y, minlength=n_groups)
+    n = np.bincount(g, minlength=n_groups)
+    return xtx, xty, yty, n
+
+
+def solve(xtx: np.ndarray, xty: np.ndarray, yty: np.ndarray, n: np.ndarray) -> dict:
+    """Fit every group from its sufficient statistics in one batched solve.
+
+    Returns a dict of arrays: ``mesor``, ``amplitude``, ``acrophase_hour``
+    (0-24), their standard errors (``*_se``; acrophase in hours), ``n`` and
+    ``ok`` (False where the group has fewer than 4 observations or its hours
+    can't separate the cosine and sine terms; values there are NaN).
+    """
+    xtx = np.asarray(xtx, dtype=np.float64)
+    n = np.asarray(n)
+    eig = np.linalg.eigvalsh(xtx)
+    ok = (n > 3) & (eig[..., 0] > _MIN_RCOND * np.maximum(eig[..., -1], 1e-300))
+
+    safe = np.where(ok[..., None, None], xtx, np.eye(3))
+    inv = np.linalg.inv(safe)
+    beta = np.einsum("...ij,...j->...i", inv, xty)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rss = np.maximum(yty - np.einsum("...i,...i->...", beta, xty), 0.0)
+        sigma2 = rss / (n - 3)
+        cov = sigma2[..., None, None] * inv
+
+        mesor, b_cos, b_sin = beta[..., 0], beta[..., 1], beta[..., 2]
+        amplitude = np.hypot(b_cos, b_sin)
+        phase = np.arctan2(b_sin, b_cos)
+        cos_p, sin_p = np.cos(phase), np.sin(phase)
+        c11, c22, c12 = cov[..., 1, 1], cov[..., 2, 2], cov[..., 1, 2]
+        amp_var = cos_p ** 2 * c11 + sin_p ** 2 * c22 + 2 * cos_p * sin_p * c12
+        phase_var = (sin_p ** 2 * c11 + cos_p ** 2 * c22 - 2 * cos_p * sin_p * c12) / amplitude ** 2
+
+    def masked(values):
+        return np.where(ok, values, np.nan)
+
+    return {
+        "mesor": masked(mesor),
+        "amplitude": masked(amplitude),
+        "acrophase_hour": masked((phase / _OMEGA) % PERIOD_HOURS),
+        "mesor_se": masked(np.sqrt(cov[..., 0, 0])),
+        "amplitude_se": masked(np.sqrt(amp_var)),
+        "acrophase_se_hours": masked(np.sqrt(phase_var) / _OMEGA),
+        "n": n,
+        "ok": ok,
+    }
+
+
+def fit_cosinor(hours, scores, groups=None, n_groups: int | None = None) -> dict:
+    """Closed-form cosinor fit per group (see ``solve`` for the returned arrays)."""
+    return solve(*sufficient_stats(hours, scores, groups, n_groups))
+
+
+def curve(hours, mesor: float, amplitude: float, acrophase_hour: float) -> np.ndarray:
+    """Evaluate the fitted 24-hour cosine at ``hours``."""
+    return mesor + amplitude * np.cos(_OMEGA * (np.asarray(hours) - acrophase_hour))
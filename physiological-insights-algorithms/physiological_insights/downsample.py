@@ -0,0 +1,74 @@
+"""Largest-Triangle-Three-Buckets (LTTB) downsampling to a point budget.
+
+LTTB keeps the first and last points and splits the rest into equal-count
+buckets. From each bucket it picks the point that forms the largest
+triangle with the point picked from the previous bucket and the mean of
+the next bucket. Unlike bucket means, this keeps the shape of the series,
+including short peaks and troughs such as nocturnal HR dips, at a fixed
+number of points however long the recording is.
+
+Functions return indices into the input, so several columns sharing an x
+axis can be sliced together.
+"""
+
+import numpy as np
+
+
+def lttb(x, y, n_out: int) -> np.ndarray:
+    """Indices of the ``n_out`` points LTTB keeps from (``x``, ``y``), in order.
+
+    ``x`` must be increasing and ``y`` free of NaN (see ``lttb_indices``).
+    Series no longer than ``n_out`` are returned whole.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:max(n_out, 0)], dtype=np.int64)
+
+    # Bucket b covers [edges[b], edges[b + 1]); first and last points are buckets of their own.
+    edges = 1 + np.arange(n_out - 1) * (n - 2) // (n_out - 2)
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / sizes
+    mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / sizes
+    # "Next bucket" averages, with the last point standing in after the final bucket.
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - next_x[b]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (next_y[b] - ay))
+        a = lo + int(np.argmax(area))
+        out[b + 1] = a
+    return out
+
+
+def lttb_indices(x, ys, n_out: int) -> np.ndarray:
+    """Sorted indices keeping the shape of every series in ``ys`` within ``n_out`` points in total.
+
+    ``x`` is shared (numbers, or naive datetime64 converted to seconds).
+    Each series gets an equal share of the budget, ignoring its NaN
+    positions, and the picks are merged. The share is never rounded up, so
+    the total stays within ``n_out``; below 3 points per series, LTTB keeps
+    only each series' end points (see ``lttb``).
+    """
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ns]").astype(np.int64) / 1e9
+    x = x.astype(np.float64)
+    ys = [np.asarray(y, dtype=np.float64) for y in ys]
+    if len(x) <= n_out or not ys:
+        return np.arange(len(x))
+
+    share = n_out // len(ys)
+    picked = []
+    for y in ys:
+        valid = np.flatnonzero(~np.isnan(y))
+        picked.append(valid[lttb(x[valid], y[valid], share)])
+    return np.unique(np.concatenate(picked))
@@ -0,0 +1,75 @@
+"""Per-epoch motion features shared by the sleep, activity and strain analysers.
+
+Accelerometer energy is computed once per epoch, column-wise in numpy, in two
+variants: RMS-based (``sqrt`` of the summed squared ``acc_*rms*`` columns) and
+energyPerSec-based (sum of the ``acc_*energyPerSec*`` columns). Each analyser
+then picks its own preference order between them.
+"""
+
+import numpy as np
+import pandas as pd
+
+MOTION_RMS = "motion_rms_energy"
+MOTION_EPS = "motion_eps_energy"
+
+
+def _rms_columns(df: pd.DataFrame) -> list[str]:
+    return [c for c in df.columns if c.startswith("acc_") and "rms" in c.lower()]
+
+
+def _eps_columns(df: pd.DataFrame) -> list[str]:
+    return [c for c in df.columns if c.startswith("acc_") and "energyPerSec" in c]
+
+
+def epoch_motion(df: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Return (RMS energy, energyPerSec energy) arrays for every epoch in ``df``.
+
+    RMS energy is NaN where an epoch has no RMS reading (or there are no RMS
+    columns); energyPerSec energy treats missing readings as 0 and is NaN only
+    when the export has no energyPerSec columns at all.
+    """
+    if MOTION_RMS in df.columns and MOTION_EPS in df.columns:
+        return df[MOTION_RMS].to_numpy(), df[MOTION_EPS].to_numpy()
+
+    rms_cols = _rms_columns(df)
+    if rms_cols:
+        rms = df[rms_cols].to_numpy(dtype=np.float64)
+        present = ~np.isnan(rms).all(axis=1)
+        rms_energy = np.where(present, np.sqrt(np.nansum(rms * rms, axis=1)), np.nan)
+    else:
+        rms_energy = np.full(len(df), np.nan)
+
+    eps_cols = _eps_columns(df)
+    if eps_cols:
+        eps_energy = np.nansum(df[eps_cols].to_numpy(dtype=np.float64), axis=1)
+    else:
+        eps_energy = np.full(len(df), np.nan)
+    return rms_energy, eps_energy
+
+
+def add_epoch_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Compute the motion features once and store them on ``df`` (in place).
+
+    Analysers given a frame that already carries ``motion_rms_energy`` and
+    ``motion_eps_energy`` reuse them instead of recomputing.
+    """
+    df[MOTION_RMS], df[MOTION_EPS] = epoch_motion(df)
+    return df
+
+
+def sleep_energy(df: pd.DataFrame) -> np.ndarray:
+    """RMS energy, falling back to energyPerSec (then 0) for epochs without RMS."""
+    rms, eps = epoch_motion(df)
+    return np.where(np.isnan(rms), np.nan_to_num(eps, nan=0.0), rms)
+
+
+def activity_energy(df: pd.DataFrame) -> np.ndarray:
+    """energyPerSec energy when the export has those columns, otherwise RMS energy."""
+    rms, eps = epoch_motion(df)
+    return np.nan_to_num(eps if _eps_columns(df) else rms, nan=0.0)
+
+
+def strain_energy(df: pd.DataFrame) -> np.ndarray:
+    """energyPerSec energy, or 0 when the export has no energyPerSec columns."""
+    _, eps = epoch_motion(df)
+    return np.nan_to_num(eps, nan=0.0)
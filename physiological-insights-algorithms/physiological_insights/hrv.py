@@ -1,11 +1,20 @@
 """HRV analysis: personal baseline, diurnal profile, rolling trends."""
 
+import warnings
+
 import numpy as np
 import pandas as pd
-from scipy import stats
+
+from physiological_insights.downsample import lttb_indices
+from physiological_insights.hrv_baseline import TOP_FRACTION, RmssdSketch, day_keys
+from physiological_insights.rollups import build_rollups, bucket_mean, by_hour_of_day
+from physiological_insights.trends import linear_trend, rolling_trend
 
 
 _CONFIDENCE_THRESHOLD = 0.7
+TIMESERIES_MAX_POINTS = 2000
+# Window before each night's sleep offset that stands in for the morning reading.
+_MORNING_WINDOW = pd.Timedelta(hours=1)
 
 
 def _valid_hrv(df: pd.DataFrame) -> pd.DataFrame:
@@ -18,9 +27,67 @@ def _valid_hrv(df: pd.DataFrame) -> pd.DataFrame:
     return df.loc[mask].copy()
 
 
-def analyse_hrv(df: pd.DataFrame) -> dict:
-    """Compute HRV metrics from decoded-metrics DataFrame."""
+def _daily_morning_rmssd(valid: pd.DataFrame, nights: list, baseline: float | None) -> list[dict]:
+    """Per wake date: mean RMSSD over the hour before each night's sleep offset, and as % of baseline."""
+    offsets = [n["sleep_offset"] for n in nights if n.get("sleep_offset")]
+    if not offsets or not baseline:
+        return []
+    wake = pd.DatetimeIndex(pd.to_datetime(offsets, utc=True)).sort_values()
+    wake_ns = wake.as_unit("ns").asi8
+    t = valid["datetime"].dt.tz_localize(None).to_numpy().astype("datetime64[ns]").astype(np.int64)
+    # Each epoch belongs to the first wake at or after it; keep those within the hour before it.
+    night = np.searchsorted(wake_ns, t, side="left")
+    inside = night < len(wake_ns)
+    inside[inside] = t[inside] >= wake_ns[night[inside]] - _MORNING_WINDOW.value
+    wake_date = np.asarray(wake.tz_convert(valid["datetime_et"].dt.tz).date, dtype=object)
+    means = pd.Series(valid["cardio_RMSSD_ms"].to_numpy()[inside]).groupby(wake_date[night[inside]]).mean()
+    return [
+        {"date": str(d), "morning_rmssd_ms": round(float(v), 1),
+         "rmssd_pct_baseline": round(float(v) / baseline * 100, 1)}
+        for d, v in means.items() if not np.isnan(v)
+    ]
+
+
+def update_baseline_sketch(sketch: RmssdSketch, df: pd.DataFrame) -> RmssdSketch:
+    """Feed ``sketch`` the valid RMSSD epochs of ``df`` it has not seen yet.
+
+    Those are epochs newer than its watermark, plus older ones from UTC days
+    the sketch has no samples for (late-synced nights). Older epochs from a
+    day it already covers can't be told apart from ones it counted; if a
+    day has more of them than the sketch holds, they are skipped with a
+    warning.
+    """
+    valid = _valid_hrv(df)
+    ts = valid["timestamp"].to_numpy()
+    if sketch.watermark is not None:
+        days = day_keys(ts)
+        late = ts <= sketch.watermark
+        seen = np.isin(days, list(sketch.day_counts))
+        late_seen = pd.Series(days[late & seen]).value_counts()
+        missed = sum(n - sketch.day_counts[d] for d, n in late_seen.items() if n > sketch.day_counts[d])
+        if missed:
+            warnings.warn(f"{missed} RMSSD epoch(s) at or before the baseline sketch's watermark fall on days "
+                          "it already covers and are skipped", stacklevel=2)
+        keep = ~late | ~seen
+        valid, ts = valid[keep], ts[keep]
+    return sketch.update(valid["cardio_RMSSD_ms"].to_numpy(), ts)
+
+
+def analyse_hrv(df: pd.DataFrame, baseline_sketch: RmssdSketch | None = None,
+                timeseries_points: int = TIMESERIES_MAX_POINTS, sleep_nights: list | None = None) -> dict:
+    """Compute HRV metrics from decoded-metrics DataFrame.
+
+    With ``baseline_sketch``, new epochs are folded into the sketch and
+    ``rmssd_baseline`` is read from it (covering all history the sketch has
+    seen), with its error bound in ``rmssd_baseline_error_ms``.
+    ``timeseries`` is LTTB-downsampled from 1-minute means to at most
+    ``timeseries_points`` points. ``sleep_nights`` (``sleep.analyse_sleep``'s
+    nights) anchor the morning RMSSD on each night's wake time: per day, and
+    for ``morning_rmssd`` / ``rmssd_pct_baseline`` from the latest such day.
+    """
     result: dict = {}
+    if baseline_sketch is not None:
+        update_baseline_sketch(baseline_sketch, df)
     valid = _valid_hrv(df)
 
     if valid.empty:
@@ -29,17 +96,22 @@ def analyse_hrv(df: pd.DataFrame) -> dict:
             "rmssd_sleep_peak": None,
             "morning_rmssd": None,
             "rmssd_pct_baseline": None,
+            "daily_rmssd_pct_baseline": [],
             "sdnn_mean": None,
             "diurnal_profile": [],
             "rmssd_7d_slope": None,
+            "rmssd_slope_trajectory": [],
             "hr_range": None,
         }
 
     rmssd = valid["cardio_RMSSD_ms"]
 
     # Personal RMSSD baseline: mean of top 20%
-    top20_threshold = rmssd.quantile(0.80)
-    result["rmssd_baseline"] = float(rmssd[rmssd >= top20_threshold].mean())
+    if baseline_sketch is not None:
+        result["rmssd_baseline"], result["rmssd_baseline_error_ms"] = baseline_sketch.top_mean()
+    else:
+        top20_threshold = rmssd.quantile(1 - TOP_FRACTION)
+        result["rmssd_baseline"] = float(rmssd[rmssd >= top20_threshold].mean())
 
     # Sleep RMSSD peak: max 30-min rolling mean where HR < 65
     sleep_mask = valid["heart_rate_mean"] < 65
@@ -50,27 +122,39 @@ def analyse_hrv(df: pd.DataFrame) -> dict:
     else:
         result["rmssd_sleep_peak"] = None
 
-    # Morning RMSSD: mean in last 60 min of recording where wear_on
-    # (proxy — actual morning detection uses sleep offset from sleep module)
-    last_ts = valid["datetime"].max()
-    morning_window = valid[valid["datetime"] >= last_ts - pd.Timedelta(hours=1)]
-    result["morning_rmssd"] = float(morning_window["cardio_RMSSD_ms"].mean()) if not morning_window.empty else None
-
-    if result["morning_rmssd"] and result["rmssd_baseline"]:
-        result["rmssd_pct_baseline"] = round(result["morning_rmssd"] / result["rmssd_baseline"] * 100, 1)
+    # Morning RMSSD: the latest night's hour before sleep offset, as in the per-day
+    # series; without sleep nights, the last 60 min of wear_on recording (proxy)
+    result["daily_rmssd_pct_baseline"] = _daily_morning_rmssd(valid, sleep_nights or [], result["rmssd_baseline"])
+    if any(n.get("sleep_offset") for n in sleep_nights or []):
+        latest = result["daily_rmssd_pct_baseline"][-1] if result["daily_rmssd_pct_baseline"] else {}
+        result["morning_rmssd"] = latest.get("morning_rmssd_ms")
+        result["rmssd_pct_baseline"] = latest.get("rmssd_pct_baseline")
     else:
-        result["rmssd_pct_baseline"] = None
+        last_ts = valid["datetime"].max()
+        morning_window = valid[valid["datetime"] >= last_ts - pd.Timedelta(hours=1)]
+        result["morning_rmssd"] = float(morning_window["cardio_RMSSD_ms"].mean()) if not morning_window.empty else None
+
+        if result["morning_rmssd"] and result["rmssd_baseline"]:
+            result["rmssd_pct_baseline"] = round(result["morning_rmssd"] / result["rmssd_baseline"] * 100, 1)
+        else:
+            result["rmssd_pct_baseline"] = None
 
     # SDNN
     sdnn = valid["cardio_SDNN_ms"]
     result["sdnn_mean"] = float(sdnn.mean()) if not sdnn.isna().all() else None
 
+    # Rollup pyramid (1min/5min/1h/1D); diurnal, daily and time-series views read from it
+    rollups = build_rollups(valid["datetime_et"], {
+        "rmssd": rmssd.to_numpy(),
+        "hr": valid["heart_rate_mean"].to_numpy(),
+    })
+    result["rollups"] = rollups
+
     # Diurnal profile: hourly mean RMSSD
-    valid_copy = valid.copy()
-    valid_copy["hour"] = valid_copy["datetime_et"].dt.hour
-    hourly = valid_copy.groupby("hour")["cardio_RMSSD_ms"].mean().reset_index()
-    hourly.columns = ["hour", "rmssd_mean"]
-    result["diurnal_profile"] = hourly.to_dict(orient="records")
+    hourly = by_hour_of_day(rollups["1h"], "rmssd")
+    result["diurnal_profile"] = [
+        {"hour": int(hour), "rmssd_mean": float(value)} for hour, value in hourly.items()
+    ]
 
     # HR range
     hr = valid["heart_rate_mean"]
@@ -80,19 +164,28 @@ def analyse_hrv(df: pd.DataFrame) -> dict:
     else:
         result["hr_range"] = None
 
-    # RMSSD daily means for trend (group by date)
-    valid_copy["date"] = valid_copy["datetime_et"].dt.date
-    daily_rmssd = valid_copy.groupby("date")["cardio_RMSSD_ms"].mean()
+    # RMSSD daily means for trend
+    daily_rmssd = bucket_mean(rollups["1D"], "rmssd").dropna()
     if len(daily_rmssd) >= 2:
-        x = np.arange(len(daily_rmssd), dtype=float)
-        slope, _, _, _, _ = stats.linregress(x, daily_rmssd.values)
-        result["rmssd_7d_slope"] = float(slope)
+        result["rmssd_7d_slope"] = float(linear_trend(daily_rmssd.to_numpy())["slope"])
     else:
         result["rmssd_7d_slope"] = None
-
-    # Full time series for visualization (downsample to 5-min for efficiency)
-    ts = valid[["datetime_et", "cardio_RMSSD_ms", "heart_rate_mean"]].copy()
-    ts = ts.set_index("datetime_et").resample("5min").mean().dropna(how="all").reset_index()
-    result["timeseries"] = ts.to_dict(orient="records")
+    # Slope over the last 7 days with readings, for every such day
+    rolling = rolling_trend(daily_rmssd.to_numpy(), 7)["slope"]
+    result["rmssd_slope_trajectory"] = [
+        {"date": str(day.date()), "slope": float(slope)}
+        for day, slope in zip(daily_rmssd.index, rolling) if not np.isnan(slope)
+    ]
+
+    # Time series for visualization: 1-min means, LTTB-downsampled to the point budget
+    one_min = rollups["1min"]
+    series = pd.DataFrame({
+        "datetime_et": one_min.index,
+        "cardio_RMSSD_ms": bucket_mean(one_min, "rmssd").to_numpy(),
+        "heart_rate_mean": bucket_mean(one_min, "hr").to_numpy(),
+    })
+    keep = lttb_indices(one_min.index.asi8 / 1e9, [series["cardio_RMSSD_ms"], series["heart_rate_mean"]],
+                        timeseries_points)
+    result["timeseries"] = series.iloc[keep].to_dict(orient="records")
 
     return result
@@ -0,0 +1,191 @@
+"""Mergeable RMSSD sketch for the personal HRV baseline.
+
+The baseline is the mean of the top 20% of valid RMSSD samples. Instead of
+keeping every epoch, ``RmssdSketch`` stores a log-binned histogram with a
+count and a running sum per bin (bin edges grow geometrically, so each bin is
+~2x ``relative_accuracy`` wide). Sketches update with new samples, merge by
+adding bins, and persist as small JSON files, so a nightly run only feeds
+epochs newer than the stored watermark. The sketch also keeps bin counts
+per UTC day: epochs at or before the watermark from a day it has never seen
+(an older night that synced late) are still added, and the baseline's
+bootstrap interval resamples whole days rather than autocorrelated epochs.
+
+Bins wholly above the 80th percentile contribute their exact sums; only the
+bin holding the percentile is estimated (from its mean). ``top_mean`` returns
+a guaranteed absolute error bound alongside the estimate, covering both the
+spread inside that bin and samples tied at the percentile. With the default
+1% accuracy the bound is about 1% of the baseline, and the actual error is
+typically well under 0.1%.
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+RELATIVE_ACCURACY = 0.01
+TOP_FRACTION = 0.20
+
+_FORMAT_VERSION = 3
+
+
+def day_keys(timestamps) -> np.ndarray:
+    """UTC date (YYYY-MM-DD) of each Unix-seconds timestamp, the sketch's coverage key."""
+    seconds = np.floor(np.asarray(timestamps, dtype=np.float64)).astype(np.int64)
+    return seconds.astype("datetime64[s]").astype("datetime64[D]").astype(str)
+
+
+class RmssdSketch:
+    """Log-binned (count, sum) histogram of RMSSD samples with a time watermark."""
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self._log_gamma = math.log((1 + relative_accuracy) / (1 - relative_accuracy))
+        self._counts: dict[int, int] = {}
+        self._sums: dict[int, float] = {}
+        self.count = 0
+        self.watermark = None  # latest sample time fed in (Unix seconds)
+        self._day_bins: dict[str, dict[int, int]] = {}  # UTC day -> bin counts (samples fed with timestamps)
+
+    def _edges(self, index: int) -> tuple[float, float]:
+        return math.exp((index - 1) * self._log_gamma), math.exp(index * self._log_gamma)
+
+    def update(self, values, timestamps=None) -> "RmssdSketch":
+        """Add positive RMSSD samples (ms); ``timestamps`` (Unix s) advance the watermark and day bins."""
+        values = np.asarray(values, dtype=np.float64)
+        positive = values > 0
+        values = values[positive]
+        if len(values):
+            idx = np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+            bins, inverse, counts = np.unique(idx, return_inverse=True, return_counts=True)
+            sums = np.bincount(inverse, weights=values)
+            for b, c, s in zip(bins.tolist(), counts.tolist(), sums.tolist()):
+                self._counts[b] = self._counts.get(b, 0) + c
+                self._sums[b] = self._sums.get(b, 0.0) + s
+            self.count += len(values)
+            if timestamps is not None and len(timestamps):
+                days, day_inverse = np.unique(day_keys(np.asarray(timestamps)[positive]), return_inverse=True)
+                pairs, pair_n = np.unique(day_inverse * len(bins) + inverse, return_counts=True)
+                for pair, c in zip(pairs.tolist(), pair_n.tolist()):
+                    day = self._day_bins.setdefault(str(days[pair // len(bins)]), {})
+                    b = int(bins[pair % len(bins)])
+                    day[b] = day.get(b, 0) + c
+        if timestamps is not None and len(timestamps):
+            latest = float(np.max(timestamps))
+            self.watermark = latest if self.watermark is None else max(self.watermark, latest)
+        return self
+
+    def merge(self, other: "RmssdSketch") -> "RmssdSketch":
+        """Fold ``other`` (e.g. another file or shard) into this sketch."""
+        if not math.isclose(other._log_gamma, self._log_gamma):
+            raise ValueError("Cannot merge sketches built with different relative accuracy")
+        for b, c in other._counts.items():
+            self._counts[b] = self._counts.get(b, 0) + c
+            self._sums[b] = self._sums.get(b, 0.0) + other._sums[b]
+        self.count += other.count
+        for d, other_bins in other._day_bins.items():
+            day = self._day_bins.setdefault(d, {})
+            for b, c in other_bins.items():
+                day[b] = day.get(b, 0) + c
+        if other.watermark is not None:
+            self.watermark = other.watermark if self.watermark is None else max(self.watermark, other.watermark)
+        return self
+
+    @property
+    def day_counts(self) -> dict[str, int]:
+        """Samples fed in per UTC day (only samples given with timestamps)."""
+        return {d: sum(b.values()) for d, b in self._day_bins.items()}
+
+    def day_bin_counts(self) -> tuple[list[str], np.ndarray]:
+        """UTC days and their (days x bins) sample counts, columns aligned with ``bins()``."""
+        keys = sorted(self._counts)
+        column = {k: i for i, k in enumerate(keys)}
+        days = sorted(self._day_bins)
+        counts = np.zeros((len(days), len(keys)), dtype=np.int64)
+        for row, d in enumerate(days):
+            for b, c in self._day_bins[d].items():
+                counts[row, column[b]] = c
+        return days, counts
+
+    def bins(self) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(lower edge, upper edge, count, sum) per occupied bin, ascending."""
+        keys = sorted(self._counts)
+        lower, upper = zip(*(self._edges(k) for k in keys)) if keys else ((), ())
+        return (
+            np.array(lower), np.array(upper),
+            np.array([self._counts[k] for k in keys], dtype=np.int64),
+            np.array([self._sums[k] for k in keys]),
+        )
+
+    def top_mean(self, fraction: float = TOP_FRACTION) -> tuple[float | None, float | None]:
+        """Estimated mean of the top ``fraction`` of samples and its absolute error bound.
+
+        The bound holds even when samples tied at the percentile (which the
+        batch estimator also includes) fill the rest of the boundary bin.
+        """
+        if self.count == 0:
+            return None, None
+        # Samples at or above the linear-interpolated (1 - fraction) quantile.
+        keep = self.count - math.ceil((self.count - 1) * (1 - fraction))
+        lower, upper, counts, sums = self.bins()
+
+        # Boundary bin: the highest bin at which the top-down count reaches ``keep``.
+        from_top = np.cumsum(counts[::-1])
+        i = len(counts) - 1 - int(np.searchsorted(from_top, keep))
+        above_n = int(counts[i + 1:].sum())
+        above_sum = float(sums[i + 1:].sum())
+        need = keep - above_n
+
+        estimate = (above_sum + need * sums[i] / counts[i]) / keep
+        highest = (above_sum + need * upper[i]) / keep
+        lowest = (above_sum + counts[i] * lower[i]) / (above_n + counts[i])
+        return float(estimate), float(max(highest - estimate, estimate - lowest))
+
+    def to_dict(self) -> dict:
+        keys = sorted(self._counts)
+        return {
+            "version": _FORMAT_VERSION,
+            "relative_accuracy": self.relative_accuracy,
+            "count": self.count,
+            "watermark": self.watermark,
+            "days": {
+                d: {"index": sorted(bins), "count": [bins[k] for k in sorted(bins)]}
+                for d, bins in sorted(self._day_bins.items())
+            },
+            "bins": {
+                "index": keys,
+                "count": [self._counts[k] for k in keys],
+                "sum": [self._sums[k] for k in keys],
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RmssdSketch":
+        sketch = cls(data["relative_accuracy"])
+        bins = data["bins"]
+        sketch._counts = dict(zip(bins["index"], bins["count"]))
+        sketch._sums = dict(zip(bins["index"], bins["sum"]))
+        sketch.count = data["count"]
+        sketch.watermark = data["watermark"]
+        sketch._day_bins = {d: dict(zip(day["index"], day["count"])) for d, day in data["days"].items()}
+        return sketch
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RmssdSketch":
+        """Load a saved sketch, or start an empty one if ``path`` doesn't exist yet."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported RMSSD sketch format in {path}; delete it to rebuild the sketch "
+                             "from the metrics (it predates per-day bin counts)")
+        return cls.from_dict(data)
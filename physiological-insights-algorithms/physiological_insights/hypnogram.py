@@ -0,0 +1,155 @@
+"""Per-epoch hypnogram metrics from the sleep-sessions stage arrays.
+
+Every session's 30-second stage vector is concatenated into one flat array,
+run-length encoded, and reduced per night with numpy grouping operations, so
+the cost is linear in total epochs with no Python loop per night or epoch.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Stage list decoded from the fatigue export (see ingest.STAGE_LIST_COLUMNS).
+STAGE_COLUMN = "sleep_stage_smoothed_list"
+_FALLBACK_STAGE_COLUMN = "sleep_stage_list"
+
+# Vendor stage codes (cross-checked against total_wake/light/deep/rem).
+STAGE_WAKE = 0
+STAGE_LIGHT = 2
+STAGE_DEEP = 3
+STAGE_REM = 5
+_SLEEP_STAGES = (STAGE_LIGHT, STAGE_DEEP, STAGE_REM)
+
+_EPOCH_MIN = 0.5
+# REM bouts closer than this belong to the same REM period (cycle).
+_REM_PERIOD_GAP_EPOCHS = 30
+
+METRIC_KEYS = (
+    "sleep_onset_latency_min", "deep_latency_min", "rem_latency_min",
+    "stage_transitions", "rem_cycles", "rem_cycle_period_min",
+    "waso_min", "waso_bouts", "longest_wake_bout_min",
+)
+
+
+def _flatten(stages) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Concatenate per-night arrays; return (flat, night id per epoch, night offsets)."""
+    lengths = np.array([len(s) if s is not None else 0 for s in stages], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    parts = [np.asarray(s, dtype=np.int8) for s in stages if s is not None and len(s)]
+    flat = np.concatenate(parts) if parts else np.empty(0, dtype=np.int8)
+    night = np.repeat(np.arange(len(lengths)), lengths)
+    return flat, night, offsets
+
+
+def run_lengths(stages) -> pd.DataFrame:
+    """Run-length encode each night's stage vector.
+
+    Returns one row per segment: ``night`` (position in ``stages``), ``start``
+    (epoch index within the night), ``length`` (epochs) and ``stage``.
+    """
+    flat, night, offsets = _flatten(stages)
+    if len(flat) == 0:
+        return pd.DataFrame({"night": [], "start": [], "length": [], "stage": []}, dtype=np.int64)
+
+    change = np.empty(len(flat), dtype=bool)
+    change[0] = True
+    change[1:] = (flat[1:] != flat[:-1]) | (night[1:] != night[:-1])
+    seg_start = np.flatnonzero(change)
+    seg_len = np.diff(np.append(seg_start, len(flat)))
+    seg_night = night[seg_start]
+
+    return pd.DataFrame({
+        "night": seg_night,
+        "start": seg_start - offsets[seg_night],
+        "length": seg_len,
+        "stage": flat[seg_start],
+    })
+
+
+def _first_per_night(night_ids: np.ndarray, values: np.ndarray, n_nights: int) -> np.ndarray:
+    """First value per night for night-sorted inputs; NaN where a night has none."""
+    out = np.full(n_nights, np.nan)
+    uniq, first = np.unique(night_ids, return_index=True)
+    out[uniq] = values[first]
+    return out
+
+
+def hypnogram_metrics(stages) -> pd.DataFrame:
+    """Compute sleep-architecture timing metrics for every night in one pass.
+
+    ``stages`` is a sequence of per-night int stage arrays. Returns a DataFrame
+    with one row per night and the columns in ``METRIC_KEYS`` (NaN where the
+    night has no staged sleep). Sleep-onset latency is only defined when the
+    array starts awake; vendor sessions begin at sleep onset, so it is NaN
+    for them rather than 0. Latencies to deep/REM are measured from sleep
+    onset; WASO counts wake between sleep onset and the final sleep epoch.
+    """
+    n = len(stages)
+    segs = run_lengths(stages)
+    out = pd.DataFrame(np.nan, index=np.arange(n), columns=list(METRIC_KEYS))
+    if segs.empty:
+        return out
+
+    night = segs["night"].to_numpy()
+    start = segs["start"].to_numpy()
+    length = segs["length"].to_numpy()
+    stage = segs["stage"].to_numpy()
+    end = start + length
+
+    starts_awake = _first_per_night(night, stage, n) == STAGE_WAKE
+    is_sleep = np.isin(stage, _SLEEP_STAGES)
+    onset = _first_per_night(night[is_sleep], start[is_sleep], n)
+    rev = np.flatnonzero(is_sleep)[::-1]
+    final_sleep_end = _first_per_night(night[rev], end[rev], n)
+
+    deep = stage == STAGE_DEEP
+    rem = stage == STAGE_REM
+    first_deep = _first_per_night(night[deep], start[deep], n)
+    first_rem = _first_per_night(night[rem], start[rem], n)
+
+    seg_count = np.bincount(night, minlength=n)
+
+    # Wake bouts strictly inside the sleep period.
+    onset_s = onset[night]
+    final_s = final_sleep_end[night]
+    waso_seg = (stage == STAGE_WAKE) & (start > onset_s) & (end < final_s)
+    waso_epochs = np.bincount(night[waso_seg], weights=length[waso_seg], minlength=n)
+    waso_bouts = np.bincount(night[waso_seg], minlength=n)
+    longest = np.zeros(n)
+    np.maximum.at(longest, night[waso_seg], length[waso_seg])
+
+    # REM periods: REM bouts merged across gaps shorter than _REM_PERIOD_GAP_EPOCHS.
+    r_night, r_start, r_end = night[rem], start[rem], end[rem]
+    new_night = np.ones(len(r_night), dtype=bool)
+    new_night[1:] = r_night[1:] != r_night[:-1]
+    gap = np.full(len(r_night), np.inf)
+    gap[1:] = r_start[1:] - r_end[:-1]
+    period_start = new_night | (gap >= _REM_PERIOD_GAP_EPOCHS)
+    p_night, p_start = r_night[period_start], r_start[period_start]
+    rem_cycles = np.bincount(p_night, minlength=n)
+
+    same = np.zeros(len(p_night), dtype=bool)
+    same[1:] = p_night[1:] == p_night[:-1]
+    intervals = np.diff(p_start, prepend=0)[same]
+    interval_sum = np.bincount(p_night[same], weights=intervals, minlength=n)
+    interval_n = np.bincount(p_night[same], minlength=n)
+
+    has_sleep = ~np.isnan(onset)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["sleep_onset_latency_min"] = np.where(starts_awake, onset * _EPOCH_MIN, np.nan)
+        out["deep_latency_min"] = (first_deep - onset) * _EPOCH_MIN
+        out["rem_latency_min"] = (first_rem - onset) * _EPOCH_MIN
+        out["stage_transitions"] = np.where(seg_count > 0, seg_count - 1, np.nan)
+        out["rem_cycles"] = np.where(has_sleep, rem_cycles, np.nan)
+        out["rem_cycle_period_min"] = np.where(interval_n > 0, interval_sum / interval_n * _EPOCH_MIN, np.nan)
+        out["waso_min"] = np.where(has_sleep, waso_epochs * _EPOCH_MIN, np.nan)
+        out["waso_bouts"] = np.where(has_sleep, waso_bouts, np.nan)
+        out["longest_wake_bout_min"] = np.where(has_sleep, longest * _EPOCH_MIN, np.nan)
+    return out
+
+
+def session_stages(df: pd.DataFrame):
+    """Return the decoded per-epoch stage arrays carried by a sleep-sessions frame, if any."""
+    for col in (STAGE_COLUMN, _FALLBACK_STAGE_COLUMN):
+        if col in df.columns:
+            return list(df[col])
+    return None
@@ -4,6 +4,11 @@ import ast
 import pandas as pd
 import numpy as np
 import re
+import warnings
+from pandas.api.types import union_categoricals
+
+# Bump whenever a loader's output changes so cached frames are invalidated.
+LOADER_VERSION = 2
 
 
 def _parse_timezone_offset(tz_str: str) -> str | None:
@@ -77,13 +82,64 @@ def load_test_results(path: str) -> pd.DataFrame:
     return df
 
 
-def load_sleep_sessions(path: str) -> pd.DataFrame:
+# Per-epoch arrays in the sleep-sessions export, stored as "[a,b,...]" strings,
+# with the dtype they decode to. They dominate the file size, so they are only
+# read when a caller asks for them.
+STAGE_LIST_COLUMNS = {
+    "sleep_stage_list": np.int8,
+    "sleep_stage_smoothed_list": np.int8,
+    "wake_sleep_list": np.int8,
+    "sleep_stage_prob_list_wake": np.float32,
+    "sleep_stage_prob_list_light": np.float32,
+    "sleep_stage_prob_list_deep": np.float32,
+    "sleep_stage_prob_list_r_e_m": np.float32,
+    "sleep_wake_prob_list": np.float32,
+}
+
+
+def decode_list_column(cells: pd.Series, dtype=np.float32) -> list[np.ndarray]:
+    """Decode a column of "[a,b,...]" strings into one numpy array per cell.
+
+    All cells are joined and parsed in a single pass; the returned arrays are
+    views into one contiguous buffer. Missing or empty cells decode to empty arrays.
+    """
+    body = cells.fillna("").astype(str).str.strip().str.strip("[]").str.strip()
+    lengths = np.where(body.str.len() > 0, body.str.count(",") + 1, 0)
+    joined = ",".join(body[lengths > 0])
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)
+            flat = np.fromstring(joined, dtype=np.float64, sep=",") if joined else np.empty(0)
+    except (ValueError, DeprecationWarning):
+        flat = None
+    if flat is None or len(flat) != lengths.sum():
+        # Non-numeric tokens stop np.fromstring; parse token-wise and coerce.
+        flat = pd.to_numeric(pd.Series(joined.split(",")), errors="coerce").to_numpy(np.float64)
+
+    if np.issubdtype(dtype, np.integer):
+        flat = np.nan_to_num(flat, nan=-1)
+    return np.split(flat.astype(dtype), np.cumsum(lengths)[:-1])
+
+
+def load_sleep_sessions(path: str, stage_lists=()) -> pd.DataFrame:
     """Load a sleep-sessions CSV (fatigue results format).
 
     Returns a cleaned DataFrame with per-night sleep architecture,
     recovery scores, sleep debt, and HRV data.
+
+    The per-epoch list columns (``STAGE_LIST_COLUMNS``) are skipped at read
+    time unless named in ``stage_lists``; requested ones are decoded into
+    compact numpy arrays (int8 stage codes, float32 probabilities).
     """
-    df = pd.read_csv(path)
+    wanted = set(stage_lists)
+    unknown = wanted - set(STAGE_LIST_COLUMNS)
+    if unknown:
+        raise ValueError(f"stage_lists must name stage-list columns ({', '.join(STAGE_LIST_COLUMNS)}), "
+                         f"got {sorted(unknown)}")
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [c for c in header if c not in STAGE_LIST_COLUMNS or c in wanted]
+    df = pd.read_csv(path, usecols=usecols)
 
     required = {"total_sleep_time_min", "sleep_start_u_t_c"}
     if not required.issubset(df.columns):
@@ -114,28 +170,131 @@ def load_sleep_sessions(path: str) -> pd.DataFrame:
         if c in df.columns:
             df[c] = pd.to_numeric(df[c], errors="coerce")
 
+    for c in stage_lists:
+        if c in df.columns:
+            df[c] = pd.Series(decode_list_column(df[c], STAGE_LIST_COLUMNS[c]), index=df.index, dtype=object)
+
     df = df.sort_values("sleep_start").reset_index(drop=True)
     return df
 
 
-def load_decoded_metrics(path: str) -> pd.DataFrame:
-    """Load a decoded-metrics CSV (30-sec epoch sensor data).
-
-    Returns a DataFrame with:
-    - datetime column derived from unix timestamp
-    - numeric columns cast properly
+# Columns the Tier-1 analysers read from decoded metrics. Accelerometer
+# columns are matched by pattern (see _is_metrics_column) because their
+# exact names vary by firmware.
+_METRICS_COLUMNS = (
+    "timestamp", "wear_mode", "lifecycle_state", "acc_x_count",
+    "heart_rate_mean", "cardio_RMSSD_ms", "cardio_SDNN_ms", "cardio_confidence_median",
+    "steps", "calories",
+)
+_METRICS_CATEGORICAL = ("wear_mode", "lifecycle_state")
+# Unix seconds and cumulative counters need float64; sensor readings fit float32.
+_METRICS_FLOAT64 = ("timestamp", "steps", "calories")
+_METRICS_CHUNKSIZE = 250_000
+
+
+def _is_metrics_column(name: str) -> bool:
+    if name in _METRICS_COLUMNS:
+        return True
+    return name.startswith("acc_") and ("rms" in name.lower() or "energyPerSec" in name)
+
+
+def _metrics_dtypes(columns) -> dict:
+    """Pinned read_csv dtype map: categorical state columns, compact floats elsewhere."""
+    dtypes = {}
+    for c in columns:
+        if c in _METRICS_CATEGORICAL:
+            dtypes[c] = "category"
+        elif c in _METRICS_FLOAT64:
+            dtypes[c] = "float64"
+        else:
+            dtypes[c] = "float32"
+    return dtypes
+
+
+def _read_metrics_chunks(path: str, columns: list, chunksize: int, tolerant: bool = False, skip: int = 0):
+    """read_csv chunk reader for ``columns`` from data row ``skip`` on.
+
+    With ``tolerant`` the numeric columns are read as strings and coerced,
+    so stray non-numeric tokens become NaN instead of failing the parse.
     """
-    df = pd.read_csv(path)
-
-    if "acc_x_count" not in df.columns:
+    dtypes = _metrics_dtypes(columns)
+    numeric = {c: dtype for c, dtype in dtypes.items() if dtype != "category"}
+    if tolerant:
+        dtypes.update(dict.fromkeys(numeric, object))
+    reader = pd.read_csv(
+        path,
+        usecols=columns,
+        dtype=dtypes,
+        chunksize=chunksize,
+        skiprows=range(1, skip + 1) if skip else None,
+    )
+    for chunk in reader:
+        if tolerant:
+            for c, dtype in numeric.items():
+                chunk[c] = pd.to_numeric(chunk[c], errors="coerce").astype(dtype)
+        yield chunk
+
+
+def _normalize_metrics_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk["datetime"] = pd.to_datetime(chunk["timestamp"], unit="s", utc=True)
+    chunk["datetime_et"] = chunk["datetime"].dt.tz_convert("US/Eastern")
+    return chunk
+
+
+def iter_decoded_metrics(path: str, chunksize: int = _METRICS_CHUNKSIZE, usecols=None):
+    """Stream a decoded-metrics CSV as normalized chunks of at most ``chunksize`` rows.
+
+    Only the analyser columns (plus ``usecols``, if given) are parsed, with
+    float32 sensor columns and categorical ``wear_mode``/``lifecycle_state``.
+    Non-numeric tokens in numeric columns become NaN. Chunks come out in
+    file order; they are not globally sorted, and a header-only file gives
+    one empty chunk.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    if "acc_x_count" not in header:
         raise ValueError(f"{path} does not look like a decoded-metrics CSV (missing 'acc_x_count')")
 
-    df["datetime"] = pd.to_datetime(df["timestamp"], unit="s", utc=True)
-    df["datetime_et"] = df["datetime"].dt.tz_convert("US/Eastern")
+    extra = set(usecols or ())
+    columns = [c for c in header if _is_metrics_column(c) or c in extra]
 
-    numeric_cols = df.columns.difference(["wear_mode", "lifecycle_state", "datetime", "datetime_et"])
-    for c in numeric_cols:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
+    done = yielded = 0
+    try:
+        for chunk in _read_metrics_chunks(path, columns, chunksize):
+            done += len(chunk)
+            yielded += 1
+            yield _normalize_metrics_chunk(chunk)
+    except ValueError:
+        # A non-numeric token in a sensor column: read the rest with those columns coerced to NaN.
+        for chunk in _read_metrics_chunks(path, columns, chunksize, tolerant=True, skip=done):
+            yielded += 1
+            yield _normalize_metrics_chunk(chunk)
+    if not yielded:  # header-only file
+        yield _normalize_metrics_chunk(pd.read_csv(path, usecols=columns, dtype=_metrics_dtypes(columns), nrows=0))
+
+
+def load_decoded_metrics(path: str, chunksize: int = _METRICS_CHUNKSIZE, usecols=None,
+                         iterator: bool = False):
+    """Load a decoded-metrics CSV (30-sec epoch sensor data).
+
+    The file is read in bounded chunks with a pinned dtype map, keeping only
+    the columns the analysers use. Returns a DataFrame with:
+    - datetime column derived from unix timestamp
+    - numeric columns cast properly (float32 sensors, categorical states)
+
+    With ``iterator=True`` the chunks from :func:`iter_decoded_metrics` are
+    returned unconcatenated instead.
+    """
+    chunks = iter_decoded_metrics(path, chunksize=chunksize, usecols=usecols)
+    if iterator:
+        return chunks
+
+    chunks = list(chunks)
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    # Per-chunk categoricals concatenate to object when their categories differ.
+    for c in _METRICS_CATEGORICAL:
+        if c in df.columns and len(chunks) > 1:
+            df[c] = union_categoricals([ch[c] for ch in chunks])
+    del chunks
 
     df = df.sort_values("timestamp").reset_index(drop=True)
     return df
@@ -109,12 +109,9 @@ def detect_patterns(tests_df: pd.DataFrame | None, results: dict) -> list[dict]:
                 })
 
     # --- 8. Post-meal performance dip detection ---
-    if tests_df is not None and "context_note" in tests_df.columns:
-        meal_keywords = ["eating", "meal", "ate", "lunch", "dinner", "food", "snack"]
-        meal_mask = tests_df["context_note"].str.lower().apply(
-            lambda x: any(kw in str(x) for kw in meal_keywords) if pd.notna(x) else False
-        )
-        meal_tests = tests_df[meal_mask & (tests_df["type"] == "READY")]
+    if tests_df is not None and "tag_meal" in tests_df.columns:
+        meal_mask = np.asarray(tests_df["tag_meal"], dtype=bool)
+        meal_tests = tests_df[meal_mask & (tests_df["type"] == "READY").to_numpy()]
         if len(meal_tests) >= 2:
             baseline = perf.get("ready_baseline")
             if baseline:
@@ -128,6 +125,18 @@ def detect_patterns(tests_df: pd.DataFrame | None, results: dict) -> list[dict]:
                         "first_detected": str(meal_tests["date"].min()),
                     })
 
+    # --- 8b. Other lifestyle tags: Ready after caffeine / alcohol / ... vs. untagged tests ---
+    for tag, effect in results.get("lifestyle_tags", {}).items():
+        delta = effect.get("delta_vs_untagged")
+        if tag == "meal" or delta is None or effect["n_ready"] < 3 or abs(delta) < 10:
+            continue
+        patterns.append({
+            "pattern": f"{tag}_ready_{'dip' if delta < 0 else 'boost'}",
+            "description": f"Ready averages {effect['ready_mean']:.0f} on tests noting {tag} vs {effect['untagged_ready_mean']:.0f} otherwise ({delta:+.0f} points, {effect['n_ready']} tests)",
+            "severity": "info",
+            "first_detected": effect["first_tagged"],
+        })
+
     # =========================================================================
     # Sleep-session-aware patterns (from fatigue CSV)
     # =========================================================================
@@ -2,75 +2,132 @@
 
 import numpy as np
 import pandas as pd
-from scipy import stats
 
+from physiological_insights.trends import linear_trend, rolling_trend
 
-def _linear_slope(series: pd.Series) -> float | None:
-    """Compute linear regression slope of a series indexed by ordinal position."""
-    clean = series.dropna()
-    if len(clean) < 2:
-        return None
-    x = np.arange(len(clean), dtype=float)
-    slope, _, _, _, _ = stats.linregress(x, clean.values)
-    return float(slope)
 
+_TEST_TYPES = ("READY", "AGILITY", "FOCUS")
+_SELF_REPORT_COLUMNS = ("stress", "sleepiness", "sharpness")
 
-def _daily_agg(df: pd.DataFrame, test_type: str) -> pd.DataFrame:
-    """Aggregate a single test type to daily means."""
-    sub = df[df["type"] == test_type].copy()
-    if sub.empty:
+
+def _slope_or_none(slope: float) -> float | None:
+    return None if np.isnan(slope) else float(slope)
+
+
+def _iso_week_labels(dates: pd.Index) -> np.ndarray:
+    """ISO week label ("YYYY-Www") per calendar date."""
+    iso = pd.DatetimeIndex(pd.to_datetime(dates)).isocalendar()
+    return np.array([f"{y}-W{w:02d}" for y, w in zip(iso["year"], iso["week"])], dtype=object)
+
+
+def _aggregate(df: pd.DataFrame, sr_cols: list[str]) -> tuple[pd.DataFrame, pd.Index]:
+    """The single (week, date, type) groupby behind every daily and weekly figure.
+
+    Per group: score ``mean``/``min``/``max``, ``size`` (tests, including
+    unscored ones), ``sum``/``count`` of scores, and ``<col>_sum``/``<col>_count``
+    per self-report column. Returns the table (index levels ``week``, ``day``,
+    ``type``; week and day are integer codes in date order) and the unique
+    dates that ``day`` indexes into.
+    """
+    day, dates = pd.factorize(df["date"], sort=True)
+    week, _ = pd.factorize(_iso_week_labels(dates)[day], sort=True)
+
+    values = {"score": df["score"].to_numpy(dtype=np.float64)}
+    values.update({col: df[col].to_numpy(dtype=np.float64) for col in sr_cols})
+    grouped = pd.DataFrame(values).groupby([week, day, df["type"].to_numpy()], sort=True)
+    table = grouped["score"].agg(["mean", "min", "max", "size", "sum", "count"])
+    for col in sr_cols:
+        table[f"{col}_sum"] = grouped[col].sum()
+        table[f"{col}_count"] = grouped[col].count()
+    table.index.names = ["week", "day", "type"]
+    return table, dates
+
+
+def _type_daily(by_type: pd.DataFrame, dates: pd.Index, test_type: str) -> pd.DataFrame:
+    """Daily mean/min/max/count of one test type from the type-pivoted table."""
+    if test_type not in by_type["size"].columns:
         return pd.DataFrame()
-    daily = sub.groupby("date").agg(
-        mean=("score", "mean"),
-        min=("score", "min"),
-        max=("score", "max"),
-        count=("score", "size"),
-    ).reset_index()
-    daily["date"] = pd.to_datetime(daily["date"])
-    return daily.sort_values("date")
+    sub = by_type.xs(test_type, axis=1, level="type")
+    sub = sub[sub["size"] > 0]
+    return pd.DataFrame({
+        "date": pd.to_datetime(dates[sub.index.get_level_values("day")]),
+        "mean": sub["mean"].to_numpy(),
+        "min": sub["min"].to_numpy(),
+        "max": sub["max"].to_numpy(),
+        "count": sub["size"].to_numpy(dtype=np.int64),
+    })
+
+
+def _ratio(total: pd.Series, count: pd.Series) -> np.ndarray:
+    """``total / count`` as a float array, NaN where ``count`` is zero."""
+    total, count = total.to_numpy(dtype=np.float64), count.to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan)
 
 
 def analyse_performance(df: pd.DataFrame) -> dict:
-    """Return performance analysis dict from test-results DataFrame."""
+    """Return performance analysis dict from test-results DataFrame.
+
+    Apart from the baseline and the IQRs, every figure is read off one
+    (week, date, type) aggregation: daily figures are its rows pivoted by
+    type, weekly figures are sums and extremes of those rows per week.
+    """
     result: dict = {}
+    is_type = {ttype: (df["type"] == ttype).to_numpy() for ttype in _TEST_TYPES}
 
     # --- Baseline ---
-    baselines = df[df["is_baseline"] & (df["type"] == "READY")]
+    is_baseline = df["is_baseline"].to_numpy(dtype=bool)
+    baselines = df[is_baseline & is_type["READY"]]
     if baselines.empty:
-        baselines = df[df["is_baseline"]]
+        baselines = df[is_baseline]
     if not baselines.empty:
         result["ready_baseline"] = float(baselines["score"].iloc[0])
     else:
-        ready_scores = df.loc[df["type"] == "READY", "score"].dropna()
+        ready_scores = df.loc[is_type["READY"], "score"].dropna()
         result["ready_baseline"] = float(ready_scores.max()) if len(ready_scores) else None
 
+    sr_cols = [c for c in _SELF_REPORT_COLUMNS if c in df.columns]
+    if df.empty:
+        for ttype in _TEST_TYPES:
+            result[ttype.lower()] = {"peak": None, "floor": None, "mean": None, "iqr": [None, None]}
+        result.update(daily_ready=[], ready_7d_slope=None, ready_overall_slope=None,
+                      daily_agility=[], daily_focus=[], daily_self_report=[], weekly=[])
+        return result
+
+    table, dates = _aggregate(df, sr_cols)
+    by_type = table.unstack("type")
+    types_present = set(by_type["size"].columns)
+
     # --- Per-type stats ---
-    for ttype in ("READY", "AGILITY", "FOCUS"):
-        scores = df.loc[df["type"] == ttype, "score"].dropna()
-        if scores.empty:
+    score = df["score"].to_numpy(dtype=np.float64)
+    for ttype in _TEST_TYPES:
+        scores = score[is_type[ttype]]
+        scores = scores[~np.isnan(scores)]
+        if not len(scores):
             result[ttype.lower()] = {"peak": None, "floor": None, "mean": None, "iqr": [None, None]}
             continue
-        q1, q3 = float(scores.quantile(0.25)), float(scores.quantile(0.75))
+        q1, q3 = np.quantile(scores, [0.25, 0.75])
         result[ttype.lower()] = {
-            "peak": float(scores.max()),
-            "floor": float(scores.min()),
-            "mean": float(scores.mean()),
-            "iqr": [q1, q3],
+            "peak": float(by_type[("max", ttype)].max()),
+            "floor": float(by_type[("min", ttype)].min()),
+            "mean": float(by_type[("sum", ttype)].sum() / by_type[("count", ttype)].sum()),
+            "iqr": [float(q1), float(q3)],
         }
 
     # --- Daily Ready trajectory ---
-    daily_ready = _daily_agg(df, "READY")
+    daily_ready = _type_daily(by_type, dates, "READY")
     if not daily_ready.empty:
         daily_ready["rolling_7d"] = daily_ready["mean"].rolling(7, min_periods=1).mean()
-        result["daily_ready"] = daily_ready.to_dict(orient="records")
-
-        result["ready_7d_slope"] = _linear_slope(daily_ready["mean"].tail(7))
-        result["ready_overall_slope"] = _linear_slope(daily_ready["mean"])
-
         baseline = result.get("ready_baseline")
         if baseline:
             daily_ready["pct_baseline"] = daily_ready["mean"] / baseline * 100
-            result["daily_ready"] = daily_ready.to_dict(orient="records")
+        # Slope over the last 7 test days up to each day, NaN until two have scores.
+        slopes = rolling_trend(daily_ready["mean"], 7)["slope"]
+        daily_ready["slope_7d"] = slopes
+        result["daily_ready"] = daily_ready.to_dict(orient="records")
+
+        result["ready_7d_slope"] = _slope_or_none(slopes[-1])
+        result["ready_overall_slope"] = _slope_or_none(linear_trend(daily_ready["mean"])["slope"])
     else:
         result["daily_ready"] = []
         result["ready_7d_slope"] = None
@@ -78,71 +135,58 @@ def analyse_performance(df: pd.DataFrame) -> dict:
 
     # --- Daily Agility / Focus ---
     for ttype in ("AGILITY", "FOCUS"):
-        daily = _daily_agg(df, ttype)
+        daily = _type_daily(by_type, dates, ttype)
         result[f"daily_{ttype.lower()}"] = daily.to_dict(orient="records") if not daily.empty else []
 
-    # --- Self-report aggregation per day ---
-    sr_cols = ["stress", "sleepiness", "sharpness"]
-    existing_sr = [c for c in sr_cols if c in df.columns]
-    if existing_sr:
-        daily_sr = df.groupby("date")[existing_sr].mean().reset_index()
-        daily_sr["date"] = pd.to_datetime(daily_sr["date"])
-        result["daily_self_report"] = daily_sr.sort_values("date").to_dict(orient="records")
+    # --- Self-report aggregation per day (all test types) ---
+    by_day = table.groupby(level=["week", "day"]).sum()
+    if sr_cols:
+        daily_sr = pd.DataFrame({"date": pd.to_datetime(dates[by_day.index.get_level_values("day")])})
+        for col in sr_cols:
+            daily_sr[col] = _ratio(by_day[f"{col}_sum"], by_day[f"{col}_count"])
+        result["daily_self_report"] = daily_sr.to_dict(orient="records")
     else:
         result["daily_self_report"] = []
 
-    # --- Weekly aggregation ---
-    ready_df = df[df["type"] == "READY"].copy()
-    if not ready_df.empty:
-        ready_df["iso_week"] = ready_df["local_time"].dt.isocalendar().week.astype(int)
-        ready_df["iso_year"] = ready_df["local_time"].dt.isocalendar().year.astype(int)
-        ready_df["week_label"] = ready_df["iso_year"].astype(str) + "-W" + ready_df["iso_week"].astype(str).str.zfill(2)
-
-        weekly = ready_df.groupby("week_label").agg(
-            ready_mean=("score", "mean"),
-            ready_min=("score", "min"),
-            ready_max=("score", "max"),
-            test_count=("score", "size"),
-            date_min=("date", "min"),
-            date_max=("date", "max"),
-        ).reset_index().sort_values("week_label")
-
-        baseline = result.get("ready_baseline")
-        if baseline:
-            weekly["ready_pct_baseline"] = weekly["ready_mean"] / baseline * 100
-
-        # Week-over-week diffs
-        weekly["ready_change_pct"] = weekly["ready_mean"].pct_change() * 100
-
-        # Merge in self-report weekly means
-        if existing_sr:
-            all_tests = df.copy()
-            all_tests["iso_week"] = all_tests["local_time"].dt.isocalendar().week.astype(int)
-            all_tests["iso_year"] = all_tests["local_time"].dt.isocalendar().year.astype(int)
-            all_tests["week_label"] = all_tests["iso_year"].astype(str) + "-W" + all_tests["iso_week"].astype(str).str.zfill(2)
-            weekly_sr = all_tests.groupby("week_label")[existing_sr].mean().reset_index()
-            weekly = weekly.merge(weekly_sr, on="week_label", how="left")
-
-        # Agility weekly
-        agility_df = df[df["type"] == "AGILITY"].copy()
-        if not agility_df.empty:
-            agility_df["iso_week"] = agility_df["local_time"].dt.isocalendar().week.astype(int)
-            agility_df["iso_year"] = agility_df["local_time"].dt.isocalendar().year.astype(int)
-            agility_df["week_label"] = agility_df["iso_year"].astype(str) + "-W" + agility_df["iso_week"].astype(str).str.zfill(2)
-            weekly_ag = agility_df.groupby("week_label")["score"].mean().reset_index().rename(columns={"score": "agility_mean"})
-            weekly = weekly.merge(weekly_ag, on="week_label", how="left")
-
-        # Focus weekly
-        focus_df = df[df["type"] == "FOCUS"].copy()
-        if not focus_df.empty:
-            focus_df["iso_week"] = focus_df["local_time"].dt.isocalendar().week.astype(int)
-            focus_df["iso_year"] = focus_df["local_time"].dt.isocalendar().year.astype(int)
-            focus_df["week_label"] = focus_df["iso_year"].astype(str) + "-W" + focus_df["iso_week"].astype(str).str.zfill(2)
-            weekly_fc = focus_df.groupby("week_label")["score"].mean().reset_index().rename(columns={"score": "focus_mean"})
-            weekly = weekly.merge(weekly_fc, on="week_label", how="left")
-
-        result["weekly"] = weekly.to_dict(orient="records")
-    else:
+    # --- Weekly aggregation (weeks with Ready tests) ---
+    if "READY" not in types_present:
         result["weekly"] = []
+        return result
+
+    ready = by_type.xs("READY", axis=1, level="type")
+    ready = ready[ready["size"] > 0]
+    per_week = ready.groupby(level="week")
+    totals = per_week[["sum", "count", "size"]].sum()
+    ready_days = pd.Series(ready.index.get_level_values("day"), index=ready.index.get_level_values("week"))
+    day_range = ready_days.groupby(level="week").agg(["min", "max"])
+
+    weekly = pd.DataFrame({
+        "week_label": _iso_week_labels(dates[day_range["min"]]),
+        "ready_mean": _ratio(totals["sum"], totals["count"]),
+        "ready_min": per_week["min"].min().to_numpy(),
+        "ready_max": per_week["max"].max().to_numpy(),
+        "test_count": totals["size"].to_numpy(dtype=np.int64),
+        "date_min": dates[day_range["min"]],
+        "date_max": dates[day_range["max"]],
+    })
+
+    baseline = result.get("ready_baseline")
+    if baseline:
+        weekly["ready_pct_baseline"] = weekly["ready_mean"] / baseline * 100
+
+    # Week-over-week diffs
+    weekly["ready_change_pct"] = weekly["ready_mean"].pct_change() * 100
+
+    # Self-report (all tests), Agility and Focus weekly means for the same weeks
+    weeks = totals.index
+    if sr_cols:
+        sr_week = by_day.groupby(level="week").sum().loc[weeks]
+        for col in sr_cols:
+            weekly[col] = _ratio(sr_week[f"{col}_sum"], sr_week[f"{col}_count"])
+    for ttype in ("AGILITY", "FOCUS"):
+        if ttype in types_present:
+            typed = by_type[[("sum", ttype), ("count", ttype)]].groupby(level="week").sum().loc[weeks]
+            weekly[f"{ttype.lower()}_mean"] = _ratio(typed[("sum", ttype)], typed[("count", ttype)])
 
+    result["weekly"] = weekly.to_dict(orient="records")
     return result
@@ -1,4 +1,13 @@
-"""Readiness tier assignment and task-type matching matrix."""
+"""Readiness tier assignment and task-type matching matrix.
+
+Tiers are assigned for every day at once: daily Ready, daily self-report and
+per-day HRV (% of RMSSD baseline) are joined on the date key (plus any extra
+keys, e.g. a user id, so a cohort's full history goes through one call) and
+classified with array masks.
+"""
+
+import numpy as np
+import pandas as pd
 
 
 # Tier thresholds: (rmssd_pct_baseline_range, ready_score_range) -> tier
@@ -51,37 +60,63 @@ _TASK_MATRIX = {
 }
 
 
-def _classify_tier(ready_score: float | None, rmssd_pct: float | None, stress: float | None, sleepiness: float | None) -> str:
-    """Assign a readiness tier based on available signals."""
-    # Severe self-report override: if both stress and sleepiness >7, cap at Low
-    sr_cap = None
-    if stress is not None and sleepiness is not None:
-        if stress > 7 and sleepiness > 7:
-            sr_cap = "Recovery"
-        elif stress > 5 and sleepiness > 5:
-            sr_cap = "Low"
-
-    if ready_score is None:
-        tier = "Moderate"  # fallback
-    else:
-        tier = "Recovery"
-        for t in _TIERS:
-            if rmssd_pct is not None:
-                if rmssd_pct >= t["rmssd_min"] and ready_score >= t["ready_min"]:
-                    tier = t["name"]
-                    break
-            else:
-                if ready_score >= t["ready_min"]:
-                    tier = t["name"]
-                    break
-
-    # Apply self-report cap (cannot promote, only demote)
-    if sr_cap:
-        tier_order = [t["name"] for t in _TIERS]
-        if tier_order.index(tier) < tier_order.index(sr_cap):
-            tier = sr_cap
-
-    return tier
+_TIER_NAMES = np.array([t["name"] for t in _TIERS])
+_TIER_COLORS = np.array([t["color"] for t in _TIERS])
+_RECOVERY, _LOW, _MODERATE = (int(np.flatnonzero(_TIER_NAMES == name)[0]) for name in ("Recovery", "Low", "Moderate"))
+
+
+def _classify_tiers(ready_score, rmssd_pct, stress, sleepiness) -> np.ndarray:
+    """Tier index (into ``_TIERS``) per row; NaN marks a missing signal."""
+    ready_score, rmssd_pct, stress, sleepiness = (
+        np.asarray(v, dtype=np.float64) for v in (ready_score, rmssd_pct, stress, sleepiness)
+    )
+    # First tier whose thresholds are met; HRV thresholds only apply where HRV is known
+    tier = np.full(ready_score.shape, _RECOVERY)
+    no_hrv = np.isnan(rmssd_pct)
+    for i in range(len(_TIERS) - 1, -1, -1):
+        t = _TIERS[i]
+        met = (ready_score >= t["ready_min"]) & (no_hrv | (rmssd_pct >= t["rmssd_min"]))
+        tier = np.where(met, i, tier)
+    tier = np.where(np.isnan(ready_score), _MODERATE, tier)  # fallback
+
+    # Severe self-report cap (cannot promote, only demote)
+    with np.errstate(invalid="ignore"):
+        cap = np.where((stress > 7) & (sleepiness > 7), _RECOVERY,
+                       np.where((stress > 5) & (sleepiness > 5), _LOW, 0))
+    return np.maximum(tier, cap)
+
+
+def _by_key(records, columns: list[str], on: list[str]) -> pd.DataFrame:
+    """One row per key from a list of per-day records (first wins), with the date as YYYY-MM-DD."""
+    df = pd.DataFrame(records if records is not None else [])
+    df = df.reindex(columns=on + [c for c in columns if c not in on])
+    df["date"] = df["date"].astype(str).str[:10]
+    return df.drop_duplicates(subset=on)
+
+
+def tier_table(daily_ready, daily_self_report=None, daily_hrv=None, on: tuple = ("date",)) -> pd.DataFrame:
+    """Readiness tier for every row of ``daily_ready``.
+
+    Inputs are DataFrames or lists of records: ``daily_ready`` with ``mean``
+    (the day's Ready score), ``daily_self_report`` with ``stress`` and
+    ``sleepiness``, and ``daily_hrv`` with ``rmssd_pct_baseline``. They are
+    left-joined on ``on``. Returns the keys with ``ready_score``,
+    ``rmssd_pct_baseline``, ``stress``, ``sleepiness``, ``tier`` and ``color``.
+    """
+    on = list(on)
+    table = _by_key(daily_ready, ["mean"], on).rename(columns={"mean": "ready_score"})
+    table = table.merge(_by_key(daily_self_report, ["stress", "sleepiness"], on), on=on, how="left")
+    table = table.merge(_by_key(daily_hrv, ["rmssd_pct_baseline"], on), on=on, how="left")
+
+    tier = _classify_tiers(table["ready_score"], table["rmssd_pct_baseline"],
+                           table["stress"], table["sleepiness"])
+    table["tier"] = _TIER_NAMES[tier]
+    table["color"] = _TIER_COLORS[tier]
+    return table
+
+
+def _none_if_nan(value):
+    return None if value is None or (isinstance(value, float) and np.isnan(value)) else value
 
 
 def assign_readiness_tiers(results: dict) -> dict:
@@ -89,31 +124,17 @@ def assign_readiness_tiers(results: dict) -> dict:
     perf = results.get("performance", {})
     hrv = results.get("hrv", {})
 
-    baseline = perf.get("ready_baseline")
-    rmssd_pct = hrv.get("rmssd_pct_baseline")
-
-    # Latest day tier
     daily_ready = perf.get("daily_ready", [])
-    daily_sr = perf.get("daily_self_report", [])
-
     tiers_by_date: dict = {}
-
     if daily_ready:
-        for day in daily_ready:
-            date = str(day.get("date", ""))[:10]
-            score = day.get("mean")
-            stress = None
-            sleepiness = None
-            for sr in daily_sr:
-                if str(sr.get("date", ""))[:10] == date:
-                    stress = sr.get("stress")
-                    sleepiness = sr.get("sleepiness")
-                    break
-            tier = _classify_tier(score, rmssd_pct, stress, sleepiness)
+        table = tier_table(daily_ready, perf.get("daily_self_report", []), hrv.get("daily_rmssd_pct_baseline", []))
+        for date, tier, color, score, rmssd_pct in zip(table["date"], table["tier"], table["color"],
+                                                       table["ready_score"], table["rmssd_pct_baseline"]):
             tiers_by_date[date] = {
                 "tier": tier,
-                "color": next(t["color"] for t in _TIERS if t["name"] == tier),
-                "ready_score": score,
+                "color": color,
+                "ready_score": _none_if_nan(score),
+                "rmssd_pct_baseline": _none_if_nan(rmssd_pct),
                 "task_suitability": _TASK_MATRIX.get(tier, {}),
             }
 
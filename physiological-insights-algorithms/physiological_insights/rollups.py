@@ -0,0 +1,99 @@
+"""Multi-resolution rollup pyramid for per-epoch signals (HR, RMSSD).
+
+Epochs are aggregated once into 1-minute buckets; each coarser level
+(5-minute, 1-hour, 1-day) is built from the level below, never from raw
+epochs. Every level is a columnar DataFrame indexed by bucket start (local
+time) with ``<signal>_count``, ``_sum``, ``_sumsq``, ``_min`` and ``_max``
+columns, so means, variances and extremes at any resolution come from
+sums over buckets. Sub-day buckets are aligned in UTC (so the repeated hour
+at a DST change stays two buckets); day buckets are local calendar days.
+"""
+
+import numpy as np
+import pandas as pd
+
+LEVELS = ("1min", "5min", "1h", "1D")
+STATS = ("count", "sum", "sumsq", "min", "max")
+
+_SUBDAY_SECONDS = {"1min": 60, "5min": 300, "1h": 3600}
+_COMBINE = {"count": "sum", "sum": "sum", "sumsq": "sum", "min": "min", "max": "max"}
+
+
+def _combine(df: pd.DataFrame, keys: np.ndarray) -> pd.DataFrame:
+    """Merge rows sharing a bucket key: counts and sums add, extremes take min/max."""
+    how = {col: _COMBINE[col.rsplit("_", 1)[1]] for col in df.columns}
+    return df.groupby(keys, sort=True).agg(how)
+
+
+def build_rollups(datetime_local: pd.Series, signals: dict[str, np.ndarray]) -> dict[str, pd.DataFrame]:
+    """Aggregate epoch ``signals`` (name -> values, NaN = missing) into every level.
+
+    ``datetime_local`` holds the tz-aware local timestamp of each epoch.
+    """
+    columns = [f"{name}_{stat}" for name in signals for stat in STATS]
+    if len(datetime_local) == 0:
+        empty = pd.DataFrame(columns=columns, dtype=np.float64, index=pd.DatetimeIndex([], name="start"))
+        return {level: empty.copy() for level in LEVELS}
+
+    tz = datetime_local.dt.tz
+    seconds = datetime_local.dt.tz_convert("UTC").dt.tz_localize(None).to_numpy().astype("datetime64[s]").astype(np.int64)
+
+    frame = {}
+    for name, values in signals.items():
+        values = np.asarray(values, dtype=np.float64)
+        present = ~np.isnan(values)
+        frame[f"{name}_count"] = present.astype(np.int64)
+        frame[f"{name}_sum"] = np.where(present, values, 0.0)
+        frame[f"{name}_sumsq"] = np.where(present, values * values, 0.0)
+        frame[f"{name}_min"] = values
+        frame[f"{name}_max"] = values
+    epochs = pd.DataFrame(frame, columns=columns)
+
+    # Sub-day levels are keyed on UTC seconds while they are built.
+    rollups = {"1min": _combine(epochs, seconds // 60 * 60)}
+    for finer, level in (("1min", "5min"), ("5min", "1h")):
+        width = _SUBDAY_SECONDS[level]
+        rollups[level] = _combine(rollups[finer], rollups[finer].index.to_numpy() // width * width)
+
+    for level in _SUBDAY_SECONDS:
+        rollups[level].index = pd.to_datetime(rollups[level].index, unit="s", utc=True).tz_convert(tz)
+    # Local days are whole hours in UTC, so days nest hourly buckets exactly.
+    rollups["1D"] = _combine(rollups["1h"], rollups["1h"].index.normalize())
+
+    for level in LEVELS:
+        rollups[level].index.name = "start"
+    return rollups
+
+
+def bucket_mean(level: pd.DataFrame, signal: str) -> pd.Series:
+    """Per-bucket mean of ``signal`` (NaN for buckets without readings)."""
+    count = level[f"{signal}_count"]
+    return (level[f"{signal}_sum"] / count).where(count > 0)
+
+
+def bucket_std(level: pd.DataFrame, signal: str) -> pd.Series:
+    """Per-bucket sample standard deviation of ``signal`` from the running sums."""
+    count = level[f"{signal}_count"]
+    avg = level[f"{signal}_sum"] / count
+    var = (level[f"{signal}_sumsq"] - count * avg * avg) / (count - 1)
+    return np.sqrt(var.clip(lower=0)).where(count > 1)
+
+
+def by_hour_of_day(level: pd.DataFrame, signal: str) -> pd.Series:
+    """Mean of ``signal`` per local hour of day (0-23), pooled from the 1h (or finer) level."""
+    grouped = level[[f"{signal}_sum", f"{signal}_count"]].groupby(level.index.hour).sum()
+    grouped = grouped[grouped[f"{signal}_count"] > 0]
+    return grouped[f"{signal}_sum"] / grouped[f"{signal}_count"]
+
+
+def select_level(rollups: dict[str, pd.DataFrame], start=None, end=None,
+                 max_points: int = 2000) -> tuple[str, pd.DataFrame]:
+    """Finest level whose buckets in [start, end] fit in ``max_points`` rows.
+
+    Falls back to the coarsest level (``1D``) when even that is larger.
+    """
+    for level in LEVELS:
+        window = rollups[level].loc[start:end]
+        if len(window) <= max_points:
+            break
+    return level, window
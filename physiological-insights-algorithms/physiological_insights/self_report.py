@@ -20,6 +20,8 @@ _RATING_LINE_RE = re.compile(
     r"^.*(?:stress|sleep(?:iness)?|sleapiness|sharpness)[:\s]*\d+\.?\d*\s*/\s*10.*$",
     re.IGNORECASE | re.MULTILINE,
 )
+# Whitespace around one or more line breaks (any boundary ``str.splitlines`` splits on)
+_LINE_BREAK_RUN_RE = re.compile(r"\s*[\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]\s*")
 
 
 def _extract_float(pattern: re.Pattern, text: str) -> float | None:
@@ -53,10 +55,43 @@ def parse_comment(text: str) -> dict:
     }
 
 
+def _parse_unique(comments: pd.Series) -> pd.DataFrame:
+    """``parse_comment`` for a Series of distinct non-empty comment strings, column-wise.
+
+    Ratings come from ``str.extract`` with the same patterns; the note is the
+    rating-stripped text with every whitespace run that spans a line break
+    collapsed to one space (the same as stripping and re-joining the lines).
+    """
+    parsed = pd.DataFrame(index=comments.index)
+    for col, pattern in (("stress", _STRESS_RE), ("sleepiness", _SLEEPINESS_RE), ("sharpness", _SHARPNESS_RE)):
+        parsed[col] = comments.str.extract(pattern, expand=False).astype(np.float64)
+
+    note = comments.str.replace(_RATING_LINE_RE, "", regex=True)
+    note = note.str.replace(_LINE_BREAK_RUN_RE, " ", regex=True).str.strip()
+    long = note.str.len() > 200
+    parsed["context_note"] = note.where(~long, note.str.slice(0, 200) + "...")
+    return parsed
+
+
 def parse_all_comments(df: pd.DataFrame) -> pd.DataFrame:
-    """Add parsed self-report columns to the test-results DataFrame."""
-    parsed = df["comment"].apply(parse_comment).apply(pd.Series)
+    """Add parsed self-report columns to the test-results DataFrame.
+
+    Each distinct comment is parsed once (repeats such as "same as test
+    about a minute ago" are common) and the results are mapped back to rows.
+    """
+    codes, uniques = pd.factorize(df["comment"])
+    uniques = np.asarray(uniques, dtype=object)
+    present = np.array([bool(u) for u in uniques], dtype=bool)
+    parsed = _parse_unique(pd.Series(uniques[present], dtype=object).map(str))
+
+    # Missing (code -1, the lookup's last slot) and blank comments point one
+    # past the parsed rows: no ratings, empty note.
+    blank = int(present.sum())
+    lookup = np.full(len(uniques) + 1, blank)
+    lookup[:-1][present] = np.arange(blank)
+    rows = lookup[codes]
+
     for col in ("stress", "sleepiness", "sharpness"):
-        df[col] = pd.to_numeric(parsed[col], errors="coerce")
-    df["context_note"] = parsed["context_note"]
+        df[col] = np.append(parsed[col].to_numpy(dtype=np.float64), np.nan)[rows]
+    df["context_note"] = np.append(parsed["context_note"].to_numpy(dtype=object), "")[rows]
     return df
@@ -0,0 +1,174 @@
+"""Writing and reading analysis_full.json / agent_payload.json.
+
+``to_jsonable`` converts numpy, pandas and datetime values before encoding,
+a column at a time for lists of records (the HRV time series, daily
+summaries) instead of one ``default=str`` call per value: timestamps and
+dates become the same strings ``str()`` gives, numpy scalars become Python
+numbers (float32 by its shortest repr, so 0.1 stays 0.1) and NaN/NaT become
+null. Only columns of a single numpy type are converted in bulk, so a
+column mixing Python ints and floats keeps its ints. Encoding then uses orjson when it is
+installed and the standard library otherwise.
+
+Formats:
+
+- ``json`` - indented, human-readable (the default)
+- ``compact`` - JSON without whitespace
+- ``msgpack`` - MessagePack (needs ``msgpack``)
+
+Any of them can be zstd-compressed (needs ``zstandard``), which appends
+``.zst`` to the file name. ``read`` picks the decoder from the file name.
+"""
+
+import datetime
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ("json", "compact", "msgpack")
+COMPRESSIONS = ("zstd",)
+
+_EXTENSIONS = {"json": ".json", "compact": ".json", "msgpack": ".msgpack"}
+_ZSTD_EXTENSION = ".zst"
+_ZSTD_LEVEL = 3
+
+_PLAIN = (str, int, bool, type(None))
+_NUMPY_NUMBERS = (np.integer, np.floating, np.bool_)
+
+
+def _optional(module: str):
+    try:
+        return __import__(module)
+    except ImportError:
+        return None
+
+
+def check_available(fmt: str = "json", compress: str | None = None) -> str | None:
+    """Why ``fmt``/``compress`` can't be written here (a missing package), or None if it can."""
+    if fmt not in FORMATS:
+        return f"unknown format {fmt!r} (expected one of {', '.join(FORMATS)})"
+    if fmt == "msgpack" and _optional("msgpack") is None:
+        return "msgpack output needs the msgpack package (pip install msgpack)"
+    if compress is not None and compress not in COMPRESSIONS:
+        return f"unknown compression {compress!r}"
+    if compress == "zstd" and _optional("zstandard") is None:
+        return "zstd compression needs the zstandard package (pip install zstandard)"
+    return None
+
+
+def _scalar(value):
+    if isinstance(value, _PLAIN):
+        return value
+    if isinstance(value, float):
+        return None if math.isnan(value) else float(value)
+    if isinstance(value, np.floating) and value.itemsize < 8:
+        # float32 sensor values: the shortest repr ("0.1"), not the widened double
+        return _scalar(float(str(value)))
+    if isinstance(value, _NUMPY_NUMBERS):
+        return _scalar(value.item())
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (datetime.date, datetime.time, pd.Timedelta, datetime.timedelta)):
+        return str(value)
+    if isinstance(value, (dict, list, tuple, np.ndarray)):
+        return to_jsonable(value)
+    return str(value)
+
+
+def _column(values: list) -> list:
+    """``_scalar`` over one column of a record list, in bulk where the column has a single type."""
+    types = set(map(type, values))
+    if types <= {str, int, bool, type(None)}:
+        return values
+    if types <= {float, type(None)}:
+        return [None if v is not None and math.isnan(v) else v for v in values]
+    if len(types) == 1 and issubclass(next(iter(types)), _NUMPY_NUMBERS):
+        return _numpy_column(np.asarray(values))
+    if types == {pd.Timestamp}:
+        # Not ``Index.astype(str)``: it drops the time part when every value is midnight.
+        return [str(v) for v in values]
+    return [_scalar(v) for v in values]
+
+
+def _numpy_column(arr: np.ndarray) -> list:
+    """A numeric array as Python numbers, floats narrower than float64 by their shortest repr."""
+    if arr.dtype.kind == "f" and arr.dtype.itemsize < 8:
+        arr = arr.astype(str).astype(np.float64)
+    out = arr.tolist()
+    if arr.dtype.kind == "f" and np.isnan(arr).any():
+        out = [None if isnan else v for v, isnan in zip(out, np.isnan(arr))]
+    return out
+
+
+def to_jsonable(obj):
+    """``obj`` with every value converted to a JSON/msgpack-native type (see module docstring)."""
+    if isinstance(obj, dict):
+        return {k if isinstance(k, str) else str(k): _scalar(v) for k, v in obj.items()}
+    if isinstance(obj, np.ndarray):
+        return _numpy_column(obj) if obj.dtype.kind in "biuf" else [_scalar(v) for v in obj.tolist()]
+    if isinstance(obj, (list, tuple)):
+        if obj and type(obj[0]) is dict:
+            keys = obj[0].keys()
+            if all(type(row) is dict and row.keys() == keys for row in obj):
+                names = [k if isinstance(k, str) else str(k) for k in keys]
+                columns = [_column([row[k] for row in obj]) for k in keys]
+                return [dict(zip(names, row)) for row in zip(*columns)]
+        return [_scalar(v) for v in obj]
+    return _scalar(obj)
+
+
+def dumps(obj, fmt: str = "json") -> bytes:
+    """Encode ``obj`` in ``fmt`` (uncompressed)."""
+    obj = to_jsonable(obj)
+    if fmt == "msgpack":
+        import msgpack
+        return msgpack.packb(obj, use_bin_type=True)
+    orjson = _optional("orjson")
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if fmt == "json" else 0)
+    if fmt == "json":
+        return json.dumps(obj, indent=2).encode()
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def loads(data: bytes, fmt: str = "json"):
+    if fmt == "msgpack":
+        import msgpack
+        return msgpack.unpackb(data, raw=False)
+    orjson = _optional("orjson")
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def output_path(path: str, fmt: str = "json", compress: str | None = None) -> str:
+    """``path`` with the extension for ``fmt`` (and ``.zst`` when compressed)."""
+    root, ext = os.path.splitext(path)
+    if ext not in (".json", ".msgpack"):
+        root += ext
+    return root + _EXTENSIONS[fmt] + (_ZSTD_EXTENSION if compress == "zstd" else "")
+
+
+def write(obj, path: str, fmt: str = "json", compress: str | None = None) -> str:
+    """Write ``obj`` to ``output_path(path, fmt, compress)`` atomically; returns that path."""
+    path = output_path(path, fmt, compress)
+    data = dumps(obj, fmt)
+    if compress == "zstd":
+        import zstandard
+        data = zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return path
+
+
+def read(path: str):
+    """Load a file written by ``write``; the format is taken from the file name."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(_ZSTD_EXTENSION):
+        import zstandard
+        data = zstandard.ZstdDecompressor().decompress(data)
+        path = path[: -len(_ZSTD_EXTENSION)]
+    return loads(data, "msgpack" if path.endswith(".msgpack") else "json")
@@ -3,26 +3,112 @@
 import numpy as np
 import pandas as pd
 
-
-def _acc_energy(row: pd.Series) -> float:
-    """Compute total accelerometer energy for an epoch using RMS columns if available."""
-    rms_cols = [c for c in row.index if c.startswith("acc_") and "rms" in c.lower()]
-    if rms_cols:
-        vals = row[rms_cols].dropna()
-        if not vals.empty:
-            return float(np.sqrt((vals ** 2).sum()))
-    energy_cols = [c for c in row.index if c.startswith("acc_") and "energyPerSec" in c]
-    if energy_cols:
-        vals = row[energy_cols].dropna()
-        return float(vals.sum()) if not vals.empty else 0.0
-    return 0.0
+from physiological_insights.epoch_features import sleep_energy
+
+# Nights run 6pm to 6pm so evening-to-morning sleep stays on one night_date.
+NIGHT_SHIFT_HOURS = 18
+# Expected sleep-onset window (local hours, inclusive): 9pm-3am.
+ONSET_WINDOW_START_HOUR = 21
+ONSET_WINDOW_END_HOUR = 3
+ONSET_HR_BPM = 65
+ONSET_RMSSD_MS = 70
+ONSET_FALLBACK_HR_BPM = 70
+# Sustained wake: 5+ consecutive epochs (~2.5 min at 30s epochs) with HR >= 70.
+WAKE_HR_BPM = 70
+SUSTAINED_WAKE_EPOCHS = 5
+MIN_SLEEP_MIN = 60
+# HR nadir: minimum 30-min rolling mean during sleep.
+NADIR_WINDOW_EPOCHS = 60
+NADIR_MIN_EPOCHS = 10
+# Wake episodes: HR > 70 AND acc_energy > 500; a gap of 5+ epochs starts a new episode.
+EPISODE_HR_BPM = 70
+EPISODE_ENERGY = 500
+EPISODE_GAP_EPOCHS = 5
+EPISODE_MIN = 5
+
+
+def _first_per_night(mask: np.ndarray, night: np.ndarray, n_nights: int) -> np.ndarray:
+    """Position of the first True epoch per night, -1 where the night has none."""
+    pos = np.flatnonzero(mask)
+    out = np.full(n_nights, -1, dtype=np.int64)
+    uniq, first = np.unique(night[pos], return_index=True)
+    out[uniq] = pos[first]
+    return out
+
+
+def _runs(mask: np.ndarray, night: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Start positions and lengths of True runs, split at night boundaries."""
+    edge = np.empty(len(mask), dtype=bool)
+    edge[0] = mask[0]
+    edge[1:] = mask[1:] & (~mask[:-1] | (night[1:] != night[:-1]))
+    starts = np.flatnonzero(edge)
+    run_id = np.cumsum(edge) - 1
+    lengths = np.bincount(run_id[mask], minlength=len(starts))
+    return starts, lengths
+
+
+def _period_mask(lo: np.ndarray, hi: np.ndarray, n_epochs: int) -> np.ndarray:
+    """Boolean mask of epochs falling inside any of the inclusive [lo, hi] periods."""
+    marks = np.zeros(n_epochs + 1, dtype=np.int64)
+    np.add.at(marks, lo, 1)
+    np.add.at(marks, hi + 1, -1)
+    return np.cumsum(marks[:-1]) > 0
+
+
+def _rolling_nadir(hr: np.ndarray, lo: np.ndarray, hi: np.ndarray, n_epochs: int) -> np.ndarray:
+    """Minimum rolling-window HR mean inside each [lo, hi] period (NaN if too sparse).
+
+    Windows restart at each period start, matching ``Series.rolling`` applied
+    to the period alone.
+    """
+    pos = np.flatnonzero(_period_mask(lo, hi, n_epochs))
+    out = np.full(len(lo), np.nan)
+    if len(pos) == 0:
+        return out
+
+    period_of = np.searchsorted(lo, pos, side="right") - 1
+    vals = hr[pos]
+    valid = ~np.isnan(vals)
+    csum = np.concatenate([[0.0], np.cumsum(np.where(valid, vals, 0.0))])
+    ccnt = np.concatenate([[0], np.cumsum(valid)])
+
+    # Index into the concatenated period epochs where each period begins.
+    first = np.searchsorted(pos, lo)
+    j = np.arange(len(pos))
+    win_start = np.maximum(first[period_of], j - NADIR_WINDOW_EPOCHS + 1)
+    count = ccnt[j + 1] - ccnt[win_start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count >= NADIR_MIN_EPOCHS, (csum[j + 1] - csum[win_start]) / count, np.nan)
+
+    np.fmin.at(out, period_of, mean)
+    return out
+
+
+def night_record(night_date, onset, offset, duration_min: float, hr_nadir: float,
+                 wake_episodes: int) -> dict:
+    """Build one ``nights`` entry; ``hr_nadir`` is NaN when the period was too sparse."""
+    hr_nadir = None if np.isnan(hr_nadir) else float(hr_nadir)
+    continuity = round(1 - (wake_episodes * EPISODE_MIN / max(duration_min, 1)), 3)
+    continuity = max(0.0, min(1.0, continuity))
+    return {
+        "night_date": str(night_date),
+        "sleep_onset": str(onset),
+        "sleep_offset": str(offset),
+        "duration_min": round(float(duration_min), 1),
+        "hr_nadir_bpm": round(hr_nadir, 1) if hr_nadir else None,
+        "wake_episodes": wake_episodes,
+        "continuity_score": continuity,
+    }
 
 
 def analyse_sleep(df: pd.DataFrame) -> dict:
-    """Detect sleep periods and compute metrics from decoded-metrics data."""
-    result: dict = {"nights": []}
+    """Detect sleep periods and compute metrics from decoded-metrics data.
 
-    wear = df[df["wear_mode"] == "wear_on"].copy()
+    Every night is processed in one array pass over the epoch stream:
+    onset, sustained-wake offset, HR nadir and wake episodes are found with
+    run-length and per-night reductions rather than a loop per night.
+    """
+    wear = df[df["wear_mode"] == "wear_on"]
     if wear.empty or "heart_rate_mean" not in wear.columns:
         return {
             "nights": [],
@@ -30,100 +116,75 @@ def analyse_sleep(df: pd.DataFrame) -> dict:
         }
 
     wear = wear.sort_values("datetime").reset_index(drop=True)
-
-    # Compute accelerometer energy per epoch
-    wear["acc_energy"] = wear.apply(_acc_energy, axis=1)
-
-    # Group data by calendar night (6pm to 6pm next day to capture evening-to-morning sleep)
-    wear["night_date"] = (wear["datetime_et"] - pd.Timedelta(hours=18)).dt.date
+    n_epochs = len(wear)
+
+    energy = sleep_energy(wear)
+    hr = wear["heart_rate_mean"].to_numpy(dtype=np.float64)
+    dt_et = wear["datetime_et"]
+    # Epoch instants as int64 ns (UTC, so they stay monotonic across DST changes).
+    t = wear["datetime"].dt.tz_localize(None).to_numpy().astype("datetime64[ns]").astype(np.int64)
+
+    night_day = (dt_et - pd.Timedelta(hours=NIGHT_SHIFT_HOURS)).dt.tz_localize(None).dt.normalize()
+    night, night_days = pd.factorize(night_day, sort=True)
+    n_nights = len(night_days)
+
+    hour = dt_et.dt.hour.to_numpy()
+    in_window = (hour >= ONSET_WINDOW_START_HOUR) | (hour <= ONSET_WINDOW_END_HOUR)
+
+    # Sleep onset: first in-window epoch with HR < 65 (and RMSSD > 70 when the
+    # night has any RMSSD), else first in-window epoch with HR < 70.
+    strict = in_window & (hr < ONSET_HR_BPM)
+    if "cardio_RMSSD_ms" in wear.columns:
+        rmssd = wear["cardio_RMSSD_ms"].to_numpy(dtype=np.float64)
+        has_rmssd = np.bincount(night, weights=~np.isnan(rmssd), minlength=n_nights) > 0
+        strict &= ~has_rmssd[night] | (rmssd > ONSET_RMSSD_MS)
+    onset = _first_per_night(strict, night, n_nights)
+    fallback = _first_per_night(in_window & (hr < ONSET_FALLBACK_HR_BPM), night, n_nights)
+    onset = np.where(onset >= 0, onset, fallback)
+
+    has_onset = onset >= 0
+    night_last = np.searchsorted(night, np.arange(n_nights), side="right") - 1
+    post_lo = np.where(has_onset, np.searchsorted(t, t[onset], side="left"), n_epochs)
+
+    # Sleep offset: start of the first sustained-wake run after onset; if no run
+    # is long enough, the first wake epoch; if there is no wake, the night's last epoch.
+    wake = (hr >= WAKE_HR_BPM) & (np.arange(n_epochs) >= post_lo[night])
+    run_start, run_len = _runs(wake, night)
+    sustained = run_len >= SUSTAINED_WAKE_EPOCHS
+    sustained_start = np.zeros(n_epochs, dtype=bool)
+    sustained_start[run_start[sustained]] = True
+    offset = _first_per_night(sustained_start, night, n_nights)
+    first_wake = _first_per_night(wake, night, n_nights)
+    offset = np.where(offset >= 0, offset, np.where(first_wake >= 0, first_wake, night_last))
+
+    kept = np.flatnonzero(has_onset)
+    duration = np.full(n_nights, np.nan)
+    duration[kept] = (t[offset[kept]] - t[onset[kept]]) / 1e9 / 60
+    kept = kept[duration[kept] >= MIN_SLEEP_MIN]
+
+    lo = np.searchsorted(t, t[onset[kept]], side="left")
+    hi = np.searchsorted(t, t[offset[kept]], side="right") - 1
+    nadir = _rolling_nadir(hr, lo, hi, n_epochs)
+
+    # Wake episodes: clusters of high-HR, high-motion epochs within each sleep period.
+    in_sleep = _period_mask(lo, hi, n_epochs)
+    episode_pos = np.flatnonzero(in_sleep & (hr > EPISODE_HR_BPM) & (energy > EPISODE_ENERGY))
+    ep_night = night[episode_pos]
+    new_episode = np.ones(len(episode_pos), dtype=bool)
+    new_episode[1:] = (ep_night[1:] != ep_night[:-1]) | (np.diff(episode_pos) > EPISODE_GAP_EPOCHS)
+    episodes = np.bincount(ep_night[new_episode], minlength=n_nights)
+
+    onset_ts = dt_et.iloc[onset[kept]]
+    offset_ts = dt_et.iloc[offset[kept]]
 
     nights = []
-    for night_date, night_df in wear.groupby("night_date"):
-        hr = night_df["heart_rate_mean"]
-        rmssd = night_df.get("cardio_RMSSD_ms")
-
-        # Sleep onset: first epoch where HR < 65 within expected sleep window (9pm-3am local)
-        hour_of_day = night_df["datetime_et"].dt.hour
-        sleep_window = night_df[(hour_of_day >= 21) | (hour_of_day <= 3)]
-
-        if sleep_window.empty:
-            continue
-
-        onset_candidates = sleep_window[sleep_window["heart_rate_mean"] < 65]
-        if rmssd is not None and not rmssd.isna().all():
-            onset_candidates = onset_candidates[onset_candidates.get("cardio_RMSSD_ms", pd.Series(dtype=float)) > 70]
-
-        if onset_candidates.empty:
-            onset_candidates = sleep_window[sleep_window["heart_rate_mean"] < 70]
-
-        if onset_candidates.empty:
-            continue
-
-        sleep_onset = onset_candidates["datetime_et"].iloc[0]
-
-        # Sleep offset: last epoch meeting sleep criteria before sustained wake
-        post_onset = night_df[night_df["datetime_et"] >= sleep_onset]
-        wake_thresh_hr = 70
-        wake_candidates = post_onset[post_onset["heart_rate_mean"] >= wake_thresh_hr]
-
-        if not wake_candidates.empty:
-            # Find first sustained wake (5+ consecutive epochs ~2.5 min at 30s epochs)
-            wake_idx = wake_candidates.index
-            consecutive = 1
-            sleep_offset_idx = wake_idx[0]
-            for i in range(1, len(wake_idx)):
-                if wake_idx[i] == wake_idx[i - 1] + 1:
-                    consecutive += 1
-                    if consecutive >= 5:
-                        sleep_offset_idx = wake_idx[i - consecutive + 1]
-                        break
-                else:
-                    consecutive = 1
-
-            sleep_offset = post_onset.loc[sleep_offset_idx, "datetime_et"]
-        else:
-            sleep_offset = post_onset["datetime_et"].iloc[-1]
-
-        duration_min = (sleep_offset - sleep_onset).total_seconds() / 60
-        if duration_min < 60:
-            continue
-
-        # HR nadir: minimum 30-min rolling mean during sleep
-        sleep_period = night_df[
-            (night_df["datetime_et"] >= sleep_onset)
-            & (night_df["datetime_et"] <= sleep_offset)
-        ]
-        hr_rolling = sleep_period["heart_rate_mean"].rolling(60, min_periods=10).mean()
-        hr_nadir = float(hr_rolling.min()) if not hr_rolling.isna().all() else None
-
-        # Wake episodes: 5-min windows during sleep where HR > 70 AND acc_energy > 500
-        wake_episodes = 0
-        if not sleep_period.empty:
-            high_hr = sleep_period["heart_rate_mean"] > 70
-            high_motion = sleep_period["acc_energy"] > 500
-            wake_mask = high_hr & high_motion
-            wake_epochs = sleep_period[wake_mask]
-            # Count distinct clusters (gap of 5+ epochs = new episode)
-            if not wake_epochs.empty:
-                idx_arr = wake_epochs.index.values
-                gaps = np.diff(idx_arr) > 5
-                wake_episodes = int(np.sum(gaps)) + 1
-
-        continuity = round(1 - (wake_episodes * 5 / max(duration_min, 1)), 3)
-        continuity = max(0.0, min(1.0, continuity))
-
-        night_result = {
-            "night_date": str(night_date),
-            "sleep_onset": str(sleep_onset),
-            "sleep_offset": str(sleep_offset),
-            "duration_min": round(duration_min, 1),
-            "hr_nadir_bpm": round(hr_nadir, 1) if hr_nadir else None,
-            "wake_episodes": wake_episodes,
-            "continuity_score": continuity,
-        }
-        nights.append(night_result)
-
-    result["nights"] = nights
-    result["latest_night"] = nights[-1] if nights else None
-
-    return result
+    for k, night_id in enumerate(kept):
+        nights.append(night_record(
+            night_days[night_id].date(), onset_ts.iloc[k], offset_ts.iloc[k],
+            duration[night_id], nadir[k], int(episodes[night_id]),
+        ))
+
+    return {
+        "nights": nights,
+        "latest_night": nights[-1] if nights else None,
+    }
@@ -3,6 +3,8 @@
 import numpy as np
 import pandas as pd
 
+from physiological_insights.hypnogram import METRIC_KEYS as _HYPNOGRAM_KEYS, hypnogram_metrics, session_stages
+
 _DEEP_TARGET_PCT = (15, 20)
 _REM_TARGET_PCT = (20, 25)
 _LIGHT_TARGET_PCT = (50, 60)
@@ -43,7 +45,10 @@ def analyse_sleep_sessions(df: pd.DataFrame) -> dict:
     df = df.copy()
     df["session_type"] = _classify_session_type(df)
 
-    all_nights = _build_night_summaries(df)
+    stages = session_stages(df)
+    hypnogram = hypnogram_metrics(stages).set_index(df.index) if stages is not None else None
+
+    all_nights = _build_night_summaries(df, hypnogram)
     primary_nights = [n for n in all_nights if n["session_type"] == "primary"]
     nap_nights = [n for n in all_nights if n["session_type"] == "nap"]
 
@@ -73,9 +78,9 @@ def _empty_result() -> dict:
     }
 
 
-def _build_night_summaries(df: pd.DataFrame) -> list[dict]:
+def _build_night_summaries(df: pd.DataFrame, hypnogram: pd.DataFrame | None = None) -> list[dict]:
     nights = []
-    for _, row in df.iterrows():
+    for idx, row in df.iterrows():
         total = row.get("total_sleep_time_min") or 0
         deep = row.get("total_deep") or 0
         rem = row.get("total_rem") or 0
@@ -119,9 +124,18 @@ def _build_night_summaries(df: pd.DataFrame) -> list[dict]:
             "avg_hr_bpm": round(row["avg_hr_bpm_when_wake"], 1) if pd.notna(row.get("avg_hr_bpm_when_wake")) else None,
             "circadian_compliance": round(row["circadian_compliance"], 1) if pd.notna(row.get("circadian_compliance")) else None,
         })
+        if hypnogram is not None:
+            hyp = hypnogram.loc[idx]
+            nights[-1].update({k: _hypnogram_value(k, hyp[k]) for k in _HYPNOGRAM_KEYS})
     return nights
 
 
+def _hypnogram_value(key: str, value):
+    if pd.isna(value):
+        return None
+    return round(float(value), 1) if key.endswith("_min") else int(value)
+
+
 def _analyse_sleep_debt(df: pd.DataFrame) -> dict:
     if df.empty or "sleep_debt_min" not in df.columns:
         return {"current_debt_min": None, "current_debt_hours": None}
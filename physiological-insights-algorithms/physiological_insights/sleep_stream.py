@@ -0,0 +1,219 @@
+"""Incremental sleep detection for live 30-second epoch streams.
+
+``SleepStateMachine`` consumes decoded-metrics epochs as they arrive (one row
+or a small batch at a time) and emits onset, offset and wake-episode events
+without waiting for a finished export. It applies the thresholds from
+``sleep.py``, and the ``night`` event emitted when a night closes is the same
+record ``analyse_sleep`` produces for that night.
+
+The batch onset rule depends on the whole night (the RMSSD condition only
+applies if the night has any RMSSD), so up to three onset hypotheses are
+tracked side by side and resolved when the night rolls over. Each carries a
+fixed-size nadir window, so state per user is O(1) regardless of history.
+Live ``sleep_onset`` events can therefore be revised later the same night.
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from physiological_insights.epoch_features import sleep_energy
+from physiological_insights.sleep import (
+    EPISODE_ENERGY, EPISODE_GAP_EPOCHS, EPISODE_HR_BPM, MIN_SLEEP_MIN, NADIR_MIN_EPOCHS,
+    NADIR_WINDOW_EPOCHS, NIGHT_SHIFT_HOURS, ONSET_FALLBACK_HR_BPM, ONSET_HR_BPM,
+    ONSET_RMSSD_MS, ONSET_WINDOW_END_HOUR, ONSET_WINDOW_START_HOUR, SUSTAINED_WAKE_EPOCHS,
+    WAKE_HR_BPM, night_record,
+)
+
+
+class _SleepPeriod:
+    """Sleep period growing from one candidate onset until sustained wake."""
+
+    def __init__(self, t: int, ts: pd.Timestamp):
+        self.onset = (t, ts)
+        self.last = (t, ts)
+        self._window = deque(maxlen=NADIR_WINDOW_EPOCHS)
+        self._window_sum = 0.0
+        self._window_count = 0
+        self.nadir = np.nan
+        self.episodes = 0
+        self._last_episode_pos = None
+        self._run_len = 0
+        self._run_start = None
+        self.first_wake = None
+        self.offset = None
+
+    def step(self, pos: int, t: int, ts: pd.Timestamp, hr: float, energy: float) -> list[str]:
+        """Add one epoch; return the names of any events it triggers."""
+        if self.offset is not None:
+            return []
+        events = []
+        self.last = (t, ts)
+
+        # HR nadir: rolling mean over the last NADIR_WINDOW_EPOCHS epochs of the period.
+        if len(self._window) == NADIR_WINDOW_EPOCHS:
+            dropped = self._window[0]
+            if not np.isnan(dropped):
+                self._window_sum -= dropped
+                self._window_count -= 1
+        self._window.append(hr)
+        if not np.isnan(hr):
+            self._window_sum += hr
+            self._window_count += 1
+        if self._window_count >= NADIR_MIN_EPOCHS:
+            self.nadir = np.fmin(self.nadir, self._window_sum / self._window_count)
+
+        if hr > EPISODE_HR_BPM and energy > EPISODE_ENERGY:
+            if self._last_episode_pos is None or pos - self._last_episode_pos > EPISODE_GAP_EPOCHS:
+                self.episodes += 1
+                events.append("wake_episode")
+            self._last_episode_pos = pos
+
+        # The offset is the first epoch of the first sustained-wake run, so the
+        # period's stats are snapshotted when each run starts.
+        if hr >= WAKE_HR_BPM:
+            if self._run_len == 0:
+                self._run_start = (t, ts, self.nadir, self.episodes)
+            self._run_len += 1
+            if self.first_wake is None:
+                self.first_wake = self._run_start
+            if self._run_len >= SUSTAINED_WAKE_EPOCHS:
+                self.offset = self._run_start
+                events.append("sleep_offset")
+        else:
+            self._run_len = 0
+        return events
+
+    def end(self) -> tuple:
+        """(offset time ns, offset timestamp, nadir, wake episodes) as of now."""
+        if self.offset is not None:
+            return self.offset
+        if self.first_wake is not None:
+            return self.first_wake
+        return (*self.last, self.nadir, self.episodes)
+
+
+class SleepStateMachine:
+    """Online counterpart of ``sleep.analyse_sleep`` for one user's epoch stream.
+
+    Feed epochs in time order with :meth:`update`; call :meth:`flush` at the
+    end of a stream to close the current night. Both return a list of event
+    dicts with ``event`` set to ``sleep_onset``, ``wake_episode``,
+    ``sleep_offset`` or ``night`` (the final record, under ``night``).
+    """
+
+    def __init__(self):
+        self.latest_night = None
+        self._night_date = None
+        self._pos = 0
+        self._last_t = None
+        self._reset_night()
+
+    def _reset_night(self) -> None:
+        self._has_rmssd = False
+        self._strict = None            # HR < 65 and RMSSD > 70
+        self._strict_no_rmssd = None   # HR < 65, used if the night has no RMSSD
+        self._fallback = None          # HR < 70
+        self._reported = None
+
+    def _leading(self):
+        """Best onset hypothesis given the night so far."""
+        if self._strict is not None:
+            return self._strict
+        if not self._has_rmssd and self._strict_no_rmssd is not None:
+            return self._strict_no_rmssd
+        return self._fallback
+
+    def _close_night(self) -> list[dict]:
+        period = self._leading()
+        night_date = self._night_date
+        self._reset_night()
+        if period is None:
+            return []
+
+        onset_t, onset_ts = period.onset
+        offset_t, offset_ts, nadir, episodes = period.end()
+        duration_min = (offset_t - onset_t) / 1e9 / 60
+        if duration_min < MIN_SLEEP_MIN:
+            return []
+        record = night_record(night_date, onset_ts, offset_ts, duration_min, nadir, episodes)
+        self.latest_night = record
+        return [{"event": "night", "night_date": str(night_date), "night": record}]
+
+    def _step(self, night_date, t: int, ts: pd.Timestamp, hour: int, hr: float,
+              rmssd: float, energy: float) -> list[dict]:
+        events = []
+        if night_date != self._night_date:
+            if self._night_date is not None:
+                events.extend(self._close_night())
+            self._night_date = night_date
+
+        if not np.isnan(rmssd):
+            self._has_rmssd = True
+            self._strict_no_rmssd = None
+
+        in_window = hour >= ONSET_WINDOW_START_HOUR or hour <= ONSET_WINDOW_END_HOUR
+        if in_window and self._strict is None:
+            if hr < ONSET_HR_BPM and rmssd > ONSET_RMSSD_MS:
+                # The strict hypothesis wins outright once it exists.
+                self._strict = _SleepPeriod(t, ts)
+                self._strict_no_rmssd = self._fallback = None
+            else:
+                if hr < ONSET_HR_BPM and not self._has_rmssd and self._strict_no_rmssd is None:
+                    self._strict_no_rmssd = _SleepPeriod(t, ts)
+                if hr < ONSET_FALLBACK_HR_BPM and self._fallback is None:
+                    self._fallback = _SleepPeriod(t, ts)
+
+        leading = self._leading()
+        for period in (self._strict, self._strict_no_rmssd, self._fallback):
+            if period is None:
+                continue
+            names = period.step(self._pos, t, ts, hr, energy)
+            if period is leading:
+                events.extend({"event": name, "night_date": str(night_date), "time": str(ts)}
+                              for name in names)
+
+        if leading is not None and leading is not self._reported:
+            events.insert(0, {
+                "event": "sleep_onset", "night_date": str(night_date),
+                "time": str(leading.onset[1]), "revised": self._reported is not None,
+            })
+            self._reported = leading
+        self._pos += 1
+        return events
+
+    def update(self, epochs: pd.DataFrame) -> list[dict]:
+        """Consume one or more decoded-metrics epochs (as from ``load_decoded_metrics``)."""
+        wear = epochs[epochs["wear_mode"] == "wear_on"]
+        if wear.empty or "heart_rate_mean" not in wear.columns:
+            return []
+        wear = wear.sort_values("datetime")
+
+        t = wear["datetime"].dt.tz_localize(None).to_numpy().astype("datetime64[ns]").astype(np.int64)
+        if self._last_t is not None and t[0] < self._last_t:
+            raise ValueError("Epochs must be fed in time order")
+        self._last_t = int(t[-1])
+
+        dt_et = wear["datetime_et"]
+        night_dates = (dt_et - pd.Timedelta(hours=NIGHT_SHIFT_HOURS)).dt.date.to_numpy()
+        hours = dt_et.dt.hour.to_numpy()
+        hr = wear["heart_rate_mean"].to_numpy(dtype=np.float64)
+        if "cardio_RMSSD_ms" in wear.columns:
+            rmssd = wear["cardio_RMSSD_ms"].to_numpy(dtype=np.float64)
+        else:
+            rmssd = np.full(len(wear), np.nan)
+        energy = sleep_energy(wear)
+
+        events = []
+        for i, ts in enumerate(dt_et):
+            events.extend(self._step(night_dates[i], int(t[i]), ts, hours[i], hr[i], rmssd[i], energy[i]))
+        return events
+
+    def flush(self) -> list[dict]:
+        """Close the current night (e.g. at the end of a recording)."""
+        if self._night_date is None:
+            return []
+        events = self._close_night()
+        self._night_date = None
+        return events
@@ -0,0 +1,101 @@
+"""Lifestyle tags (meal, caffeine, alcohol, exercise, studying, travel) from test context notes.
+
+All keyword lists are compiled into one alternation regex with a named group
+per tag and run once over the distinct notes (``str.extractall``). The hits
+are stored on the tests as sparse boolean ``tag_<name>`` columns, so rules
+and summaries select e.g. "Ready tests after caffeine" with a mask instead of
+scanning note text.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Whole-word keywords (case-insensitive) per tag. Words that are common in other
+# senses ("about to eat", "ran out of time", "running an experiment", "train of
+# thought", "training a model", "first-class") only count inside a phrase.
+TAG_KEYWORDS = {
+    "meal": ("eating", "ate", "meal", "meals", "lunch", "dinner", "breakfast", "brunch",
+             "food", "snack", "snacks"),
+    "caffeine": ("coffee", "caffeine", "espresso", "latte", "cappuccino", "tea", "matcha",
+                 "energy drink", "red bull", "monster energy"),
+    "alcohol": ("alcohol", "beer", "beers", "wine", "drunk", "hungover", "hangover", "cocktail",
+                "cocktails", "vodka", "whiskey", "tequila"),
+    "exercise": ("workout", "worked out", "working out", "gym", "went for a run", "went running",
+                 "morning run", "evening run", "after my run", "after a run", "jog", "jogging",
+                 "exercise", "exercised", "strength training", "lifting", "swim", "swimming",
+                 "bike", "biking", "cycling", "yoga"),
+    "studying": ("study", "studying", "studied", "exam", "exams", "homework", "problem set", "pset",
+                 "lecture", "classes", "recitation", "assignment"),
+    "travel": ("travel", "traveling", "travelling", "flight", "flew", "jet lag", "jetlag", "airport",
+               "road trip", "train ride", "on the train", "commute", "drove"),
+}
+TAGS = tuple(TAG_KEYWORDS)
+
+_TAG_RE = re.compile(
+    "|".join(
+        rf"(?P<{tag}>\b(?:{'|'.join(re.escape(kw) for kw in sorted(kws, key=len, reverse=True))})\b)"
+        for tag, kws in TAG_KEYWORDS.items()
+    ),
+    re.IGNORECASE,
+)
+
+_MIN_TAGGED_READY = 2
+
+
+def tag_columns() -> list[str]:
+    return [f"tag_{tag}" for tag in TAGS]
+
+
+def tag_notes(notes: pd.Series) -> pd.DataFrame:
+    """Sparse boolean ``tag_<name>`` matrix for ``notes`` (one row per note, same index)."""
+    codes, uniques = pd.factorize(notes)
+    matches = pd.Series(np.asarray(uniques, dtype=object), dtype=object).str.extractall(_TAG_RE)
+
+    note_of_match = matches.index.get_level_values(0).to_numpy(dtype=np.int64)
+    tags = {}
+    for tag in TAGS:
+        hit = np.zeros(len(uniques) + 1, dtype=bool)  # last slot: missing notes (code -1)
+        hit[note_of_match[matches[tag].notna().to_numpy()]] = True
+        tags[f"tag_{tag}"] = pd.arrays.SparseArray(hit[codes], fill_value=False)
+    return pd.DataFrame(tags, index=notes.index)
+
+
+def add_tags(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the ``tag_<name>`` columns to the tests DataFrame (all False without notes)."""
+    notes = df["context_note"] if "context_note" in df.columns else pd.Series("", index=df.index)
+    tags = tag_notes(notes)
+    for col in tags.columns:
+        df[col] = tags[col]
+    return df
+
+
+def tag_effects(df: pd.DataFrame | None, ready_baseline: float | None = None) -> dict:
+    """Ready scores on tagged tests vs. untagged tests and the baseline, per tag.
+
+    Tags with fewer than 2 scored Ready tests are left out.
+    """
+    if df is None or not set(tag_columns()) <= set(df.columns):
+        return {}
+    ready = (df["type"] == "READY").to_numpy() & df["score"].notna().to_numpy()
+    score = df["score"].to_numpy(dtype=np.float64)
+
+    effects = {}
+    for tag in TAGS:
+        tagged = np.asarray(df[f"tag_{tag}"], dtype=bool)
+        with_tag = score[ready & tagged]
+        if len(with_tag) < _MIN_TAGGED_READY:
+            continue
+        without = score[ready & ~tagged]
+        mean = float(with_tag.mean())
+        untagged_mean = float(without.mean()) if len(without) else None
+        effects[tag] = {
+            "n_ready": int(len(with_tag)),
+            "ready_mean": round(mean, 1),
+            "untagged_ready_mean": round(untagged_mean, 1) if untagged_mean is not None else None,
+            "delta_vs_untagged": round(mean - untagged_mean, 1) if untagged_mean is not None else None,
+            "pct_of_baseline": round(mean / ready_baseline * 100, 1) if ready_baseline else None,
+            "first_tagged": str(df.loc[ready & tagged, "date"].min()),
+        }
+    return effects
@@ -0,0 +1,66 @@
+"""Closed-form least-squares trend lines, batched over series and rolling windows.
+
+``linear_trend`` fits ``y = intercept + slope * x`` along the last axis of an
+array, so one call fits any number of series; NaN entries are left out of
+their series' fit. ``rolling_trend`` stacks the trailing window ending at
+every position into a (n, window) array and fits all of them in the same
+way, giving e.g. the 7-day slope for every day of history in one pass.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def linear_trend(y, x=None) -> dict:
+    """Least-squares line per series along the last axis of ``y``.
+
+    Without ``x``, each value's x is its position among the non-NaN values of
+    its series (0, 1, 2, ...), as when fitting ``series.dropna()`` against
+    ``range(len)``. Returns a dict of arrays shaped like ``y`` minus its last
+    axis: ``slope``, ``intercept``, ``r``, ``stderr`` (of the slope) and ``n``.
+    Series with fewer than 2 values (or constant x) get NaN; ``stderr``
+    needs 3.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~np.isnan(y)
+    if x is None:
+        x = np.cumsum(valid, axis=-1) - 1.0
+    else:
+        x = np.broadcast_to(np.asarray(x, dtype=np.float64), y.shape)
+        valid &= ~np.isnan(x)
+    n = valid.sum(axis=-1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = np.where(valid, x, 0.0).sum(axis=-1) / n
+        y_mean = np.where(valid, y, 0.0).sum(axis=-1) / n
+        dx = np.where(valid, x - x_mean[..., None], 0.0)
+        dy = np.where(valid, y - y_mean[..., None], 0.0)
+        sxx = (dx * dx).sum(axis=-1)
+        syy = (dy * dy).sum(axis=-1)
+        sxy = (dx * dy).sum(axis=-1)
+
+        fitted = (n >= 2) & (sxx > 0)
+        slope = np.where(fitted, sxy / sxx, np.nan)
+        r = np.where(fitted, np.clip(sxy / np.sqrt(sxx * syy), -1.0, 1.0), np.nan)
+        r = np.where(fitted & (syy == 0), 0.0, r)
+        rss = np.maximum(syy - slope * sxy, 0.0)
+        stderr = np.where(fitted & (n > 2), np.sqrt(rss / (n - 2) / sxx), np.nan)
+
+    return {
+        "slope": slope,
+        "intercept": np.where(fitted, y_mean - slope * x_mean, np.nan),
+        "r": r,
+        "stderr": stderr,
+        "n": n,
+    }
+
+
+def rolling_trend(y, window: int = 7) -> dict:
+    """``linear_trend`` of the trailing ``window`` values ending at each position of a 1-D series.
+
+    Early positions use the values available so far. Returned arrays have
+    the length of ``y``.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    padded = np.concatenate([np.full(window - 1, np.nan), y])
+    return linear_trend(sliding_window_view(padded, window))
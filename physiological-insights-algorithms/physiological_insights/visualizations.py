@@ -7,7 +7,9 @@ import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 from matplotlib.colors import LinearSegmentedColormap
-from scipy import stats
+
+from physiological_insights.downsample import lttb_indices
+from physiological_insights.rollups import bucket_mean
 
 
 _STYLE = {
@@ -28,6 +30,8 @@ _TIER_COLORS = {
     "Recovery": "#e74c3c",
 }
 
+_PROFILE_MAX_POINTS = 5000
+
 _TIER_BOUNDS = [
     ("Peak", 175, 200),
     ("Good", 155, 175),
@@ -202,6 +206,7 @@ def _self_report_vs_ready(tests_df, results, graphs_dir):
         ax.scatter(sub[col], sub["score"], alpha=0.5, s=40, color="#3498db")
 
         if len(sub) >= 5:
+            from scipy import stats  # only this graph needs scipy (for the p-value)
             r, p = stats.spearmanr(sub[col], sub["score"])
             ax.set_title(f"{col.title()} vs Ready\nSpearman r={r:.2f}, p={p:.3f}")
             z = np.polyfit(sub[col], sub["score"], 1)
@@ -224,26 +229,30 @@ def _hrv_night_profile(metrics_df, results, graphs_dir):
         return
 
     hrv = results.get("hrv", {})
-    ts = hrv.get("timeseries", [])
-    if not ts:
+    rollups = hrv.get("rollups")
+    if not rollups:
         return
 
-    ts_df = pd.DataFrame(ts)
-    if ts_df.empty:
+    # 1-min means, LTTB-downsampled per signal so long recordings keep their dips and peaks.
+    level = rollups["1min"]
+    if level.empty:
         return
-
-    ts_df["datetime_et"] = pd.to_datetime(ts_df["datetime_et"])
+    seconds = level.index.asi8 / 1e9
+    hr = bucket_mean(level, "hr").to_numpy()
+    rmssd = bucket_mean(level, "rmssd").to_numpy()
+    hr_idx = lttb_indices(seconds, [hr], _PROFILE_MAX_POINTS)
+    rmssd_idx = lttb_indices(seconds, [rmssd], _PROFILE_MAX_POINTS)
 
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 7), sharex=True)
 
-    ax1.plot(ts_df["datetime_et"], ts_df["heart_rate_mean"], color="#e74c3c", linewidth=1, alpha=0.8)
+    ax1.plot(level.index[hr_idx], hr[hr_idx], color="#e74c3c", linewidth=1, alpha=0.8)
     ax1.set_ylabel("Heart Rate (BPM)")
     ax1.set_title("Night Profile: HR & HRV")
     ax1.axhline(65, color="#e74c3c", linestyle="--", linewidth=1.5, alpha=0.7, label="HR 65 BPM threshold")
     ax1.legend(fontsize=8)
 
     rmssd_baseline = hrv.get("rmssd_sleep_peak")
-    ax2.plot(ts_df["datetime_et"], ts_df["cardio_RMSSD_ms"], color="#3498db", linewidth=1, alpha=0.8)
+    ax2.plot(level.index[rmssd_idx], rmssd[rmssd_idx], color="#3498db", linewidth=1, alpha=0.8)
     if rmssd_baseline:
         ax2.axhline(rmssd_baseline, color="#27ae60", linestyle="--", linewidth=1.5, alpha=0.7,
                      label=f"RMSSD baseline ({rmssd_baseline:.0f} ms)")